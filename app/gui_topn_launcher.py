@@ -10,18 +10,38 @@ GUIで設定できる引数:
 - 任意:  --event-name, --title-template, --no-date-in-title, --split-by-store, --split-dir
 
 付加機能:
-- 事前チェック: dates から必要な CSV (data/material/YYYY/IT_YYYYMM.csv) の存在確認
+- 事前チェック: dates から必要な CSV (data/material/YYYY/IT_YYYYMM.csv、圧縮版 .gz/.zst/.xz/.bz2 も可) の存在確認
 - 実行ログ（UTF-8強制）
-- 完了後のポストチェック（本体xlsx存在 / split件数）
+- 停止ボタンは停止ファイル経由で「現在の店を書き終えてから」止める（2回押しで強制終了）
+- 続きから再開（--resume）: 中断した split 出力の未完了店だけを出力
+- Arrow 共有キャッシュ（--arrow-cache、pyarrow がある場合）: 並行ジョブが同じ月データをメモリマップで共有（--strict とは併用不可、既定オフ）
+- 対象店舗（--stores）: 店番・グループ名で絞って1店だけ再発行など
+- ロールアップ（--rollup）: 店舗マスターの area / chain 列の単位でも TopN ページを出力
+- サイズ最適化（--optimize）: 未使用スタイル等を除いて配布ファイルを小さくする
+- 前年比較（--compare-previous-year）: 同じ曜日 / 同じ月日の前年金額・前年比を空き列に出力
+- ジョブキュー: 設定（大分類・対象日・イベント名・出力先）を複数積み、
+  CPUコア数を上限とするワーカーで並行実行（ジョブごとの状態・ログ・取消）。
+  出力先（out / split-dir）が重なるジョブは前のジョブの終了を待って順番に実行する。
+  各ジョブは別プロセスの CLI なので、共有できるのはディスク上のキャッシュ
+  （店舗マスター JSON / テンプレートスナップショット）。
+- ログ表示はバッチ化（1tick=1回の insert）し、画面には直近 LOG_MAX_LINES 行だけ保持。
+  全ログは data/logs/gui.log（ローテーション）へ。表示レベルのフィルタ付き。
+- 進捗バー（CLI の --progress-fd 2 で受け取る JSON イベントから店数・速度・残り時間を表示）
+- 完了後のポストチェック（本体xlsx存在 / split件数は実行マニフェストから）
 - 便利: 完了後に split / 本体 xlsx を自動オープン
 """
 from __future__ import annotations
-import os, sys, subprocess, threading, queue, re
+import os, sys, subprocess, threading, queue, re, tempfile
+import importlib.util
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from string import Template
 import json
+import itertools
+from collections import deque
+import logging
+from logging.handlers import RotatingFileHandler
+from dataclasses import dataclass, field
 from datetime import datetime
 try:
     from tkcalendar import Calendar
@@ -37,18 +57,81 @@ sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from styles import theme_cyber, theme_pastel
 from styles.apply_ttk_min import apply_theme
 from styles.widgets import make_calendar, style_toplevel
+from scripts.manifest import manifest_path_for, read_manifest
+from scripts.run_context import RunContext, category_name, load_category_map
+from scripts.sales_source import available_suffixes, find_month_file
 
 APP_PATH = Path(__file__).resolve()
 REPO_ROOT = APP_PATH.parent.parent
 CLI_SIMPLE = 'scripts.make_topn_simple_refactor'
 MATERIAL_DIR = REPO_ROOT / 'data' / 'material'
 STORE_MASTER = MATERIAL_DIR / 'master' / 'store_master.xlsx'
+STOP_FILE = Path(tempfile.gettempdir()) / f'topn_gui_stop_{os.getpid()}.flag'
+EXIT_CANCELLED = 3        # CLI 側の停止終了コード（scripts.make_topn_simple_refactor.EXIT_CANCELLED）
+EXIT_DATA_QUALITY = 4     # --strict でデータ品質チェックに引っかかった（同 EXIT_DATA_QUALITY）
+# ジョブの終了コード → 状態（それ以外のコードは「失敗」）。終わった状態のジョブは「終了済みを消去」で外せる
+JOB_STATUS_BY_CODE = {0: '完了', EXIT_CANCELLED: '停止', EXIT_DATA_QUALITY: 'データ不備'}
+DONE_STATUSES = frozenset({*JOB_STATUS_BY_CODE.values(), '失敗', '取消'})
+FORCE_STOP_AFTER_MS = 60_000
+# split 出力は保存（SMB 等）を書込スレッドに回し、次の店の描画と重ねる（保留する店数）
+WRITE_QUEUE = 2
+# 前年比較の表示名 → --compare-previous-year の値（なし = 指定しない）
+COMPARE_MODES = {'なし': '', '同じ曜日': 'weekday', '同じ月日': 'date'}
+JOB_WORKERS = max(1, os.cpu_count() or 1)
+LOG_DIR = REPO_ROOT / 'data' / 'logs'
+LOG_MAX_LINES = 2000            # ログ欄に残す行数（古い行から捨てる）
+LOG_POLL_MS = 80
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+def _log_level_of(s: str) -> int:
+    """ログ行の先頭タグからレベルを推定（[debug] / [warn] / Traceback 等）"""
+    head = re.sub(r'^\[job#\d+\]\s*', '', s.lstrip())[:32].lower()
+    if head.startswith('[debug]'):
+        return logging.DEBUG
+    if head.startswith(('[warn', 'warning')):
+        return logging.WARNING
+    if head.startswith(('[error', '[postcheck-error', 'traceback', 'error')) or 'error:' in head:
+        return logging.ERROR
+    return logging.INFO
+
+def _make_file_logger() -> logging.Logger:
+    logger = logging.getLogger('topn_gui')
+    if not logger.handlers:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        try:
+            LOG_DIR.mkdir(parents=True, exist_ok=True)
+            h = RotatingFileHandler(LOG_DIR / 'gui.log', maxBytes=5_000_000, backupCount=3, encoding='utf-8')
+            h.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(h)
+        except OSError:
+            logger.addHandler(logging.NullHandler())
+    return logger
+
+@dataclass
+class Job:
+    """ジョブキューの1件（CLI 1回分）"""
+    id: int
+    args: list[str]
+    category: str
+    dates: str
+    event: str
+    out: str
+    status: str = '待機'          # 待機 / 実行中 / DONE_STATUSES のいずれか
+    detail: str = ''
+    targets: frozenset[str] = frozenset()   # 出力先（out と split-dir）。重なるジョブは同時に走らせない
+    proc: subprocess.Popen | None = None
+    log: deque[str] = field(default_factory=lambda: deque(maxlen=20_000))
+
+    @property
+    def stop_file(self) -> Path:
+        return Path(tempfile.gettempdir()) / f'topn_gui_stop_{os.getpid()}_job{self.id}.flag'
 
 class TopNGuiApp:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
         self.root.title('topN 配布ツール（simple_refactor 完全版）')
-        self.root.geometry('980x700')
+        self.root.geometry('1080x860')
         # 入力
         self.var_event = tk.StringVar()
         self.var_category = tk.StringVar(value='4')
@@ -60,8 +143,17 @@ class TopNGuiApp:
             value='{yy}年 {range} {cat}単品データ（{page}）'
         )
         self.var_no_date_in_title = tk.BooleanVar(value=False)
+        self.var_resume = tk.BooleanVar(value=False)
+        self.var_strict = tk.BooleanVar(value=False)
+        self.var_stores = tk.StringVar(value='')
+        self.var_rollup = tk.StringVar(value='')
+        self.var_compare = tk.StringVar(value='なし')
+        self.var_optimize = tk.BooleanVar(value=False)
+        # 同時実行のジョブ同士で月データを共有（pyarrow がある環境のみ）
+        self.arrow_ok = importlib.util.find_spec('pyarrow') is not None
+        self.var_arrow = tk.BooleanVar(value=False)  # 品質チェック（--strict）と併用不可なので既定はオフ
         # カテゴリマスタ読込
-        self.category_map: dict[str, str] = self._load_category_map()
+        self.category_map: dict[str, str] = load_category_map()
 
         # 既定コードがマスタに無ければ先頭に寄せる
         if self.var_category.get() not in self.category_map:
@@ -76,6 +168,17 @@ class TopNGuiApp:
         # 実行
         self.proc: subprocess.Popen | None = None
         self.log_queue: queue.Queue[str] = queue.Queue()
+        self.file_log = _make_file_logger()
+        self.var_log_level = tk.StringVar(value='INFO')
+        self.progress_queue: queue.Queue[dict] = queue.Queue()
+        # ジョブキュー
+        self.jobs: dict[int, Job] = {}
+        self._job_ids = itertools.count(1)
+        self._job_pending: queue.Queue[int] = queue.Queue()
+        self._job_updates: queue.Queue[int] = queue.Queue()
+        self._job_workers: list[threading.Thread] = []
+        self._job_cond = threading.Condition()
+        self._busy_targets: set[str] = set()
         # UI
         self._build_ui()
         self._poll_log_queue()
@@ -152,6 +255,20 @@ class TopNGuiApp:
         ttk.Entry(f2, textvariable=self.var_title_template, width=50).pack(side=tk.LEFT, padx=6)
         ttk.Checkbutton(f2, text='タイトルに日付を含めない (--no-date-in-title)', variable=self.var_no_date_in_title).pack(side=tk.LEFT, padx=12)
 
+        f3 = ttk.Frame(opt); f3.pack(fill=tk.X, **pad)
+        ttk.Checkbutton(f3, text='中断した split を続きから再開 (--resume)', variable=self.var_resume).pack(side=tk.LEFT)
+        ttk.Checkbutton(f3, text='データ不備があれば中止 (--strict)', variable=self.var_strict).pack(side=tk.LEFT, padx=12)
+        ttk.Checkbutton(f3, text='Arrow 共有キャッシュ (--arrow-cache)', variable=self.var_arrow,
+                        state=tk.NORMAL if self.arrow_ok else tk.DISABLED).pack(side=tk.LEFT, padx=12)
+        ttk.Checkbutton(f3, text='サイズ最適化 (--optimize)', variable=self.var_optimize).pack(side=tk.LEFT, padx=12)
+        ttk.Label(f3, text='対象店舗（空=全店）').pack(side=tk.LEFT, padx=(12, 0))
+        ttk.Entry(f3, textvariable=self.var_stores, width=24).pack(side=tk.LEFT, padx=6)
+        ttk.Label(f3, text='ロールアップ（例: area,chain）').pack(side=tk.LEFT, padx=(12, 0))
+        ttk.Entry(f3, textvariable=self.var_rollup, width=14).pack(side=tk.LEFT, padx=6)
+        ttk.Label(f3, text='前年比較').pack(side=tk.LEFT, padx=(12, 0))
+        ttk.Combobox(f3, textvariable=self.var_compare, values=list(COMPARE_MODES), state='readonly',
+                     width=10).pack(side=tk.LEFT, padx=6)
+
         # 完了後の挙動
         done = ttk.LabelFrame(frm, text='完了後の動作'); done.pack(fill=tk.X, **pad)
         ttk.Checkbutton(done, text='splitフォルダを開く', variable=self.var_open_after_split).pack(side=tk.LEFT)
@@ -163,38 +280,41 @@ class TopNGuiApp:
         ttk.Button(btn, text='実行', command=self._on_run).pack(side=tk.LEFT, padx=8)
         ttk.Button(btn, text='停止', command=self._on_stop).pack(side=tk.LEFT)
 
+        # 進捗
+        f_prog = ttk.Frame(frm); f_prog.pack(fill=tk.X, **pad)
+        self.var_progress = tk.DoubleVar(value=0.0)
+        self.var_progress_text = tk.StringVar(value='')
+        ttk.Progressbar(f_prog, variable=self.var_progress, maximum=100.0, length=360)\
+        .pack(side=tk.LEFT)
+        ttk.Label(f_prog, textvariable=self.var_progress_text, anchor='w')\
+        .pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+
+        # ジョブキュー
+        jq = ttk.LabelFrame(frm, text=f'ジョブキュー（同時実行 最大 {JOB_WORKERS}）'); jq.pack(fill=tk.X, **pad)
+        jbtn = ttk.Frame(jq); jbtn.pack(fill=tk.X, padx=6, pady=4)
+        ttk.Button(jbtn, text='キューに追加', command=self._on_enqueue).pack(side=tk.LEFT)
+        ttk.Button(jbtn, text='選択を取消', command=self._on_cancel_job).pack(side=tk.LEFT, padx=6)
+        ttk.Button(jbtn, text='ログ表示', command=self._on_show_job_log).pack(side=tk.LEFT)
+        ttk.Button(jbtn, text='終了済みを消去', command=self._on_clear_jobs).pack(side=tk.LEFT, padx=6)
+        cols = ('id', 'category', 'dates', 'event', 'out', 'status')
+        self.tree_jobs = ttk.Treeview(jq, columns=cols, show='headings', height=5)
+        for c, label, w in zip(cols, ('#', '大分類', '対象日', 'イベント名', '出力', '状態'),
+                               (40, 80, 220, 180, 220, 160)):
+            self.tree_jobs.heading(c, text=label)
+            self.tree_jobs.column(c, width=w, stretch=(c in ('dates', 'out')))
+        self.tree_jobs.pack(fill=tk.X, padx=6, pady=(0, 6))
+
         # ログ
         lf = ttk.LabelFrame(frm, text='ログ'); lf.pack(fill=tk.BOTH, expand=True, **pad)
+        lf_top = ttk.Frame(lf); lf_top.pack(fill=tk.X)
+        ttk.Label(lf_top, text='表示レベル').pack(side=tk.LEFT)
+        ttk.Combobox(lf_top, textvariable=self.var_log_level, values=LOG_LEVELS,
+                     state='readonly', width=10).pack(side=tk.LEFT, padx=6)
+        ttk.Label(lf_top, text=f'（画面は直近 {LOG_MAX_LINES} 行。全ログ: {LOG_DIR / "gui.log"}）')\
+        .pack(side=tk.LEFT)
         self.txt = tk.Text(lf, wrap=tk.NONE, height=18); self.txt.pack(fill=tk.BOTH, expand=True)
 
     # ===== ヘルパ群 =====
-    def _load_category_map(self) -> dict[str, str]:
-        """config/category_map.json を優先。無ければビルトイン。"""
-        cfg = (REPO_ROOT / "config" / "category_map.json")
-        if cfg.exists():
-            try:
-                data = json.loads(cfg.read_text(encoding="utf-8"))
-                return {str(k): str(v) for k, v in data.items()}
-            except Exception:
-                pass
-        return {"1":"寿司","2":"弁当","3":"温総菜","4":"冷総菜","5":"軽食","6":"魚惣菜"}
-    
-    def _cat_name_from_code(self, code: str | int) -> str:
-        return self.category_map.get(str(code), str(code))
-
-    def _dates_to_range(self, dates_list: list[str]) -> str:
-        """['2024-12-24','2025-01-03'] -> '2024-12–2025-01'（同月なら 'YYYY-MM'）"""
-        try:
-            ds = sorted(datetime.strptime(str(d).strip(), "%Y-%m-%d") for d in dates_list if str(d).strip())
-        except Exception:
-            return ",".join(map(str, dates_list))
-        if not ds:
-            return ""
-        a, b = ds[0], ds[-1]
-        if a.year == b.year and a.month == b.month:
-            return f"{a.year}-{a.month:02d}"
-        return f"{a.year}-{a.month:02d}–{b.year}-{b.month:02d}"
-
     def _read_dates_list(self) -> list[str]:
         """GUI入力の 'YYYY-MM-DD,YYYY-MM-DD,...' を list[str] 化（/ 混在も '-' に統一）"""
         raw = (self.var_dates.get() or "").strip()
@@ -214,46 +334,10 @@ class TopNGuiApp:
     def _build_title_preview(self, event_name: str, category_code: str | int,
                             dates_list: list[str], page_no: int,
                             tmpl: str | None, no_date_in_title: bool) -> str:
-        """スクリプトと同等のタイトル構築。イベント名が空ならテンプレを適用。年は末尾日基準。"""
-        cat = self._cat_name_from_code(category_code)
-        ev = (event_name or "").strip()
-
-        dlist = [] if no_date_in_title else [str(d) for d in dates_list]
-
-        if dlist:
-            ds_sorted = sorted(dlist)
-            last_date = ds_sorted[-1]
-            last_date_short = last_date[5:].replace("-", "/")
-            yy, yyyy = last_date[2:4], last_date[:4]
-        else:
-            last_date = last_date_short = yy = yyyy = ""
-
-        if ev:
-            return f"{ev} {cat}単品データ（{page_no}）"
-
-        default_tmpl = "{yy}年 {range} {cat}単品データ（{page}）"
-        tmpl = (tmpl or default_tmpl).strip()
-
-        values = {
-            "event": ev,
-            "cat": cat,
-            "category": str(category_code),
-            "dates": ",".join(dlist),
-            "dates_short": ",".join(s[5:].replace("-", "/") for s in dlist),
-            "range": self._dates_to_range(dlist),
-            "year": yyyy,
-            "yy":   yy,
-            "date": last_date,
-            "date_short": last_date_short,
-            "page": str(page_no),
-        }
-
-        # 1) $var → 2) {var}
-        s = Template(tmpl).safe_substitute(values)
-        try:
-            return s.format(**values)
-        except Exception:
-            return s
+        """スクリプトと同じ RunContext でタイトルを作る（イベント名が空ならテンプレを適用。年は末尾日基準）"""
+        run = RunContext(category_code, dates_list, event_name, tmpl, no_date_in_title,
+                         category_map=self.category_map)
+        return run.title(page_no)
 
     # ===== コールバック群 =====
     def on_preview_title(self) -> None:
@@ -391,13 +475,15 @@ class TopNGuiApp:
         return [d for d in raw.split(',') if d]
 
     def _collect_needed_csv(self) -> list[Path]:
+        """必要な月次ファイル（圧縮版があればそれ。どれも無い月は非圧縮名を返す → 事前チェックで不足扱い）"""
         csvs: set[Path] = set()
         pat = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
         for d in self._parse_dates():
             m = pat.match(d)
             if not m: continue
             yyyy, mm = m.group(1), m.group(2)
-            csvs.add(MATERIAL_DIR / yyyy / f'IT_{yyyy}{mm}.csv')
+            found = find_month_file(MATERIAL_DIR, int(yyyy), int(mm))
+            csvs.add(found or MATERIAL_DIR / yyyy / f'IT_{yyyy}{mm}.csv')
         return sorted(csvs)
 
     def _precheck(self) -> tuple[bool, str]:
@@ -421,7 +507,11 @@ class TopNGuiApp:
         # materials
         missing = [str(p) for p in self._collect_needed_csv() if not p.exists()]
         if missing:
-            return False, '必要なCSVが見つかりません:\n' + '\n'.join(missing)
+            return False, ('必要なCSVが見つかりません（' + ' / '.join(available_suffixes()) + ' のいずれか）:\n'
+                           + '\n'.join(missing))
+        # Arrow キャッシュは合算済みデータを読むため、品質チェックとは併用できない
+        if self.var_strict.get() and self.arrow_ok and self.var_arrow.get():
+            return False, '「データ不備があれば中止 (--strict)」と「Arrow 共有キャッシュ」は同時に使えません'
         # store master（あればチェック）
         if not STORE_MASTER.exists():
             # 厳密必須としないが警告に含める
@@ -437,17 +527,16 @@ class TopNGuiApp:
 
     
     # ===== 実行・プロセス制御 =====
-    def _on_run(self):
-        ok, msg = self._precheck()
-        if not ok:
-            messagebox.showerror('事前チェック', msg)
-            return
+    def _build_cli_args(self, stop_file: Path) -> list[str]:
+        """いまのフォーム内容から CLI 引数を組み立てる（単発実行・ジョブ共通）"""
         args = [
             sys.executable, '-m', CLI_SIMPLE,
             '--event-name', self.var_event.get() or '',
             '--category', self.var_category.get(),
             '--dates', ','.join(self._parse_dates()),
             '--out', self.var_out.get(),
+            '--progress-fd', '2',   # 進捗JSONは stderr で受け取る（stdout はログ）
+            '--stop-file', str(stop_file),
         ]
         if self.var_title_template.get().strip():
             args += ['--title-template', self.var_title_template.get().strip()]
@@ -456,31 +545,238 @@ class TopNGuiApp:
         if self.var_split.get():
             # split-dir は既存でも未作成でもOK（作成は CLI/GUI 側で実施）
             args += ['--split-by-store', '--split-dir', self.var_split_dir.get()]
+            args += ['--write-queue', str(WRITE_QUEUE)]
+            if self.var_resume.get():
+                args += ['--resume']
+        if self.var_strict.get():
+            args += ['--strict']
+        if self.arrow_ok and self.var_arrow.get():
+            args += ['--arrow-cache']
+        if self.var_optimize.get():
+            args += ['--optimize']
+        if self.var_stores.get().strip():
+            # 店番や店舗マスターのグループ名（例: 3,17,25）。再発行で split の他店ファイルはそのまま
+            args += ['--stores', self.var_stores.get().strip()]
+        if self.var_rollup.get().strip():
+            # 店舗マスターの列名。店別ページに加えてグループ単位のページを出す
+            args += ['--rollup', self.var_rollup.get().strip()]
+        mode = COMPARE_MODES.get(self.var_compare.get(), '')
+        if mode:
+            args += ['--compare-previous-year', mode]
+        return args
+
+    def _on_run(self):
+        ok, msg = self._precheck()
+        if not ok:
+            messagebox.showerror('事前チェック', msg)
+            return
+        args = self._build_cli_args(STOP_FILE)
         self._append_log(f"[gui] 実行コマンド:\n  {' '.join(args)}\n\n")
-        t = threading.Thread(target=self._run_proc, args=(args,), daemon=True)
+        t = threading.Thread(target=self._run_proc, args=(args, self.var_category.get()), daemon=True)
         t.start()
 
-    def _run_proc(self, args):
+    def _run_proc(self, args, category: str):
         env = os.environ.copy(); env['PYTHONIOENCODING']='utf-8'; env['PYTHONUTF8']='1'
+        self.progress_queue.put({'event': 'reset'})
+        STOP_FILE.unlink(missing_ok=True)
         self.proc = subprocess.Popen(
-            args, cwd=str(REPO_ROOT), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            args, cwd=str(REPO_ROOT), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
             text=True, encoding='utf-8', errors='replace', env=env)
-        assert self.proc and self.proc.stdout is not None
+        assert self.proc and self.proc.stdout is not None and self.proc.stderr is not None
+        t_err = threading.Thread(target=self._read_progress, args=(self.proc.stderr,), daemon=True)
+        t_err.start()
         for line in self.proc.stdout:
             self.log_queue.put(line)
+        t_err.join()
         code = self.proc.wait()
         self.log_queue.put(f"[done] code={code}\n")
-        self._postcheck_and_notify(code)
+        self._postcheck_and_notify(code, category)
+
+    def _read_progress(self, stream):
+        """stderr: JSON の進捗イベントは進捗キューへ、それ以外（例外など）はログへ"""
+        for line in stream:
+            if line.startswith('{'):
+                try:
+                    self.progress_queue.put(json.loads(line))
+                    continue
+                except ValueError:
+                    pass
+            self.log_queue.put(line)
+
+    def _apply_progress(self, ev: dict):
+        kind = ev.get('event')
+        if kind == 'reset':
+            self.var_progress.set(0.0); self.var_progress_text.set('')
+        elif kind == 'stage_start':
+            self.var_progress_text.set(f"{ev.get('stage')} …")
+        elif kind == 'stores_start':
+            self.var_progress.set(0.0)
+            self.var_progress_text.set(f"0/{ev.get('total', 0)} 店")
+        elif kind == 'store_done':
+            done, total = ev.get('done', 0), ev.get('total', 0) or 1
+            eta = ev.get('eta_sec')
+            eta_s = '-' if eta is None else f"{int(eta)//60:02d}:{int(eta)%60:02d}"
+            self.var_progress.set(100.0 * done / total)
+            self.var_progress_text.set(
+                f"{done}/{total} 店  {ev.get('stores_per_sec', 0):.2f} 店/秒  残り {eta_s}")
+        elif kind == 'run_end':
+            self.var_progress.set(100.0)
+            mb = ev.get('bytes', 0) / 1e6
+            self.var_progress_text.set(f"完了 {ev.get('elapsed_sec', 0):.1f} 秒  {mb:.1f} MB")
+
+    # ===== ジョブキュー =====
+    def _on_enqueue(self):
+        ok, msg = self._precheck()
+        if not ok:
+            messagebox.showerror('事前チェック', msg)
+            return
+        jid = next(self._job_ids)
+        job = Job(id=jid, args=[], category=self.var_category.get(),
+                  dates=','.join(self._parse_dates()), event=self.var_event.get() or '',
+                  out=self.var_out.get(), targets=self._output_targets())
+        job.args = self._build_cli_args(job.stop_file)
+        self.jobs[jid] = job
+        self.tree_jobs.insert('', tk.END, iid=str(jid), values=self._job_row(job))
+        self._append_log(f"[job#{jid}] 追加: {' '.join(job.args)}\n")
+        self._ensure_job_workers()
+        self._job_pending.put(jid)
+
+    def _ensure_job_workers(self):
+        self._job_workers = [t for t in self._job_workers if t.is_alive()]
+        while len(self._job_workers) < JOB_WORKERS:
+            t = threading.Thread(target=self._job_worker, daemon=True)
+            t.start()
+            self._job_workers.append(t)
+
+    def _output_targets(self) -> frozenset[str]:
+        """このフォームの出力先（同じ out / split-dir を使うジョブはジャーナル・マニフェストも共有する）"""
+        targets = {str(Path(self.var_out.get()).resolve())}
+        if self.var_split.get():
+            targets.add(str(Path(self.var_split_dir.get()).resolve()))
+        return frozenset(targets)
+
+    def _job_worker(self):
+        while True:
+            jid = self._job_pending.get()
+            job = self.jobs.get(jid)
+            if job is None or job.status != '待機':
+                continue  # 取消済み
+            with self._job_cond:
+                if self._busy_targets & job.targets:
+                    self._set_job(job, detail='出力先が使用中のため待機')
+                while self._busy_targets & job.targets and job.status == '待機':
+                    self._job_cond.wait()
+                if job.status != '待機':
+                    continue  # 待っている間に取消
+                self._busy_targets |= job.targets
+            try:
+                self._run_job(job)
+            finally:
+                with self._job_cond:
+                    self._busy_targets -= job.targets
+                    self._job_cond.notify_all()
+
+    def _set_job(self, job: Job, status: str | None = None, detail: str | None = None):
+        if status is not None:
+            job.status = status
+        if detail is not None:
+            job.detail = detail
+        self._job_updates.put(job.id)
+
+    def _run_job(self, job: Job):
+        env = os.environ.copy(); env['PYTHONIOENCODING']='utf-8'; env['PYTHONUTF8']='1'
+        job.stop_file.unlink(missing_ok=True)
+        self._set_job(job, '実行中', '')
+        try:
+            job.proc = subprocess.Popen(
+                job.args, cwd=str(REPO_ROOT), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', errors='replace', env=env)
+        except Exception as e:
+            job.log.append(f'{e}\n'); self._set_job(job, '失敗', str(e))
+            return
+
+        def _read_err():
+            for line in job.proc.stderr:
+                if line.startswith('{'):
+                    try:
+                        ev = json.loads(line)
+                    except ValueError:
+                        ev = None
+                    if ev is not None:
+                        if ev.get('event') == 'store_done':
+                            self._set_job(job, detail=f"{ev.get('done')}/{ev.get('total')} 店")
+                        elif ev.get('event') == 'stage_start':
+                            self._set_job(job, detail=str(ev.get('stage')))
+                        continue
+                job.log.append(line)
+                self.log_queue.put(f'[job#{job.id}] {line}')
+
+        t_err = threading.Thread(target=_read_err, daemon=True); t_err.start()
+        for line in job.proc.stdout:
+            job.log.append(line)
+            self.log_queue.put(f'[job#{job.id}] {line}')
+        t_err.join()
+        code = job.proc.wait()
+        job.stop_file.unlink(missing_ok=True)
+        status = JOB_STATUS_BY_CODE.get(code, '失敗')
+        self._set_job(job, status, f'code={code}')
+        self.log_queue.put(f'[job#{job.id}] {status} code={code}\n')
+
+    def _job_row(self, job: Job):
+        st = f'{job.status} {job.detail}'.strip()
+        return (job.id, job.category, job.dates, job.event, job.out, st)
+
+    def _selected_job(self) -> Job | None:
+        sel = self.tree_jobs.selection()
+        return self.jobs.get(int(sel[0])) if sel else None
+
+    def _on_cancel_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if job.status == '待機':
+            self._set_job(job, '取消')
+            with self._job_cond:
+                self._job_cond.notify_all()  # 出力先の空き待ちをしていれば起こす
+        elif job.status == '実行中' and job.proc and job.proc.poll() is None:
+            if job.stop_file.exists():
+                job.proc.terminate()  # 2回目は強制終了
+            else:
+                job.stop_file.touch()  # 現在の店を書き終えて停止
+                self._set_job(job, detail='停止要求中')
+
+    def _on_show_job_log(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        top = tk.Toplevel(self.root); top.title(f'job#{job.id} ログ')
+        style_toplevel(top, self.theme)
+        txt = tk.Text(top, wrap=tk.NONE, width=120, height=30); txt.pack(fill=tk.BOTH, expand=True)
+        txt.insert(tk.END, ' '.join(job.args) + '\n\n' + ''.join(job.log))
+
+    def _on_clear_jobs(self):
+        for jid, job in list(self.jobs.items()):
+            if job.status in DONE_STATUSES:
+                del self.jobs[jid]
+                self.tree_jobs.delete(str(jid))
 
     # ===== 後処理・通知 =====
-    def _postcheck_and_notify(self, code: int):
+    def _postcheck_and_notify(self, code: int, category: str):
         try:
             out_file = Path(self.var_out.get())
             split_dir = Path(self.var_split_dir.get())
             exists_main = out_file.exists()
             split_count = 0
-            if self.var_split.get() and split_dir.exists():
-                split_count = len(list(split_dir.glob('*.xlsx')))
+            if self.var_split.get():
+                # CLI が書く実行マニフェスト（大分類ごと）を読む（split/<店番>/ を走査しない）
+                mf = read_manifest(manifest_path_for(out_file, True, split_dir, category))
+                if mf is not None:
+                    split_count = mf.get('file_count', 0)
+                    self._append_log(f"[postcheck] manifest: {split_count} files, "
+                                     f"{mf.get('total_bytes', 0) / 1e6:.1f} MB, complete={mf.get('complete')}\n")
+                elif split_dir.exists():
+                    cat = category_name(category, self.category_map)
+                    split_count = len(list(split_dir.glob(f'*/*_{cat}単品データ.xlsx')))
             self._append_log(f"[postcheck] main_exists={exists_main} split_count={split_count}\n")
             if code == 0:
                 msg = f"処理完了\n本体: {'あり' if exists_main else 'なし'}\nsplit: {split_count} 件"
@@ -491,27 +787,81 @@ class TopNGuiApp:
                 if self.var_open_after_main.get() and exists_main:
                     try: os.startfile(out_file)  # type: ignore[attr-defined]
                     except Exception: pass
+            elif code == EXIT_CANCELLED:
+                messagebox.showinfo('停止', '停止しました（完了した店のファイルは保存済み）\n'
+                                          '「続きから再開」をオンにして実行すると残りの店だけ出力します')
+            elif code == EXIT_DATA_QUALITY:
+                messagebox.showerror('データ不備', '売上データの品質チェックで問題が見つかったため中止しました\n'
+                                                 '詳細はログの [dq] 行を確認してください')
             else:
                 messagebox.showerror('失敗', '処理がエラー終了しました')
         except Exception as e:
             self._append_log(f"[postcheck-error] {e}\n")
 
     def _on_stop(self):
-        if self.proc and self.proc.poll() is None:
-            self.proc.terminate(); self._append_log('[gui] 停止\n')
+        if not (self.proc and self.proc.poll() is None):
+            return
+        if STOP_FILE.exists():
+            # 2回目の押下: 待たずに強制終了
+            self._force_stop()
+            return
+        # 協調停止: CLI は1店書き終えるごとに停止ファイルを確認する
+        STOP_FILE.touch()
+        self._append_log('[gui] 停止要求（現在の店を書き終えて停止します。もう一度押すと強制終了）\n')
+        proc = self.proc
+        self.root.after(FORCE_STOP_AFTER_MS, lambda: self._force_stop(proc))
+
+    def _force_stop(self, proc: subprocess.Popen | None = None):
+        proc = proc or self.proc
+        if proc and proc.poll() is None:
+            proc.terminate(); self._append_log('[gui] 強制停止\n')
 
     # ===== ログ更新・ポーリング =====
     def _append_log(self, s: str):
-        self.txt.insert(tk.END, s)
+        # どのスレッドからでも呼べるよう、画面反映は _poll_log_queue に任せる
+        self.log_queue.put(s)
+
+    def _flush_log_queue(self, max_items: int = 10_000):
+        """キューを吸い出し、ファイルへは全件・画面へはレベル以上を1回の insert で書く"""
+        batch: list[str] = []
+        try:
+            while len(batch) < max_items:
+                batch.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+        min_level = getattr(logging, self.var_log_level.get(), logging.INFO)
+        shown: list[str] = []
+        for s in batch:
+            level = _log_level_of(s)
+            self.file_log.log(level, s.rstrip('\n'))
+            if level >= min_level:
+                shown.append(s)
+        if not shown:
+            return
+        self.txt.insert(tk.END, ''.join(shown))
+        # リングバッファ: 上限を超えた分を先頭から削除
+        n_lines = int(self.txt.index('end-1c').split('.')[0])
+        if n_lines > LOG_MAX_LINES:
+            self.txt.delete('1.0', f'{n_lines - LOG_MAX_LINES + 1}.0')
         self.txt.see(tk.END)
 
     def _poll_log_queue(self):
+        self._flush_log_queue()
+        try:
+            while True:
+                self._apply_progress(self.progress_queue.get_nowait())
+        except queue.Empty:
+            pass
         try:
             while True:
-                self._append_log(self.log_queue.get_nowait())
+                job = self.jobs.get(self._job_updates.get_nowait())
+                if job is not None and self.tree_jobs.exists(str(job.id)):
+                    self.tree_jobs.item(str(job.id), values=self._job_row(job))
         except queue.Empty:
             pass
-        self.root.after(80, self._poll_log_queue)
+        self.root.after(LOG_POLL_MS, self._poll_log_queue)
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,136 @@
+# scripts/arrow_dataset.py
+"""
+正規化済み売上の Arrow IPC（Feather v2）キャッシュ。メモリマップで開く（任意。pyarrow が必要）。
+
+    data/cache/arrow/IT_YYYYMM.<fp>.arrow   … load_sales と同じ列（月全体・合算済み）
+
+- 初回はその月の CSV を read_sales_raw → normalize_sales して非圧縮の Feather v2 で書く
+  （非圧縮でないとメモリマップしてもゼロコピーにならない）。
+- 2回目以降は CSV をパースせず memory_map で開く。GUI のジョブ・バッチ・serve が
+  同じ月を同時に使っても、実体は OS のページキャッシュ上の1つだけ。
+- <fp> は月次ファイルの (名前, サイズ, mtime)。差し替えれば新しいファイルを作る。
+- 日付・店舗の絞り込みは Arrow 上で行い、pandas へ変換する（コピーする）のは必要な行だけ。
+  「マップしたバイト数」と「コピーしたバイト数」を MapStats で返す。
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from scripts.make_topn_simple_refactor import normalize_sales, read_sales_raw
+from scripts.sales_source import find_month_file, month_stem, source_fingerprint
+from scripts.template_snapshot import CACHE_DIR
+
+ARROW_DIR = CACHE_DIR / "arrow"
+ARROW_VERSION = 1
+
+
+def arrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+@dataclass
+class MapStats:
+    files: int = 0
+    built: int = 0              # 今回 CSV から作り直した月数
+    mapped_bytes: int = 0       # memory_map したファイルの合計サイズ
+    arrow_copied_bytes: int = 0  # 絞り込みで Arrow 側に確保したバイト数
+    pandas_bytes: int = 0       # pandas へ変換した DataFrame のサイズ（= 実際のコピー）
+    sec: float = 0.0
+
+    def line(self) -> str:
+        return (f"[arrow] {self.files} files mapped={self.mapped_bytes / 1e6:.1f}MB "
+                f"copied={(self.arrow_copied_bytes + self.pandas_bytes) / 1e6:.1f}MB "
+                f"(arrow {self.arrow_copied_bytes / 1e6:.1f}MB + pandas {self.pandas_bytes / 1e6:.1f}MB) "
+                f"built={self.built} {self.sec:.2f}s")
+
+    def to_dict(self) -> dict:
+        return {"files": self.files, "built": self.built, "mapped_bytes": self.mapped_bytes,
+                "arrow_copied_bytes": self.arrow_copied_bytes, "pandas_bytes": self.pandas_bytes,
+                "sec": round(self.sec, 3)}
+
+
+def month_arrow_path(sales_root: Path, y: int, m: int, arrow_dir: Path = ARROW_DIR) -> Path | None:
+    f = find_month_file(sales_root, y, m)
+    if f is None:
+        return None
+    fp = source_fingerprint(f, salt=f"arrow{ARROW_VERSION}")
+    return Path(arrow_dir) / f"{month_stem(y, m)}.{fp}.arrow"
+
+
+def build_month_arrow(sales_root: Path, y: int, m: int, arrow_dir: Path = ARROW_DIR) -> Path:
+    """その月の CSV を正規化して Feather v2（非圧縮）で書く。古い fp のファイルは消す"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    path = month_arrow_path(sales_root, y, m, arrow_dir)
+    if path is None:
+        raise FileNotFoundError(f"no monthly file for {y}-{m:02d} under {sales_root}")
+    df = normalize_sales(read_sales_raw(sales_root, dates=[date(y, m, 1)]))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        feather.write_feather(table, str(tmp), compression="uncompressed")
+        os.replace(tmp, path)  # 同時に作った別プロセスとは後勝ち（中身は同じ）
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    for old in path.parent.glob(f"{month_stem(y, m)}.*.arrow"):
+        if old != path:
+            try:
+                old.unlink()
+            except OSError:
+                pass  # 他プロセスがマップ中（Windows）なら次回
+    return path
+
+
+def load_sales_arrow(sales_root: Path, dates, stores=None,
+                     arrow_dir: Path = ARROW_DIR) -> tuple[pd.DataFrame, MapStats]:
+    """
+    load_sales と同じ形の DataFrame を、月ごとの Arrow ファイルをメモリマップして作る。
+    dates / stores の絞り込みは Arrow 上で行う。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+
+    t0 = time.perf_counter()
+    stats = MapStats()
+    dates = sorted({pd.to_datetime(d).date() for d in dates})
+    date_set = pa.array(dates, type=pa.date32())
+    store_set = None if stores is None else pa.array([str(s) for s in stores], type=pa.string())
+
+    tables = []
+    for y, m in sorted({(d.year, d.month) for d in dates}):
+        path = month_arrow_path(sales_root, y, m, arrow_dir)
+        if path is None:
+            continue
+        if not path.exists():
+            build_month_arrow(sales_root, y, m, arrow_dir)
+            stats.built += 1
+        table = feather.read_table(str(path), memory_map=True)  # ゼロコピー（ページは OS が共有）
+        stats.files += 1
+        stats.mapped_bytes += path.stat().st_size
+
+        before = pa.total_allocated_bytes()
+        mask = pc.is_in(table["date"], value_set=date_set)
+        if store_set is not None:
+            mask = pc.and_(mask, pc.is_in(table["store_id"], value_set=store_set))
+        tables.append(table.filter(mask))
+        stats.arrow_copied_bytes += max(0, pa.total_allocated_bytes() - before)
+
+    if not tables:
+        raise FileNotFoundError(f"no monthly files for {dates[:1]}.. under {sales_root}")
+    df = pa.concat_tables(tables).to_pandas()  # date32 → datetime.date（load_sales と同じ）
+    stats.pandas_bytes = int(df.memory_usage(deep=True).sum())
+    stats.sec = time.perf_counter() - t0
+    return df, stats
@@ -0,0 +1,266 @@
+# scripts/bench_hot_paths.py
+"""
+ホットパスのマイクロベンチマーク（回帰チェック）。ネットワーク・実データ不要。
+
+固定シードの合成データとリポジトリ内のテンプレートで、次の関数を個別に計測する:
+
+    normalize_sales            : load_sales の正規化（日付変換・欠損補完・同一キー合算）
+    aggregate_topn             : 大分類絞込 → (date, store, jan) 合算 → 店×日 TopN
+    copy_conditional_formatting: シート複製ごとの条件付き書式の再適用
+    add_pages_for_one_store    : 1店分のページ描画（_add_pages_for_one_store）
+    save_per_store_files       : まとめ版 xlsx → 店別ファイルへの分割保存
+
+各ベンチは warmup 1回のあと repeat 回の最短時間を採る。マシン差を打ち消すため、
+同じ実行内で固定の較正ワークロードも測り「較正比（ベンチ時間 / 較正時間）」で
+保存済みのベースライン（config/bench_baseline.json）と比べる。
+較正比が ベースライン × (1 + tolerance) を超えたら SLOW として終了コード 1。
+
+    python -m scripts.bench_hot_paths                      # ベースラインと比較
+    python -m scripts.bench_hot_paths --only aggregate_topn --repeat 9
+    python -m scripts.bench_hot_paths --update             # 意図した変更の後にベースラインを更新
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import platform
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.formatting.formatting import ConditionalFormattingList
+
+from scripts.make_topn_simple_refactor import (
+    _add_pages_for_one_store, aggregate_topn, build_combined_workbook, build_totals,
+    copy_conditional_formatting, normalize_sales, save_per_store_files,
+)
+from scripts.page_layout import PageLayout
+from scripts.template_snapshot import DEFAULT_TEMPLATE, load_template_snapshot
+
+BASELINE_PATH = Path(__file__).resolve().parents[1] / "config" / "bench_baseline.json"
+BASELINE_VERSION = 1
+DEFAULT_TOLERANCE = 0.50
+DEFAULT_REPEAT = 7
+
+# 合成データの規模（月次CSVの1週間・中規模チェーン相当を縮小）
+N_STORES = 20
+N_DAYS = 7
+N_JANS = 300
+N_CATEGORIES = 6
+SEED = 20241224
+
+
+# === 合成データ ===
+def make_raw_sales(n_stores: int = N_STORES, n_days: int = N_DAYS, n_jans: int = N_JANS,
+                   seed: int = SEED) -> pd.DataFrame:
+    """read_sales_raw と同じ形（date は datetime64、金額は欠損あり、同一キーの重複行あり）"""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2024-12-20", periods=n_days, freq="D")
+    stores = np.arange(1, n_stores + 1)
+    jans = 4900000000000 + np.arange(n_jans)
+    idx = pd.MultiIndex.from_product([days, stores, jans], names=["date", "store_id", "jan"]).to_frame(index=False)
+    idx = pd.concat([idx, idx.sample(frac=0.1, random_state=seed)], ignore_index=True)  # 重複行（合算対象）
+    n = len(idx)
+    amount = rng.integers(100, 20000, n).astype(float)
+    amount[rng.random(n) < 0.01] = np.nan
+    return pd.DataFrame({
+        "date": idx["date"],
+        "store_id": idx["store_id"].astype(str),
+        "category_large": (idx["jan"] % N_CATEGORIES + 1).astype(str),
+        "jan": idx["jan"].astype(str),
+        "name": "商品" + (idx["jan"] % 100000).astype(str),
+        "amount": amount,
+        "qty": rng.integers(1, 50, n).astype(float),
+        "discount": rng.integers(0, 500, n).astype(float),
+    })
+
+
+def _dates(n_days: int = N_DAYS) -> list[date]:
+    return [date(2024, 12, 20) + timedelta(days=i) for i in range(n_days)]
+
+
+def _make_title(date_str: str, page_no: int) -> str:
+    return f"ベンチ {date_str} 寿司単品データ（{page_no}）"
+
+
+# === ベンチ本体（setup → 計測対象の関数を返す） ===
+def bench_normalize_sales():
+    raw = make_raw_sales()
+    dates = _dates()
+    return lambda: normalize_sales(raw, dates)
+
+
+def bench_aggregate_topn():
+    df = normalize_sales(make_raw_sales(), _dates())
+    dates = _dates()
+    return lambda: aggregate_topn(df, category=1, top_n=35, dates=dates)
+
+
+def bench_copy_conditional_formatting():
+    snap = load_template_snapshot(DEFAULT_TEMPLATE)
+    # ブック生成・copy_worksheet は setup 側で済ませ、計測は条件付き書式の転写だけ
+    wb = snap.new_workbook()
+    ws_tpl = wb["TEMPLATE"]
+    sheets = [wb.copy_worksheet(ws_tpl) for _ in range(10)]
+
+    def run():
+        for ws in sheets:
+            ws.conditional_formatting = ConditionalFormattingList()  # 毎回まっさらなシートに貼る
+            copy_conditional_formatting(ws, ws_tpl, cf_items=snap.cf_items)
+    return run
+
+
+def _render_fixture(n_stores: int):
+    snap = load_template_snapshot(DEFAULT_TEMPLATE)
+    layout = PageLayout.from_geometry(snap.geometry)
+    dates = _dates()
+    raw = make_raw_sales(n_stores=n_stores)
+    df = normalize_sales(raw, dates)
+    topn = aggregate_topn(df, category=1, top_n=layout.max_rank, dates=dates)
+    totals = build_totals(df, topn, 1, dates)
+    return snap, layout, dates, df, topn, totals
+
+
+def bench_add_pages_for_one_store():
+    snap, layout, dates, _, topn, (total_all, total_cat) = _render_fixture(n_stores=1)
+    store = next(iter(topn))
+
+    def run():
+        wb = snap.new_workbook()
+        _add_pages_for_one_store(
+            wb, wb["TEMPLATE"], store=store, store_short_name="ベンチ店", dates=dates,
+            day_map=topn[store], cat_name="寿司", event_name="ベンチ",
+            total_all_dict=total_all, total_cat_dict=total_cat, category=1,
+            make_title=_make_title, cf_items=snap.cf_items, layout=layout,
+        )
+    return run
+
+
+def bench_save_per_store_files():
+    snap, layout, dates, df, topn, totals = _render_fixture(n_stores=2)
+    tmp = Path(tempfile.mkdtemp(prefix="topn_bench_"))
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    master = tmp / "master.xlsx"
+    wb = build_combined_workbook(DEFAULT_TEMPLATE, topn, {s: f"店{s}" for s in topn}, 1, dates, "ベンチ", df,
+                                 layout=layout, totals=totals)
+    wb.save(master)
+    return lambda: save_per_store_files(master, tmp / "split", "寿司")
+
+
+BENCHES = {
+    "normalize_sales": bench_normalize_sales,
+    "aggregate_topn": bench_aggregate_topn,
+    "copy_conditional_formatting": bench_copy_conditional_formatting,
+    "add_pages_for_one_store": bench_add_pages_for_one_store,
+    "save_per_store_files": bench_save_per_store_files,
+}
+
+
+# === 計測 ===
+def best_of(fn, repeat: int = DEFAULT_REPEAT) -> float:
+    fn()  # warmup（import・キャッシュの初回コストを除く）
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _calibration_workload():
+    """マシン速度の物差し（pandas の groupby と Python のループ。対象コードとは独立）"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"k": rng.integers(0, 5000, 200_000), "v": rng.random(200_000)})
+
+    def run():
+        df.groupby("k")["v"].sum()
+        sum(i * i for i in range(200_000))
+    return run
+
+
+def run_benches(names=None, repeat: int = DEFAULT_REPEAT) -> dict:
+    calib = best_of(_calibration_workload(), repeat)
+    results = {}
+    for name in names or BENCHES:
+        sec = best_of(BENCHES[name](), repeat)
+        results[name] = {"sec": round(sec, 6), "ratio": round(sec / calib, 4)}
+    return {"calibration_sec": round(calib, 6), "benches": results}
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_baseline(run: dict, path: Path = BASELINE_PATH, merge: dict | None = None) -> Path:
+    benches = dict((merge or {}).get("benches", {}))
+    benches.update(run["benches"])
+    doc = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "calibration_sec": run["calibration_sec"],
+        "benches": benches,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(doc, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    return path
+
+
+def compare(run: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """[bench] 行を出しつつ、許容幅を超えて遅くなったベンチ名を返す"""
+    slow = []
+    base = baseline.get("benches", {})
+    for name, r in run["benches"].items():
+        b = base.get(name)
+        if b is None:
+            print(f"[bench] {name:28s} {r['sec'] * 1000:8.1f}ms  ratio={r['ratio']:.3f}  (ベースラインなし)")
+            continue
+        rel = r["ratio"] / b["ratio"] if b["ratio"] else float("inf")
+        status = "SLOW" if rel > 1 + tolerance else "ok"
+        if status == "SLOW":
+            slow.append(name)
+        print(f"[bench] {name:28s} {r['sec'] * 1000:8.1f}ms  ratio={r['ratio']:.3f}  "
+              f"x{rel:.2f} vs baseline  {status}")
+    return slow
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ホットパスのマイクロベンチマーク（ベースライン比較）")
+    parser.add_argument("--only", type=str, default="", help="対象ベンチをカンマ区切り（既定: 全部）")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="計測回数（最短時間を採用）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"ベースライン比で許容する遅延（既定 {DEFAULT_TOLERANCE:.0%}）")
+    parser.add_argument("--baseline", type=str, default=str(BASELINE_PATH))
+    parser.add_argument("--update", action="store_true", help="計測結果でベースラインを更新する")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHES)
+    unknown = [n for n in names if n not in BENCHES]
+    if unknown:
+        parser.error(f"unknown bench: {', '.join(unknown)}（{', '.join(BENCHES)}）")
+
+    result = run_benches(names, repeat=args.repeat)
+    print(f"[bench] calibration {result['calibration_sec'] * 1000:.1f}ms")
+    baseline = load_baseline(args.baseline)
+    if args.update:
+        path = write_baseline(result, args.baseline, merge=baseline)
+        print(f"[ok] baseline updated → {path}")
+        raise SystemExit(0)
+
+    slow = compare(result, baseline, args.tolerance)
+    if slow:
+        print(f"[error] ベースラインより遅くなりました: {', '.join(slow)}")
+        raise SystemExit(1)
+    print("[ok] all benches within tolerance")
@@ -0,0 +1,80 @@
+# scripts/bundle.py
+"""
+店別ブックを1つ（または店グループごと）の zip に直接流し込む出力モード（--bundle zip）。
+
+- 店別ファイルを個別にディスクへ置かず、メモリ上の xlsx バイト列をそのまま zip に追記する
+- zip 内は split と同じ <店番>/<店番>_<大分類名>単品データ.xlsx 構成
+- xlsx 自体が圧縮済みなので格納は無圧縮（ZIP_STORED）
+- group_size > 0 なら N 店ごとに _part01, _part02 ... と分ける
+- 一時ファイルに書いて close 時に rename（中断時は書きかけを残さない）
+"""
+from __future__ import annotations
+
+import os
+import time
+import zipfile
+from pathlib import Path
+
+from scripts.template_snapshot import file_sha256
+
+
+class ZipBundleWriter:
+    def __init__(self, out_dir: Path, base_name: str, group_size: int = 0):
+        self.out_dir = Path(out_dir)
+        self.base_name = base_name
+        self.group_size = max(0, int(group_size))
+        self.bundles: list[dict] = []
+        self._zip: zipfile.ZipFile | None = None
+        self._tmp: Path | None = None
+        self._final: Path | None = None
+        self._stores: list[str] = []
+        self._part = 0
+
+    def _bundle_name(self) -> str:
+        if self.group_size:
+            return f"{self.base_name}_part{self._part:02d}.zip"
+        return f"{self.base_name}.zip"
+
+    def _open_next(self) -> None:
+        self._part += 1
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._final = self.out_dir / self._bundle_name()
+        self._tmp = self._final.with_name(f".{self._final.name}.{os.getpid()}.tmp")
+        self._zip = zipfile.ZipFile(self._tmp, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        self._stores = []
+
+    def _close_current(self) -> None:
+        if self._zip is None:
+            return
+        self._zip.close()
+        os.replace(self._tmp, self._final)
+        self.bundles.append({
+            "path": self._final.name,
+            "size": self._final.stat().st_size,
+            "sha256": file_sha256(self._final),
+            "stores": list(self._stores),
+        })
+        self._zip = self._tmp = self._final = None
+
+    def add(self, relpath, data: bytes, store=None) -> str:
+        """relpath（split と同じ相対パス）で data を追記し、格納先 zip 名を返す"""
+        if self._zip is None or (self.group_size and len(self._stores) >= self.group_size):
+            self._close_current()
+            self._open_next()
+        info = zipfile.ZipInfo(Path(relpath).as_posix(), date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+        self._stores.append(str(store) if store is not None else "")
+        return self._final.name
+
+    def close(self) -> list[dict]:
+        self._close_current()
+        return self.bundles
+
+    def abort(self) -> None:
+        """書きかけの zip を破棄（完了済みの part は残す）"""
+        if self._zip is not None:
+            self._zip.close()
+            if self._tmp is not None and self._tmp.exists():
+                self._tmp.unlink()
+            self._zip = self._tmp = self._final = None
@@ -0,0 +1,162 @@
+# scripts/checkpoint.py
+"""
+長時間の店別出力を安全に中断・再開するための部品。
+
+- atomic_write_bytes:
+    一時ファイルに書いてから os.replace で置き換える（中断しても書きかけの xlsx を残さない）
+- CheckpointJournal:
+    split 出力先に .topn_checkpoint_<大分類コード>.jsonl を置き、完了した店を1行ずつ追記する
+    （split 出力先は大分類をまたいで共有するので大分類ごとに別）。
+    先頭行は入力のフィンガープリント。--resume 時は同じ入力のときだけ完了済みの店を飛ばす。
+    全店完了で削除する。
+- CancelToken:
+    停止ファイル（--stop-file）の出現、または店別出力ループ中の SIGINT で「停止要求」を立てる。
+    出力ループは1店書き終えるごとに確認し、キリの良いところで RunCancelled を送出する。
+    SIGINT を預かるのは handle_signals() の with の間だけ（2回目は KeyboardInterrupt）。
+    SIGTERM（GUI の強制終了）は奪わない。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+JOURNAL_NAME = ".topn_checkpoint_{category}.jsonl"
+
+
+class RunCancelled(Exception):
+    """停止要求により、完了済みの店までで出力を打ち切った"""
+
+    def __init__(self, done: int, total: int):
+        super().__init__(f"cancelled after {done}/{total} stores")
+        self.done = done
+        self.total = total
+
+
+# === アトミック書き込み ===
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    path = Path(path)
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+# === 入力フィンガープリント ===
+def run_fingerprint(**inputs) -> str:
+    """同じ入力かどうかの判定用ハッシュ（値は JSON 化できる形で渡す）"""
+    raw = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# === チェックポイント ===
+class CheckpointJournal:
+    def __init__(self, out_root: Path, fingerprint: str, category: str = "", file_suffix: str = ""):
+        """
+        category   : ジャーナル名の区別（大分類コード）
+        file_suffix: この実行が書くファイル名の末尾（例 "_寿司単品データ.xlsx"）。一時ファイルの掃除対象を絞る
+        """
+        self.out_root = Path(out_root)
+        self.path = self.out_root / JOURNAL_NAME.format(category=category)
+        self.fingerprint = fingerprint
+        self.file_suffix = file_suffix
+        self._lock = threading.Lock()
+
+    def start(self, resume: bool) -> set[str]:
+        """
+        完了済みの店番を返す（resume=False や入力不一致なら空で作り直す）。
+        前回の中断で残った一時ファイル（同じ大分類のものだけ）もここで掃除する。
+        """
+        pattern = f".*{self.file_suffix}.*.tmp"  # atomic_write_bytes の .<名前>.<pid>.tmp
+        for stale in [*self.out_root.glob(f"*/{pattern}"), *self.out_root.glob(f"*/*/{pattern}")]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+        done: set[str] = set()
+        if resume and self.path.exists():
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+            head = json.loads(lines[0]) if lines else {}
+            if head.get("fingerprint") == self.fingerprint:
+                for line in lines[1:]:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # 書きかけの最終行
+                    if (self.out_root / rec["file"]).exists():
+                        done.add(str(rec["store"]))
+                return done
+            print("[resume] 入力が前回と異なるため最初から出力します")
+
+        self.out_root.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"fingerprint": self.fingerprint}) + "\n", encoding="utf-8")
+        return done
+
+    def record(self, store, relpath, size: int) -> None:
+        rec = {"store": str(store), "file": Path(relpath).as_posix(), "size": int(size)}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def finish(self) -> None:
+        """全店完了 → ジャーナルは不要"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# === 協調的キャンセル ===
+class CancelToken:
+    def __init__(self, stop_file: Path | str | None = None):
+        self.stop_file = Path(stop_file) if stop_file else None
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def requested(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.stop_file is not None and self.stop_file.exists():
+            self._event.set()
+            return True
+        return False
+
+    @contextmanager
+    def handle_signals(self):
+        """
+        with の間、SIGINT（Ctrl+C）で即死せず現在の店を書き終えてから止まる。
+        2回目の SIGINT は KeyboardInterrupt。抜けたら元のハンドラに戻す
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield  # serve のワーカースレッド等ではシグナルを扱えない
+            return
+
+        def _handler(signum, frame):
+            if self._event.is_set():
+                raise KeyboardInterrupt
+            print(f"[stop] signal {signum} を受信。現在の店を書き終えて停止します（もう一度で強制終了）", flush=True)
+            self.cancel()
+
+        prev = signal.signal(signal.SIGINT, _handler)
+        try:
+            yield
+        finally:
+            signal.signal(signal.SIGINT, prev)
@@ -0,0 +1,162 @@
+# scripts/data_quality.py
+"""
+集計前のデータ品質チェック（ベクトル演算のみ。月次CSV数百万行でも数秒）。
+
+read_sales_raw（合算前・欠損補完前）の DataFrame を受け取り、次を数える:
+
+    duplicate_rows     : 全列が完全一致する重複行（過去の「4倍問題」の検出用）
+    jan_name_conflict  : 同じ JAN に複数の品名
+    negative_amount    : 売上金額 < 0
+    nan_amount         : 売上金額が空欄・数値でない
+    unknown_store      : 店舗マスターに無い店番
+    unknown_category   : 大分類マップに無い大分類コード
+    date_out_of_window : 売上日が読めない、または読込元ファイルの年月と違う
+
+--strict では level="error" の項目が1件でもあれば描画前に止める。
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_LIMIT = 5
+
+# 件数があれば strict で止める項目（その他は warn 扱い）
+ERROR_CHECKS = frozenset({
+    "duplicate_rows", "nan_amount", "unknown_category", "date_out_of_window",
+})
+
+
+class DataQualityError(Exception):
+    """strict モードで品質チェックに引っかかった"""
+
+    def __init__(self, report: "QualityReport"):
+        super().__init__("data quality check failed: " + ", ".join(
+            f"{i.check}={i.count}" for i in report.errors))
+        self.report = report
+
+
+@dataclass
+class QualityIssue:
+    check: str
+    count: int
+    level: str                                     # "error" / "warn"
+    samples: list = field(default_factory=list)    # 先頭 SAMPLE_LIMIT 件
+
+
+@dataclass
+class QualityReport:
+    rows: int = 0
+    issues: list[QualityIssue] = field(default_factory=list)
+    elapsed_sec: float = 0.0
+
+    @property
+    def errors(self) -> list[QualityIssue]:
+        return [i for i in self.issues if i.level == "error"]
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def summary_lines(self) -> list[str]:
+        if self.ok:
+            return [f"[dq] ok: {self.rows} rows ({self.elapsed_sec:.2f}s)"]
+        lines = [f"[dq] {len(self.issues)} 件の項目で問題あり: {self.rows} rows ({self.elapsed_sec:.2f}s)"]
+        for i in self.issues:
+            head = ", ".join(str(s) for s in i.samples)
+            lines.append(f"[dq] {i.level:5s} {i.check}: {i.count}  例: {head}")
+        return lines
+
+    def to_dict(self) -> dict:
+        return {"rows": self.rows, "elapsed_sec": round(self.elapsed_sec, 3), "ok": self.ok,
+                "issues": [asdict(i) for i in self.issues]}
+
+    def write_json(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=1, default=str),
+                        encoding="utf-8")
+        return path
+
+
+def _samples(values) -> list:
+    return [v.item() if hasattr(v, "item") else v for v in list(values)[:SAMPLE_LIMIT]]
+
+
+def _ymd(v) -> str:
+    return "NaT" if pd.isna(v) else f"{v:%Y-%m-%d}"
+
+
+def _expected_months(df: pd.DataFrame):
+    """read_sales_raw が attrs に残したファイル単位の行数から、行ごとの読込元年月 (YYYYMM) を作る"""
+    src = df.attrs.get("source_rows")
+    if not src or sum(n for _, _, n in src) != len(df):
+        return None
+    return np.repeat([y * 100 + m for y, m, _ in src], [n for _, _, n in src])
+
+
+def validate_sales(raw: pd.DataFrame, store_ids=None, categories=None) -> QualityReport:
+    """
+    raw        : read_sales_raw の戻り値（合算前。amount の欠損は NaN のまま）
+    store_ids  : 既知の店番（None なら店番チェックをしない）
+    categories : 既知の大分類コード（None なら大分類チェックをしない）
+    """
+    t0 = time.perf_counter()
+    report = QualityReport(rows=len(raw))
+
+    def _add(check: str, mask_or_count, samples) -> None:
+        count = int(mask_or_count.sum()) if hasattr(mask_or_count, "sum") else int(mask_or_count)
+        if count:
+            level = "error" if check in ERROR_CHECKS else "warn"
+            report.issues.append(QualityIssue(check, count, level, _samples(samples)))
+
+    def _rows(mask):
+        return raw.loc[mask].head(SAMPLE_LIMIT).itertuples()
+
+    dup = raw.duplicated(keep="first")
+    _add("duplicate_rows", dup, (f"{_ymd(r.date)} 店{r.store_id} {r.jan}" for r in _rows(dup)))
+
+    if "name" in raw.columns:
+        pairs = raw[["jan", "name"]].dropna().drop_duplicates()
+        multi = pairs["jan"].duplicated(keep=False)
+        if multi.any():
+            conflict = pairs.loc[multi].groupby("jan", sort=False)["name"].agg(lambda s: "/".join(map(str, s)))
+            _add("jan_name_conflict", len(conflict),
+                 (f"{jan}: {names}" for jan, names in conflict.head(SAMPLE_LIMIT).items()))
+
+    amount = raw["amount"]
+    neg = amount < 0
+    _add("negative_amount", neg, (f"{_ymd(r.date)} 店{r.store_id} {r.jan} {r.amount:g}" for r in _rows(neg)))
+    nan = amount.isna()
+    _add("nan_amount", nan, (f"{_ymd(r.date)} 店{r.store_id} {r.jan}" for r in _rows(nan)))
+
+    if store_ids is not None:
+        known = pd.Index([str(s) for s in store_ids])
+        unknown = ~raw["store_id"].isin(known)
+        if unknown.any():
+            vc = raw.loc[unknown, "store_id"].value_counts()
+            _add("unknown_store", unknown, (f"{s}({n}行)" for s, n in vc.items()))
+
+    if categories is not None:
+        known = pd.Index([str(c) for c in categories])
+        unknown = ~raw["category_large"].isin(known)
+        if unknown.any():
+            vc = raw.loc[unknown, "category_large"].value_counts()
+            _add("unknown_category", unknown, (f"{c}({n}行)" for c, n in vc.items()))
+
+    # date は read_sales_raw で datetime64 のまま（読めない値は NaT）
+    dt = raw["date"]
+    bad_date = dt.isna().to_numpy()
+    expected = _expected_months(raw)
+    if expected is not None:
+        ym = (dt.dt.year * 100 + dt.dt.month).to_numpy()
+        bad_date = bad_date | (ym != expected)
+    _add("date_out_of_window", bad_date, (f"{_ymd(r.date)} 店{r.store_id}" for r in _rows(bad_date)))
+
+    report.elapsed_sec = time.perf_counter() - t0
+    return report
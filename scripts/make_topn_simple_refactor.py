@@ -7,31 +7,56 @@ import math
 from openpyxl.formatting.rule import Rule
 from calendar import monthrange
 import json
+import os
 import re
-from datetime import datetime
-from string import Template
+import time
+from contextlib import nullcontext
+from io import BytesIO
+from functools import lru_cache
+
+from scripts.template_snapshot import CACHE_DIR, file_sha256, load_template_snapshot
+from scripts.page_layout import COMPARE_HEADERS, DETAIL_HEADERS, RATE_FORMAT, PageLayout, load_page_layout
+from scripts.progress import ProgressReporter
+from scripts.checkpoint import (
+    CancelToken, CheckpointJournal, RunCancelled, atomic_write_bytes, run_fingerprint,
+)
+from scripts.manifest import RunManifest, manifest_path_for
+from scripts.bundle import ZipBundleWriter
+from scripts.write_pipeline import BackgroundWriter
+from scripts.xlsx_optimize import DEFAULT_LEVEL, OptimizeStats, optimize_xlsx
+from scripts.sales_source import find_month_file, iter_month_keys, read_with_stats
+from scripts.data_quality import DataQualityError, validate_sales
+from scripts.run_context import DEFAULT_TITLE_TEMPLATE, RunContext, category_name
+from scripts.table_export import (
+    TABLE_FORMATS, TABLE_SUFFIX, parquet_available, table_bytes, topn_table,
+)
+
+# 停止要求で中断したときの終了コード（GUI はこれを「停止」として扱う）
+EXIT_CANCELLED = 3
+# --strict でデータ品質チェックに引っかかったときの終了コード
+EXIT_DATA_QUALITY = 4
 
-CATEGORY_MAP = {
-    "1": "寿司", "2": "米飯", "3": "温惣菜",
-    "4": "冷総菜", "5": "軽食", "6": "魚惣菜",
-}
 
 def _month_keys_from_dates(dates):
     """dates(list[str or date]) → {'2024-12', '2025-01'} のような集合"""
     dt = pd.to_datetime(dates).date
     return {f"{d.year:04d}-{d.month:02d}" for d in dt}
 
-def copy_conditional_formatting(ws_dst, ws_src):
+def copy_conditional_formatting(ws_dst, ws_src, cf_items=None):
     """
     copy_worksheet で失われがちな条件付き書式を、TEMPLATE から新シートへ再適用する。
     レイアウトが同一（セル座標が同じ）前提で、そのまま同レンジへ貼る。
+    cf_items（テンプレートスナップショットの解析済みルール）があれば ws_src は調べない。
     """
-    cf_src = ws_src.conditional_formatting
-    # openpyxlの内部構造はバージョンで差があります。代表的な2系統に対応。
-    if hasattr(cf_src, "cf_rules"):  # 3.1系で公開属性がある場合
-        items = cf_src.cf_rules.items()
-    else:  # 旧来: _cf_rules にレンジ→ルールlist が入っていることが多い
-        items = getattr(cf_src, "_cf_rules", {}).items()
+    if cf_items is not None:
+        items = cf_items
+    else:
+        cf_src = ws_src.conditional_formatting
+        # openpyxlの内部構造はバージョンで差があります。代表的な2系統に対応。
+        if hasattr(cf_src, "cf_rules"):  # 3.1系で公開属性がある場合
+            items = cf_src.cf_rules.items()
+        else:  # 旧来: _cf_rules にレンジ→ルールlist が入っていることが多い
+            items = getattr(cf_src, "_cf_rules", {}).items()
 
     for rng, rules in items:
         for rule in rules:
@@ -54,13 +79,10 @@ def copy_conditional_formatting(ws_dst, ws_src):
             ws_dst.conditional_formatting.add(rng, new_rule)
 
 # === CSV読込 ===
-def load_sales(root: Path, dates=None) -> pd.DataFrame:
+def sales_source_files(root: Path, dates=None) -> list[Path]:
     """
-    data/material/YYYY/IT_YYYYMM.csv を必要分だけ読む（年月またぎ対応）。
-    返り値は標準列:
-      date (datetime.date), store_id (str), category_large (str),
-      jan (str), name (str), amount (float), qty (float), discount (float)
-    同一 (date, store, category_large, jan) は合算（nameはfirst）
+    load_sales が読む月次ファイルの一覧（存在するものだけ）。
+    IT_YYYYMM.csv の圧縮版（.gz/.zst/.xz/.bz2）も対象。dates未指定ならルート配下を総当り。
     """
     root = Path(root)
     # 読むべき年月を決定
@@ -69,77 +91,160 @@ def load_sales(root: Path, dates=None) -> pd.DataFrame:
         ym_keys = sorted({(d.year, d.month) for d in dates})
     else:
         # dates未指定ならルート配下を総当り（従来動作）
-        ym_keys = []
-        for y_dir in (root.glob("*")):
-            if y_dir.is_dir() and y_dir.name.isdigit():
-                for f in y_dir.glob("IT_*.csv"):
-                    # IT_YYYYMM.csv から (YYYY,MM) を推定
-                    stem = f.stem  # IT_202501
-                    y = int(stem.split("_")[1][:4])
-                    m = int(stem.split("_")[1][4:6])
-                    ym_keys.append((y, m))
-        ym_keys = sorted(set(ym_keys))
+        ym_keys = iter_month_keys(root)
 
     files = []
     for y, m in ym_keys:
-        f = root / f"{y}" / f"IT_{y}{m:02d}.csv"
-        if f.exists():
+        f = find_month_file(root, y, m)
+        if f is not None:
             files.append(f)
 
     if not files:
         raise FileNotFoundError(f"no monthly files for {ym_keys} under {root}")
+    return files
+
+def sales_fingerprint(files: list[Path]) -> list[tuple[str, int, int]]:
+    """入力CSVの同一性判定用（パス・サイズ・mtime）"""
+    out = []
+    for f in files:
+        st = Path(f).stat()
+        out.append((Path(f).name, st.st_size, st.st_mtime_ns))
+    return out
 
-    # 読み込み＋列標準化
-    def _read_any(p: Path) -> pd.DataFrame:
+SALES_RENAME_MAP = {
+    "売上日": "date",
+    "店舗コード": "store_id",
+    "大分類コード": "category_large",
+    "中分類コード": "category_middle",
+    "小分類コード": "category_small",
+    "JANコード": "jan",
+    "品名漢字": "name",
+    "総売上金額": "amount",
+    "総売上数量": "qty",
+    "値引金額": "discount",
+}
+
+# stores 指定時は、この行数ずつ読んで対象外の店を捨てながら読む
+SALES_READ_CHUNK = 200_000
+
+def read_sales_raw(root: Path, dates=None, stores=None) -> pd.DataFrame:
+    """
+    必要な月次CSVを読み、列名と型だけそろえた合算前の DataFrame を返す（品質チェック用）。
+    stores（店番リスト）を渡すと、読込中にそれ以外の店の行を捨てる。
+      date は datetime64（読めない値は NaT）、金額・数量の欠損は NaN のまま。
+      attrs["source_rows"] = [(年, 月, 行数), ...]（読込元ファイル単位。行順と対応）
+      attrs["read_stats"]  = [ReadStats, ...]（ファイルごとの圧縮形式・バイト数・読込時間）
+    """
+    files = sales_source_files(root, dates)
+
+    store_col = next(k for k, v in SALES_RENAME_MAP.items() if v == "store_id")
+    keep = None if stores is None else {str(s) for s in stores}
+
+    def _read_csv(f, **kwargs) -> pd.DataFrame:
+        if keep is None:
+            return pd.read_csv(f, **kwargs)
+        # 店舗の絞り込みは読込中に（チャンクごとに対象店だけ残す）
+        chunks = [c[c[store_col].astype(str).isin(keep)]
+                  for c in pd.read_csv(f, chunksize=SALES_READ_CHUNK, **kwargs)]
+        return pd.concat(chunks, ignore_index=True)
+
+    # 読み込み＋列標準化（圧縮ファイルはストリームで展開しながら読む）
+    def _read_any(p: Path):
         for enc in ("cp932", "utf-8-sig", "utf-8"):
             try:
-                return pd.read_csv(p, encoding=enc)
+                return read_with_stats(p, lambda f: _read_csv(f, encoding=enc))
             except Exception:
                 continue
-        return pd.read_csv(p)  # 最後の保険
-
-    rename_map = {
-        "売上日": "date",
-        "店舗コード": "store_id",
-        "大分類コード": "category_large",
-        "中分類コード": "category_middle",
-        "小分類コード": "category_small",
-        "JANコード": "jan",
-        "品名漢字": "name",
-        "総売上金額": "amount",
-        "総売上数量": "qty",
-        "値引金額": "discount",
-    }
-
-    df = pd.concat((_read_any(f) for f in files), ignore_index=True)
-    df = df.rename(columns=rename_map)
+        return read_with_stats(p, _read_csv)  # 最後の保険
+
+    parts, read_stats = [], []
+    for f in files:
+        part, st = _read_any(f)
+        st.rows = len(part)
+        parts.append(part)
+        read_stats.append(st)
+    df = pd.concat(parts, ignore_index=True)
+    df = df.rename(columns=SALES_RENAME_MAP)
 
     # 型正規化
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
     df["store_id"] = df["store_id"].astype(str)
     df["category_large"] = df["category_large"].astype(str)
     df["jan"] = df["jan"].astype(str)
     for col in ("amount", "qty", "discount"):
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
         else:
             df[col] = 0.0
 
+    # IT_YYYYMM.csv[.gz …] → (YYYY, MM)
+    df.attrs["source_rows"] = [
+        (int(f.name[3:7]), int(f.name[7:9]), len(part)) for f, part in zip(files, parts)
+    ]
+    df.attrs["read_stats"] = read_stats
+    return df
+
+def normalize_sales(raw: pd.DataFrame, dates=None) -> pd.DataFrame:
+    """read_sales_raw の結果 → load_sales の標準形（欠損0埋め・日付絞込・同一キー合算）"""
+    df = raw.copy()
+    df.attrs = {}  # 読込元の情報（read_stats 等）は合算後のデータには引き継がない
+    df["date"] = df["date"].dt.date
+    for col in ("amount", "qty", "discount"):
+        df[col] = df[col].fillna(0.0)
+
     if dates:
-        use = set(dates)
+        use = {pd.to_datetime(d).date() for d in dates}
         df = df[df["date"].isin(use)]
 
     # 4倍問題の再発防止：category_large を含めて集約（←ここが重要）
+    # 重複行そのものは data_quality.validate_sales で検出する
     agg_map = {"amount": "sum", "qty": "sum", "discount": "sum", "name": "first"}
     df = (df.groupby(["date", "store_id", "category_large", "jan"], as_index=False)
             .agg(agg_map))
 
     return df
 
+def load_sales(root: Path, dates=None) -> pd.DataFrame:
+    """
+    data/material/YYYY/IT_YYYYMM.csv を必要分だけ読む（年月またぎ対応）。
+    返り値は標準列:
+      date (datetime.date), store_id (str), category_large (str),
+      jan (str), name (str), amount (float), qty (float), discount (float)
+    同一 (date, store, category_large, jan) は合算（nameはfirst）
+    """
+    return normalize_sales(read_sales_raw(root, dates), dates)
+
+# === ロールアップ（エリア・チェーン単位の TopN） ===
+# topn_dict のキーは店番（"3"）か "<階層>:<グループ名>"（"area:鹿行"）
+ROLLUP_SEP = ":"
+ROLLUP_CHAIN_NAME = "全社"
+
+def rollup_key(level: str, name: str) -> str:
+    return f"{level}{ROLLUP_SEP}{name}"
+
+def is_rollup(key) -> bool:
+    return ROLLUP_SEP in str(key)
+
+def unit_label(key) -> str:
+    """シート名・ヘッダ用の表示名（店番はそのまま、ロールアップはグループ名）"""
+    return str(key).split(ROLLUP_SEP, 1)[1] if is_rollup(key) else str(key)
+
+def unit_sort_key(key):
+    """店番順 → ロールアップ（階層名, グループ名）の順"""
+    key = str(key)
+    if is_rollup(key):
+        level, name = key.split(ROLLUP_SEP, 1)
+        return (1, 0, level, name)
+    return (0, int(key) if key.isdigit() else 0, "", key)
+
+
 # === 店舗マスター ===
 # === store_master 読み込み（store/name/short_name 想定） ===
-def load_store_master(path: Path) -> dict[str, str]:
-    import pandas as pd
+# 店舗グループとして --stores に指定できる列（あるものだけ。1セルに「,」区切りで複数可）
+STORE_GROUP_COLUMNS = ("group", "area", "chain")
+
+def _read_store_master_xlsx(path: Path) -> dict:
+    """{"stores": {店番: 短縮名}, "groups": {グループ名: [店番, ...]}}"""
     sm = pd.read_excel(path)
 
     # 列名を内部統一
@@ -157,8 +262,120 @@ def load_store_master(path: Path) -> dict[str, str]:
         sm["short_name"] = sm["store_name"]
     sm["short_name"] = sm["short_name"].fillna(sm["store_name"])
 
-    # 辞書 { "1": "神栖店", ... } を返す
-    return dict(zip(sm["store_id"], sm["short_name"]))
+    # 辞書 { "1": "神栖店", ... }（名前が両方空の店は載せない → 検証で検出）
+    stores = {sid: str(name) for sid, name in zip(sm["store_id"], sm["short_name"])
+              if pd.notna(name) and str(name).strip()}
+
+    groups: dict[str, list[str]] = {}
+    levels: dict[str, dict[str, str]] = {}   # 列名 → {店番: 値}（ロールアップ用。複数指定のセルは先頭）
+    for col in STORE_GROUP_COLUMNS:
+        if col not in sm.columns:
+            continue
+        for sid, cell in zip(sm["store_id"], sm[col]):
+            if pd.isna(cell):
+                continue
+            names = [g.strip() for g in re.split(r"[,、]", str(cell)) if g.strip()]
+            if names:
+                levels.setdefault(col, {})[sid] = names[0]
+            for g in names:
+                if sid not in groups.setdefault(g, []):
+                    groups[g].append(sid)
+    return {"stores": stores, "groups": groups, "levels": levels}
+
+def _write_json_atomic(path: Path, obj) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _load_store_master_cached(path: Path, cache_dir: Path | None) -> dict:
+    path = Path(path)
+    if cache_dir is None:
+        return _read_store_master_xlsx(path)
+
+    cache_file = Path(cache_dir) / f"{path.stem}.master.json"
+    st = path.stat()
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+    except Exception:
+        cached = None
+    if cached and "levels" not in cached:
+        cached = None  # 旧形式（グループ・ロールアップ列なし）は作り直す
+
+    if cached and cached.get("path") == str(path.resolve()):
+        if cached.get("mtime_ns") == st.st_mtime_ns and cached.get("size") == st.st_size:
+            return cached
+    digest = file_sha256(path)
+    if cached and cached.get("sha256") == digest:
+        master = {k: cached[k] for k in ("stores", "groups", "levels")}
+    else:
+        master = _read_store_master_xlsx(path)
+
+    try:
+        _write_json_atomic(cache_file, {
+            "path": str(path.resolve()), "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+            "sha256": digest, **master,
+        })
+    except OSError as e:
+        print(f"[warn] store master cache not written: {e}")
+    return master
+
+def load_store_master(path: Path, cache_dir: Path | None = CACHE_DIR) -> dict[str, str]:
+    """
+    店舗マスター {店番: 短縮名} を返す。
+    xlsx の読込は遅いので cache_dir に JSON でキャッシュする。
+      - mtime/サイズが一致 → そのまま採用（ハッシュ計算もしない）
+      - 不一致でも sha256 が一致（コピーし直し等）→ キャッシュ採用
+    cache_dir=None でキャッシュ無効。
+    """
+    return _load_store_master_cached(path, cache_dir)["stores"]
+
+def load_store_groups(path: Path, cache_dir: Path | None = CACHE_DIR) -> dict[str, list[str]]:
+    """店舗マスターの group / area / chain 列から {グループ名: [店番, ...]}（キャッシュは load_store_master と共通）"""
+    return _load_store_master_cached(path, cache_dir)["groups"]
+
+def load_rollup_levels(path: Path, levels, store_ids=None,
+                       cache_dir: Path | None = CACHE_DIR) -> dict[str, dict[str, str]]:
+    """
+    ロールアップ階層 {列名: {店番: グループ名}} を店舗マスターの列から作る（例: ["area", "chain"]）。
+    "chain" 列が無ければ全店を1グループ（ROLLUP_CHAIN_NAME）にまとめる。それ以外の未知の列は ValueError。
+    """
+    master = _load_store_master_cached(path, cache_dir)
+    store_ids = [str(s) for s in (store_ids if store_ids is not None else master["stores"])]
+    out = {}
+    for level in levels:
+        if level in master["levels"]:
+            out[level] = dict(master["levels"][level])
+        elif level == "chain":
+            out[level] = {sid: ROLLUP_CHAIN_NAME for sid in store_ids}
+        else:
+            raise ValueError(f"store master has no column: {level}")
+    return out
+
+def resolve_stores(spec: str, groups: dict[str, list[str]] | None = None) -> list[str]:
+    """
+    "3,17,25" や "3,鹿行エリア" → 店番リスト（指定順、重複なし）。
+    数字は店番、それ以外は店舗グループ名として展開する。未知のグループ名は ValueError。
+    """
+    groups = groups or {}
+    out: list[str] = []
+    for tok in re.split(r"[,、]+", spec or ""):
+        tok = tok.strip()
+        if not tok:
+            continue
+        if tok.isdigit():
+            ids = [str(int(tok))]
+        elif tok in groups:
+            ids = groups[tok]
+        else:
+            raise ValueError(f"unknown store or group: {tok}")
+        out.extend(i for i in ids if i not in out)
+    return out
+
+def validate_store_master(store_names: dict[str, str], store_ids) -> list[str]:
+    """売上に出てくる店番のうち、店舗マスターに短縮名が無いものを返す（店番順）"""
+    missing = {str(s) for s in store_ids if not str(store_names.get(str(s), "")).strip()}
+    return sorted(missing, key=lambda x: (not x.isdigit(), int(x) if x.isdigit() else 0, x))
 
 # === 大分類・日付でフィルタ ===
 def filter_sales(df: pd.DataFrame, category: str, dates: list[str]) -> pd.DataFrame:
@@ -179,79 +396,141 @@ def build_topn(df: pd.DataFrame, top_n=30) -> dict:
 
 from openpyxl import Workbook
 
+@lru_cache(maxsize=4096)
+def _date_labels(d) -> tuple:
+    """日付 → (date, 'YYYY-MM-DD', 年2桁, 'MM/DD')。同じ日は実行中に一度だけ変換する"""
+    ts = pd.to_datetime(d)
+    return ts.date(), ts.strftime("%Y-%m-%d"), str(ts.year)[2:], ts.strftime("%m/%d")
+
+def _detail_values(df_day: pd.DataFrame, max_rank: int):
+    """df_day（降順TopN）→ [(順位, 品名, 金額, 数量, 値引, 値引率), ...]"""
+    df_day = df_day.head(max_rank)
+    n = len(df_day)
+
+    def _col(name, default):
+        if name not in df_day.columns:
+            return [default] * n
+        return df_day[name].tolist()
+
+    out = []
+    for rank, (name, amt, qty, disc) in enumerate(
+            zip(_col("name", ""), _col("amount", 0), _col("qty", 0), _col("discount", 0)), start=1):
+        amt  = float(amt or 0.0)
+        qty  = float(qty or 0.0)
+        disc = float(disc or 0.0)
+        out.append((rank, name, amt, qty, disc, (disc/amt) if amt else 0.0))
+    return out
+
+def _sheet_base(store) -> str:
+    """シート名の先頭部分: 店番、ロールアップはグループ名（シート名に使えない文字は _、31文字制限）"""
+    if not is_rollup(store):
+        return str(store)
+    return re.sub(r"[\[\]:*?/\\]", "_", unit_label(store))[:26]
+
 def _add_pages_for_one_store(wb, ws_tpl, store, store_short_name, dates, day_map, cat_name, event_name,
-                             total_all_dict, total_cat_dict, category, make_title):
-    block_offsets = [0, 8, 16, 24]
+                             total_all_dict, total_cat_dict, category, make_title, cf_items=None,
+                             layout: PageLayout | None = None, compare=None):
+    """
+    compare を渡すと（--compare-previous-year）ブロック内の空き列に前年金額・前年比を書く。
+    compare = {"dates": {今年の日付: 前年の日付}, "totals": (前年惣菜合計, 前年大分類合計)}
+    （合計のキーは今年の日付。明細の前年金額は df_day の prev_amount 列）
+    """
+    layout = layout or PageLayout.default()
+    per_page = layout.days_per_page
     total_days = len(dates)
-    num_pages = math.ceil(total_days / 4)
+    num_pages = math.ceil(total_days / per_page)
+
+    # ページをまたいで変わらない文字列は先に作る
+    cat_header = f"{cat_name}単品"
+    footer_labels = ("惣菜売上金額", f"{cat_name}売上金額", f"{cat_name}構成比")
 
     for page in range(num_pages):
         ws = wb.copy_worksheet(ws_tpl)
-        copy_conditional_formatting(ws, ws_tpl)
-        ws.title = f"{store}({page+1})"
+        copy_conditional_formatting(ws, ws_tpl, cf_items=cf_items)
+        ws.title = f"{_sheet_base(store)}({page+1})"
+        if compare is not None:
+            _widen_compare_columns(ws, layout)
 
-        page_dates = dates[page*4 : (page+1)*4]
+        page_dates = dates[page*per_page : (page+1)*per_page]
         # 代表日とページ番号（タイトル用）
         page_no = page + 1
-        if page_dates:
-            date_str = pd.to_datetime(page_dates[0]).strftime("%Y-%m-%d")
-        else:
-            date_str = ""
+        date_str = _date_labels(page_dates[0])[1] if page_dates else ""
         # タイトル（A1）
         ws["A1"].value = make_title(date_str, page_no)
 
-        for block_idx, d in enumerate(page_dates):
-            if block_idx >= 4: break
-            col_offset = block_offsets[block_idx]
-            d_date = pd.to_datetime(d).date()
+        for slots, d in zip(layout.blocks, page_dates):
+            d_date, _, year2, mmdd = _date_labels(d)
             df_day = day_map.get(d_date)
             if df_day is None or df_day.empty:
                 continue
 
             # ブロックヘッダ
-            year2 = str(pd.to_datetime(d).year)[2:]
-            mmdd  = pd.to_datetime(d).strftime("%m/%d")
-            ws.cell(row=2, column=1+col_offset, value=year2)
-            ws.cell(row=2, column=2+col_offset, value=mmdd)
-            ws.cell(row=2, column=3+col_offset, value=store_short_name)
-            ws.cell(row=2, column=4+col_offset, value=f"{cat_name}単品")
+            for (r, c), v in zip(slots.block_header, (year2, mmdd, store_short_name, cat_header)):
+                ws.cell(row=r, column=c, value=v)
 
             # 見出し
-            headers = ["順位", "商品名", "売上金額", "売上数量", "値引金額", "値引率"]
-            for i, h in enumerate(headers):
-                ws.cell(row=3, column=1+col_offset+i, value=h)
+            for (r, c), h in zip(slots.headers, DETAIL_HEADERS):
+                ws.cell(row=r, column=c, value=h)
 
             # 明細（df_day は降順TopN想定）
-            for rank, row in enumerate(df_day.itertuples(index=False), start=1):
-                if rank > 35: break
-                r = 3 + rank
-                amt  = float(getattr(row, "amount", 0) or 0.0)
-                qty  = float(getattr(row, "qty", 0) or 0.0)
-                disc = float(getattr(row, "discount", 0) or 0.0)
-                rate = (disc/amt) if amt else 0.0
-
-                ws.cell(r, 1+col_offset, rank)
-                ws.cell(r, 2+col_offset, getattr(row, "name", ""))
-                ws.cell(r, 3+col_offset, amt)
-                ws.cell(r, 4+col_offset, qty)
-                ws.cell(r, 5+col_offset, disc)
-                c = ws.cell(r, 6+col_offset, rate)
-                c.number_format = "0.00%"
+            for cells, values in zip(slots.details, _detail_values(df_day, layout.max_rank)):
+                for (r, c), v in zip(cells, values):
+                    ws.cell(r, c, v)
+                ws.cell(*cells[-1]).number_format = RATE_FORMAT
 
             # フッタ
-            row_base = 39
-            ws.cell(row=row_base+1, column=1+col_offset, value="惣菜売上金額")
-            ws.cell(row=row_base+2, column=1+col_offset, value=f"{cat_name}売上金額")
-            ws.cell(row=row_base+3, column=1+col_offset, value=f"{cat_name}構成比")
+            for (r, c), label in zip(slots.footer_labels, footer_labels):
+                ws.cell(row=r, column=c, value=label)
 
             total_store_amount = total_all_dict.get((d_date, store), 0.0)
             total_cat_amount   = total_cat_dict.get((d_date, store), 0.0)
             ratio = (total_cat_amount/total_store_amount) if total_store_amount else 0.0
 
-            ws.cell(row=row_base+1, column=3+col_offset, value=total_store_amount)
-            ws.cell(row=row_base+2, column=3+col_offset, value=total_cat_amount)
-            ws.cell(row=row_base+3, column=3+col_offset, value=ratio)
-            ws.cell(row=row_base+3, column=3+col_offset).number_format = "0.00%"
+            for (r, c), v in zip(slots.footer_values, (total_store_amount, total_cat_amount, ratio)):
+                ws.cell(row=r, column=c, value=v)
+            ws.cell(*slots.footer_values[2]).number_format = RATE_FORMAT
+
+            if compare is not None:
+                _fill_compare(ws, slots, store, d_date, df_day, compare, layout.max_rank,
+                              (total_store_amount, total_cat_amount, ratio))
+
+def _widen_compare_columns(ws, layout: PageLayout) -> None:
+    """前年金額の列（テンプレでは狭い空き列）を売上金額の列と同じ幅にする"""
+    c1, _ = layout.compare_columns
+    for off in layout.block_offsets[:layout.days_per_page]:
+        src = ws.column_dimensions[get_column_letter(off + 3)].width
+        dst = ws.column_dimensions[get_column_letter(off + c1)]
+        if src and (dst.width or 0) < src:
+            dst.width = src
+
+def _yoy(cur, prev):
+    return (cur / prev) if prev else None
+
+def _fill_compare(ws, slots, store, d_date, df_day, compare, max_rank, current) -> None:
+    """1ブロック分の前年比較（前年の日付・明細の前年金額/前年比・フッタの前年値/前年比）"""
+    prev_date = compare["dates"].get(d_date)
+    if prev_date is not None:
+        ws.cell(*slots.compare_date, value=f"前年 {_date_labels(prev_date)[3]}")
+    for (r, c), h in zip(slots.compare_headers, COMPARE_HEADERS):
+        ws.cell(row=r, column=c, value=h)
+
+    amount_fmt = ws.cell(*slots.details[0][2]).number_format
+    df_day = df_day.head(max_rank)
+    prev_col = df_day["prev_amount"] if "prev_amount" in df_day.columns else [None] * len(df_day)
+    for (c_prev, c_yoy), amt, prev in zip(slots.compare_details, df_day["amount"], prev_col):
+        prev = None if prev is None or pd.isna(prev) else float(prev)
+        ws.cell(*c_prev, value=prev).number_format = amount_fmt
+        ws.cell(*c_yoy, value=_yoy(float(amt or 0.0), prev)).number_format = RATE_FORMAT
+
+    prev_all_dict, prev_cat_dict = compare["totals"]
+    prev_all = prev_all_dict.get((d_date, store))
+    prev_cat = prev_cat_dict.get((d_date, store))
+    prev_ratio = (prev_cat / prev_all) if prev_all and prev_cat is not None else None
+    for (c_prev, c_yoy), cur, prev, fmt in zip(slots.compare_footer, current, (prev_all, prev_cat, prev_ratio),
+                                               (amount_fmt, amount_fmt, RATE_FORMAT)):
+        ws.cell(*c_prev, value=prev).number_format = fmt
+        if fmt != RATE_FORMAT:
+            ws.cell(*c_yoy, value=_yoy(cur, prev)).number_format = RATE_FORMAT
 
 def save_per_store_files(master_path: Path, out_root: Path, category_name: str):
     """
@@ -287,115 +566,12 @@ def save_per_store_files(master_path: Path, out_root: Path, category_name: str):
         wb.save(out_path)
         wb.close()
 
-# === Excel書き出し ===
-def write_excel(template_path, out_path, topn_dict, store_names, category, dates,
-                event_name, df_sales_all=None, split_by_store=False, split_dir="",
-                title_template="{event} {date} {cat}単品データ ({page})",
-                no_date_in_title=False):
-    
-    def _dates_to_range(dates: list[str]) -> str:
-        # ['2024-12-24','2025-01-03'] → '2024-12–2025-01'（同月なら '2024-12'）
-        try:
-            ds = sorted(datetime.strptime(str(d), "%Y-%m-%d") for d in dates)
-        except Exception:
-            return ",".join(map(str, dates))
-        if not ds: 
-            return ""
-        a, b = ds[0], ds[-1]
-        return f"{a.year}-{a.month:02d}" if (a.year==b.year and a.month==b.month) else f"{a.year}-{a.month:02d}–{b.year}-{b.month:02d}"
-
-    def _build_title_from_template(event_name: str | None,
-                                  category_code: int | str,
-                                  dates_list: list[str],
-                                  page_no: int,
-                                  tmpl: str | None,
-                                  cat_name_resolver) -> str:
-        """
-        イベント名が空→テンプレ採用。テンプレ空→既定テンプレ。
-        イベント名あり→従来の「{event} {cat}単品データ（{page}）」優先。
-        """
-        cat = cat_name_resolver(category_code)
-        ev = (event_name or "").strip()
-
-        # イベント名が入っていれば従来優先
-        if ev:
-            return f"{ev} {cat}単品データ（{page_no}）"
-
-        # イベント名が空→テンプレ（未指定なら既定テンプレ）
-        default_tmpl = "{yy}年 {range} {cat}単品データ（{page}）"
-        tmpl = (tmpl or default_tmpl).strip()
-
-        # === 日付の範囲から代表日を決める ===
-        if dates_list:
-            ds_sorted = sorted(dates_list)
-            first_date_str = str(ds_sorted[0])
-            last_date_str  = str(ds_sorted[-1])  # ★追加：末尾日
-        else:
-            first_date_str = last_date_str = ""
-
-        first_date_short = first_date_str[5:].replace("-", "/") if first_date_str else ""
-        last_date_short  = last_date_str[5:].replace("-", "/") if last_date_str else ""
-
-        values = {
-            "event": ev,
-            "cat": cat,
-            "category": str(category_code),
-            "dates": ",".join(map(str, dates_list)),
-            "dates_short": ",".join(str(d)[5:].replace("-", "/") for d in dates_list),
-            "range": _dates_to_range([str(d) for d in dates_list]),
-            "year": (last_date_str[:4] if last_date_str else ""),   # ★末尾日で決定
-            "yy":   (last_date_str[2:4] if last_date_str else ""),  # ★末尾日で決定
-            "date": last_date_str,
-            "date_short": last_date_short,
-            "page": str(page_no),
-        }
-
-
-        # 1) $var 形式の置換
-        s = Template(tmpl).safe_substitute(values)
-        # 2) {var} 形式の置換（1で未展開の {} をここで仕上げ）
-        try:
-            return s.format(**values)
-        except Exception:
-            return s  # それでも失敗したら、展開できた分だけ返す
-
-
-    # --- タイトル生成のユーティリティ（外部マップ対応） ---
-    def _cat_name_from_code(code: int | str) -> str:
-        cfg = Path("config/category_map.json")
-        if cfg.exists():
-            try:
-                m = json.loads(cfg.read_text(encoding="utf-8"))
-                return m.get(str(code), str(code))
-            except Exception:
-                pass
-        builtin = {"1":"寿司","2":"弁当","3":"温総菜","4":"冷総菜","5":"軽食","6":"魚惣菜"}
-        return builtin.get(str(code), str(code))
-
-    # --- タイトルテンプレ & 関数（ここだけ1回定義） ---
-    eff_tmpl = "{event} {cat}単品データ ({page})" if no_date_in_title else title_template
-    cat_name = _cat_name_from_code(category)
-    ev = (event_name or "").strip() or "（無題）"
-    
-    # --- タイトル関数（イベント名が空ならテンプレ発動） ---
-    def make_title(date_str: str, page_no: int) -> str:
-        # no_date_in_title=True の時はテンプレに日付情報を渡さない
-        dlist = [] if no_date_in_title else [str(d) for d in dates]
-        return _build_title_from_template(
-            event_name=event_name,
-            category_code=category,
-            dates_list=dlist,
-            page_no=page_no,
-            tmpl=title_template,
-            cat_name_resolver=_cat_name_from_code,
-        )
-
-
-    wb0 = load_workbook(template_path)
-    ws_tpl0 = wb0["TEMPLATE"]
-    cat_name = CATEGORY_MAP.get(str(category), str(category))
-
-    # === 合計のための辞書（全惣菜 / 大分類）を先に作る ===
+# === フッタ用合計（全惣菜 / 大分類） ===
+def build_totals(df_sales_all, topn_dict, category, dates, rollup=None):
+    """
+    フッタ用の合計辞書を返す: (total_all_dict, total_cat_dict)
+    いずれも {(date, store_id): amount}。rollup を渡すとロールアップ単位の合計も含める
+    """
     # df_sales_all は load_sales 後のもの（同一キー集約済み）なので、
     # 「大分類合計」は dates と store で再集計が必要。
     # → 全体合計はそのまま、カテゴリ合計は別途 df を再作成して辞書化。
@@ -424,82 +600,364 @@ def write_excel(template_path, out_path, topn_dict, store_names, category, dates
         for store, day_map in topn_dict.items():
             for d, df_day in day_map.items():
                 total_cat_dict[(d, store)] = float(df_day["amount"].sum())
+        return total_all_dict, total_cat_dict
 
-    # === 出力先（店別）ルート
-    if split_by_store:
-        # ← ここは out_store_dir ではなく split_dir に統一
-        base_dir = Path(split_dir) if split_dir else Path(out_path).parent / "stores"
-        base_dir.mkdir(parents=True, exist_ok=True)
+    return rollup_totals(total_all_dict, rollup), rollup_totals(total_cat_dict, rollup)
 
-        # 店ごとにテンプレから新規WBを作り、該当店のシートだけ収めて保存
-        for store in sorted(topn_dict.keys(), key=lambda x: int(x)):
-            wb = load_workbook(template_path)
-            ws_tpl = wb["TEMPLATE"]
+def rollup_totals(total_dict: dict, rollup=None) -> dict:
+    """{(date, 店番): 金額} に、店の合計を足し上げたロールアップ単位 {(date, "area:鹿行"): 金額} を加える"""
+    out = dict(total_dict)
+    for level, mapping in (rollup or {}).items():
+        for (d, store), amt in total_dict.items():
+            if is_rollup(store) or str(store) not in mapping:
+                continue
+            key = (d, rollup_key(level, mapping[str(store)]))
+            out[key] = out.get(key, 0.0) + amt
+    return out
 
-            _add_pages_for_one_store(
-                wb, ws_tpl,
-                store=store,
-                store_short_name=store_names.get(store, ""),
-                dates=dates,
-                day_map=topn_dict[store],
-                cat_name=cat_name,
-                event_name=event_name,
-                total_all_dict=total_all_dict,
-                total_cat_dict=total_cat_dict,
-                category=category,
-                make_title=make_title,                
-            )
+# === 描画の共通準備（タイトル関数・大分類名・フッタ合計） ===
+def _prepare_render(template_path, topn_dict, category, dates, event_name, df_sales_all,
+                    title_template, no_date_in_title, layout=None, totals=None, compare=None, run=None):
+    # --- 大分類名・タイトル（イベント名が空ならテンプレ発動）。ページごとのタイトルは run が覚える ---
+    run = run or RunContext(category, dates, event_name, title_template, no_date_in_title)
 
-            # テンプレシートが残っていれば削除（存在チェック）
-            if "TEMPLATE" in wb.sheetnames:
-                del wb["TEMPLATE"]
+    # === 合計のための辞書（全惣菜 / 大分類）を先に作る（SalesStore 等で計算済みなら totals で渡す） ===
+    total_all_dict, total_cat_dict = totals or build_totals(df_sales_all, topn_dict, category, dates)
 
-            # 1番フォルダ / "1_冷総菜単品データ.xlsx"
-            subdir = base_dir / f"{int(store)}"
-            subdir.mkdir(parents=True, exist_ok=True)
-            safe_cat = f"{cat_name}".replace("/", "／").replace("\\", "／")
-            out_file = subdir / f"{int(store)}_{safe_cat}単品データ.xlsx"
-            wb.save(out_file)
+    # テンプレートは解析済みスナップショットから複製する（xlsx を毎回開かない）
+    snapshot = load_template_snapshot(template_path)
+    # セル座標は実行ごとに一度だけ計算（未指定ならテンプレートの geometry から）
+    layout = layout or load_page_layout(snapshot)
 
-        print(f"[ok] split saved → {base_dir}")
+    return dict(cat_name=run.cat_name, make_title=run.make_title, snapshot=snapshot, layout=layout,
+                total_all_dict=total_all_dict, total_cat_dict=total_cat_dict, compare=compare)
 
-    else:
-        # 既存：全店を1冊に
-        wb = load_workbook(template_path)
-        ws_tpl = wb["TEMPLATE"]
-
-        for store in sorted(topn_dict.keys(), key=lambda x: int(x)):
-            _add_pages_for_one_store(
-                wb, ws_tpl,
-                store=store,
-                store_short_name=store_names.get(store, ""),
-                dates=dates,
-                day_map=topn_dict[store],
-                cat_name=cat_name,
-                event_name=event_name,
-                total_all_dict=total_all_dict,
-                total_cat_dict=total_cat_dict,
-                category=category,
-                make_title=make_title,
-            )
+def _render_pages(wb, ctx, store, topn_dict, store_names, category, dates, event_name):
+    _add_pages_for_one_store(
+        wb, wb["TEMPLATE"],
+        store=store,
+        store_short_name=store_names.get(store, ""),
+        dates=dates,
+        day_map=topn_dict[store],
+        cat_name=ctx["cat_name"],
+        event_name=event_name,
+        total_all_dict=ctx["total_all_dict"],
+        total_cat_dict=ctx["total_cat_dict"],
+        category=category,
+        make_title=ctx["make_title"],
+        cf_items=ctx["snapshot"].cf_items,
+        layout=ctx["layout"],
+        compare=ctx["compare"],
+    )
+
+def _safe_cat_name(cat_name: str) -> str:
+    return f"{cat_name}".replace("/", "／").replace("\\", "／")
 
+def split_relpath(store, cat_name: str) -> Path:
+    """
+    店別ファイルの相対パス: <店番>/<店番>_<大分類名>単品データ.xlsx
+    ロールアップは <階層>/<グループ名>/<グループ名>_<大分類名>単品データ.xlsx
+    """
+    safe_cat = _safe_cat_name(cat_name)
+    if is_rollup(store):
+        level, name = str(store).split(ROLLUP_SEP, 1)
+        name = _safe_cat_name(name)
+        return Path(level) / name / f"{name}_{safe_cat}単品データ.xlsx"
+    return Path(f"{int(store)}") / f"{int(store)}_{safe_cat}単品データ.xlsx"
+
+def iter_store_workbooks(template_path, topn_dict, store_names, category, dates, event_name,
+                         df_sales_all, title_template="{event} {date} {cat}単品データ ({page})",
+                         no_date_in_title=False, layout=None, totals=None, compare=None, run=None):
+    """
+    店ごとにテンプレから新規WBを作り、該当店のシートだけ収めて
+    (店番, 相対パス, Workbook) を店番順に返す（保存は呼び出し側）。
+    """
+    ctx = _prepare_render(template_path, topn_dict, category, dates, event_name, df_sales_all,
+                          title_template, no_date_in_title, layout=layout, totals=totals, compare=compare, run=run)
+    for store in sorted(topn_dict.keys(), key=unit_sort_key):
+        wb = ctx["snapshot"].new_workbook()
+        _render_pages(wb, ctx, store, topn_dict, store_names, category, dates, event_name)
+
+        # テンプレシートが残っていれば削除（存在チェック）
         if "TEMPLATE" in wb.sheetnames:
             del wb["TEMPLATE"]
 
-        wb.save(out_path)
-        print(f"[ok] saved → {out_path}")
+        yield store, split_relpath(store, ctx["cat_name"]), wb
+
+def build_combined_workbook(template_path, topn_dict, store_names, category, dates, event_name,
+                            df_sales_all, title_template="{event} {date} {cat}単品データ ({page})",
+                            no_date_in_title=False, layout=None, progress=None, totals=None, compare=None,
+                            run=None):
+    """全店を1冊にまとめた Workbook を返す（保存は呼び出し側）"""
+    progress = progress or ProgressReporter()
+    ctx = _prepare_render(template_path, topn_dict, category, dates, event_name, df_sales_all,
+                          title_template, no_date_in_title, layout=layout, totals=totals, compare=compare, run=run)
+    wb = ctx["snapshot"].new_workbook()
+    progress.stores_start(len(topn_dict))
+    for store in sorted(topn_dict.keys(), key=unit_sort_key):
+        _render_pages(wb, ctx, store, topn_dict, store_names, category, dates, event_name)
+        progress.store_done(store, rows=store_row_count(topn_dict[store]))
+
+    if "TEMPLATE" in wb.sheetnames:
+        del wb["TEMPLATE"]
+    return wb
+
+def store_row_count(day_map) -> int:
+    """1店舗分の明細行数（TopN は aggregate_topn で件数を絞り済み）"""
+    return sum(len(df_day) for df_day in day_map.values())
+
+def workbook_bytes(wb) -> bytes:
+    """Workbook を xlsx のバイト列にする（ディスクを経由しない）"""
+    buf = BytesIO()
+    wb.save(buf)
+    wb.close()
+    return buf.getvalue()
 
+# === Excel書き出し ===
+def write_excel(template_path, out_path, topn_dict, store_names, category, dates,
+                event_name, df_sales_all=None, split_by_store=False, split_dir="",
+                title_template="{event} {date} {cat}単品データ ({page})",
+                no_date_in_title=False, layout=None, progress: ProgressReporter | None = None,
+                resume=False, cancel: CancelToken | None = None, fingerprint: str = "",
+                bundle: str = "", bundle_size: int = 0, totals=None, partial: bool = False,
+                compare=None, write_queue: int = 0, optimize: bool = False,
+                zip_level: int = DEFAULT_LEVEL, run: RunContext | None = None):
+    """
+    split_by_store の場合は店ごとにアトミック保存し、完了店をチェックポイントに記録する。
+    bundle="zip" なら店別ファイルを置かず、split_dir 直下の zip へ直接流し込む
+    （bundle_size > 0 で N 店ごとに分割。チェックポイント/再開は対象外）。
+    resume=True なら同じ入力（fingerprint）の前回完了店を飛ばす。
+    cancel の停止要求は1店書き終えるごとに確認し、RunCancelled を送出する。
+    totals=(惣菜合計, 大分類合計) を渡すと df_sales_all から再集計しない。
+    partial=True（--stores で店舗を絞った再発行）なら、マニフェストに他店の前回分を残す。
+    compare（前年比較。_add_pages_for_one_store 参照）を渡すと空き列に前年金額・前年比を書く。
+    write_queue > 0 なら店別の保存を書込スレッドに回し、次の店の描画と重ねる（最大 write_queue 店分を保留）。
+    optimize=True なら保存前に xlsx_optimize で未使用スタイル等を除き、zip_level で詰め直す。
+    run（RunContext）を渡すとその大分類名・タイトルを使う（未指定なら引数から作る）。
+    戻り値は書き出した実行マニフェストのパス。
+    """
+    progress = progress or ProgressReporter()
+    run = run or RunContext(category, dates, event_name, title_template, no_date_in_title)
+    cat_name = run.cat_name
+    render_args = dict(
+        template_path=template_path, topn_dict=topn_dict, store_names=store_names,
+        category=category, dates=dates, event_name=event_name, df_sales_all=df_sales_all,
+        title_template=title_template, no_date_in_title=no_date_in_title, layout=layout,
+        totals=totals, compare=compare, run=run,
+    )
+
+    # === 実行マニフェスト（出力ファイル一覧。GUI ポストチェック/同期スクリプト用）
+    manifest = RunManifest(
+        manifest_path_for(out_path, split_by_store, split_dir, category),
+        mode="split" if split_by_store else "single",
+        category=str(category), cat_name=cat_name,
+        dates=[str(d) for d in dates], event_name=event_name,
+    )
+    if partial and split_by_store:
+        manifest.keep_previous_except(topn_dict.keys())
+
+    # === サイズ最適化（--optimize）: ファイルごとの削減量はマニフェストの raw_size と size
+    opt_total = OptimizeStats()
+
+    def _optimized(data: bytes, name: str = "") -> tuple[bytes, int | None]:
+        if not optimize:
+            return data, None
+        out, st = optimize_xlsx(data, zip_level)
+        opt_total.before += st.before
+        opt_total.after += st.after
+        if name:
+            print(st.line(name))
+        return out, st.before
+
+    # === 出力先（店別）ルート
+    if split_by_store:
+        # ← ここは out_store_dir ではなく split_dir に統一
+        base_dir = Path(split_dir) if split_dir else Path(out_path).parent / "stores"
+        base_dir.mkdir(parents=True, exist_ok=True)
+        # zip 名: <大分類名>単品データ.zip（分割時は _partNN）
+        bundler = (ZipBundleWriter(base_dir, f"{_safe_cat_name(cat_name)}単品データ", bundle_size)
+                   if bundle == "zip" else None)
+        if bundler is not None and resume:
+            print("[bundle] zip 出力では --resume は使えません（最初から出力します）")
+            resume = False
+
+        # ジャーナル・一時ファイルは大分類ごと（同じ split_dir の他の大分類の再開情報には触れない）
+        journal = None if bundler is not None else CheckpointJournal(base_dir, run_fingerprint(
+            user=fingerprint, category=str(category), dates=[str(d) for d in dates],
+            event_name=event_name, title_template=title_template,
+            no_date_in_title=no_date_in_title, layout=repr(layout),
+            compare=None if compare is None else sorted(compare["dates"].items()),
+        ), category=str(category), file_suffix=f"_{_safe_cat_name(cat_name)}単品データ.xlsx")
+        done_stores = journal.start(resume) if journal is not None else set()
+        if done_stores:
+            print(f"[resume] 完了済み {len(done_stores)} 店をスキップ")
+            render_args["topn_dict"] = {s: v for s, v in topn_dict.items() if s not in done_stores}
+            manifest.keep_previous(done_stores)
+        total = len(render_args["topn_dict"])
+
+        # 1番フォルダ / "1_冷総菜単品データ.xlsx"
+        def _save(store, relpath, data: bytes, sheets: int, render_sec: float) -> None:
+            # 1店分の最適化・保存と記録（--write-queue 指定時は書込スレッドで実行）
+            data, raw_size = _optimized(data, Path(relpath).as_posix())
+            if bundler is not None:
+                zip_name = bundler.add(relpath, data, store=store)
+                manifest.add(relpath, data, store=store, sheets=sheets, render_sec=render_sec,
+                             bundle=zip_name, raw_size=raw_size)
+            else:
+                out_file = base_dir / relpath
+                out_file.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_bytes(out_file, data)
+                journal.record(store, relpath, len(data))
+                manifest.add(relpath, data, store=store, sheets=sheets, render_sec=render_sec,
+                             raw_size=raw_size)
+            progress.store_done(store, rows=store_row_count(topn_dict[store]), bytes_written=len(data))
+
+        # 描画（メインスレッド）と保存（書込スレッド）を重ねる。キューが満杯なら描画側が待つ
+        writer = BackgroundWriter(write_queue)
+        progress.stores_start(total)
+        n_done = 0
+        t_prev = time.perf_counter()
+        try:
+            # Ctrl+C は店の区切りで止める（with を抜けたら元の挙動）
+            with cancel.handle_signals() if cancel is not None else nullcontext():
+                for store, relpath, wb in iter_store_workbooks(**render_args):
+                    render_sec = time.perf_counter() - t_prev
+                    sheets = len(wb.sheetnames)
+                    data = workbook_bytes(wb)
+                    writer.submit(_save, store, relpath, data, sheets, render_sec)
+                    del wb, data
+                    n_done += 1
+                    if cancel is not None and cancel.requested() and n_done < total:
+                        writer.close()  # 描画済みの店は書き終えてから止める
+                        if bundler is not None:
+                            manifest.meta["bundles"] = bundler.close()  # 完了分だけの zip として閉じる
+                        manifest.write(complete=False)
+                        progress.emit("cancelled", done=n_done, total=total)
+                        if bundler is not None:
+                            print(f"[stop] 中断: {n_done}/{total} 店完了（zip は完了した店だけで閉じました。"
+                                  "--bundle zip は再開できないため、最初から出力し直してください）")
+                        else:
+                            print(f"[stop] 中断: {n_done}/{total} 店完了（--resume で続きから出力できます）")
+                        raise RunCancelled(n_done, total)
+                    t_prev = time.perf_counter()
+                writer.close()
+        except RunCancelled:
+            raise
+        except BaseException:
+            writer.abort()
+            if bundler is not None:
+                bundler.abort()
+            raise
+        if write_queue:
+            print(writer.line())
+        if optimize:
+            print(f"[optimize] {writer.count} files {opt_total.before / 1e6:.2f}MB→{opt_total.after / 1e6:.2f}MB "
+                  f"(-{opt_total.saved / 1e6:.2f}MB, level={zip_level})")
+
+        if bundler is not None:
+            manifest.meta["bundles"] = bundler.close()
+            names = ", ".join(b["path"] for b in manifest.meta["bundles"])
+            print(f"[ok] bundle saved → {base_dir} ({names})")
+        else:
+            journal.finish()
+            print(f"[ok] split saved → {base_dir}")
+
+    else:
+        # 既存：全店を1冊に
+        t0 = time.perf_counter()
+        wb = build_combined_workbook(**render_args, progress=progress)
+        render_sec = time.perf_counter() - t0
+        sheets = len(wb.sheetnames)
+        with progress.stage("save") as info:
+            data, raw_size = _optimized(workbook_bytes(wb), Path(out_path).name)
+            atomic_write_bytes(Path(out_path), data)
+            info["bytes"] = len(data)
+        progress.add_bytes(len(data))
+        manifest.add(Path(out_path).name, data, sheets=sheets, render_sec=render_sec, raw_size=raw_size)
+        print(f"[ok] saved → {out_path}")
 
         # 店番スプリット（オプション）
         if split_by_store:
-            save_per_store_files(Path(out_path), Path(split_dir), CATEGORY_MAP.get(str(category), str(category)))
+            save_per_store_files(Path(out_path), Path(split_dir), cat_name)
+
+    return manifest.write()
+
+# === 表形式書き出し（CSV / JSON Lines / Parquet。テンプレート描画なし） ===
+def write_table(out_path, topn_dict, store_names, category, dates, df_sales_all, fmt="csv",
+                split_by_store=False, split_dir="", event_name="",
+                progress: ProgressReporter | None = None, totals=None, partial: bool = False,
+                compare=None):
+    """
+    aggregate_topn の結果を xlsx と同じ明細・フッタ値で表形式に書き出す。
+    compare（前年比較）を渡すと前年金額・前年比・前年合計の列を付ける。
+    まとめ版は out_path の拡張子を fmt に合わせたファイル1つ、
+    split_by_store なら <店番>/<店番>_<大分類名>単品データ.<fmt> を店ごとに。
+    戻り値は書き出した実行マニフェストのパス。
+    """
+    progress = progress or ProgressReporter()
+    out_path = Path(out_path).with_suffix(TABLE_SUFFIX[fmt])
+    cat_name = category_name(category)
+    manifest = RunManifest(
+        manifest_path_for(out_path, split_by_store, split_dir, category),
+        mode="split" if split_by_store else "single", format=fmt,
+        category=str(category), cat_name=cat_name,
+        dates=[str(d) for d in dates], event_name=event_name,
+    )
+    if partial and split_by_store:
+        manifest.keep_previous_except(topn_dict.keys())
+
+    total_all_dict, total_cat_dict = totals or build_totals(df_sales_all, topn_dict, category, dates)
+    table = topn_table(topn_dict, store_names, total_all_dict, total_cat_dict,
+                       prev_totals=None if compare is None else compare["totals"])
+
+    if split_by_store:
+        base_dir = Path(split_dir) if split_dir else out_path.parent / "stores"
+        progress.stores_start(table["store_id"].nunique())
+        for store, g in table.groupby("store_id", sort=False):
+            t0 = time.perf_counter()
+            relpath = split_relpath(store, cat_name).with_suffix(TABLE_SUFFIX[fmt])
+            data = table_bytes(g, fmt)
+            out_file = base_dir / relpath
+            out_file.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(out_file, data)
+            manifest.add(relpath, data, store=store, render_sec=time.perf_counter() - t0)
+            progress.store_done(store, rows=len(g), bytes_written=len(data))
+        print(f"[ok] {fmt} split saved → {base_dir}")
+    else:
+        with progress.stage("save") as info:
+            data = table_bytes(table, fmt)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(out_path, data)
+            info["bytes"] = len(data)
+        progress.add_bytes(len(data))
+        manifest.add(out_path.name, data)
+        print(f"[ok] {fmt} saved → {out_path} ({len(table)} rows)")
+
+    return manifest.write()
 
 # === TopN 作成（store×date×大分類で金額降順TopN） ===
-def aggregate_topn(df_sales: pd.DataFrame, category: int, top_n: int = 35, dates=None):
+def rollup_rows(gdf: pd.DataFrame, rollup, agg_map: dict) -> pd.DataFrame:
+    """
+    (date, store_id, jan) 単位の集計を各階層のグループ名に付け替えて縦に並べ、
+    1回の groupby でロールアップ単位 (date, "area:鹿行", jan) に合算する
+    """
+    parts = []
+    for level, mapping in rollup.items():
+        keys = {str(sid): rollup_key(level, g) for sid, g in mapping.items()}
+        part = gdf.assign(store_id=gdf["store_id"].map(keys))
+        parts.append(part[part["store_id"].notna()])
+    return (
+        pd.concat(parts, ignore_index=True)
+          .groupby(["date", "store_id", "jan"], as_index=False, sort=False)
+          .agg(agg_map)
+    )
+
+def aggregate_topn(df_sales: pd.DataFrame, category: int, top_n: int = 35, dates=None, rollup=None):
     """
     df_sales : 列に date, store_id, category_large, jan, name, amount, (qty, discount 任意)
     dates    : list[date] or None
-    戻り値   : dict[store_id -> dict[date -> DataFrame(TopN降順)]]
+    rollup   : {階層: {店番: グループ名}}（load_rollup_levels）。指定時はグループ単位の TopN も返す
+    戻り値   : dict[store_id -> dict[date -> DataFrame(TopN降順)]]（ロールアップのキーは "area:鹿行" 等）
     """
     gdf = df_sales.copy()
     # 安全に型整形
@@ -529,6 +987,9 @@ def aggregate_topn(df_sales: pd.DataFrame, category: int, top_n: int = 35, dates
            .agg(agg_map)
     )
 
+    if rollup:
+        gdf = pd.concat([gdf, rollup_rows(gdf, rollup, agg_map)], ignore_index=True)
+
     # 金額降順でTopN抽出 → store×date の辞書に
     out = {}
     for (store, d), sub in gdf.groupby(["store_id", "date"], sort=False):
@@ -539,6 +1000,7 @@ def aggregate_topn(df_sales: pd.DataFrame, category: int, top_n: int = 35, dates
 
 if __name__ == "__main__":
     import argparse
+    import importlib.util
     from pathlib import Path
     import pandas as pd
 
@@ -546,7 +1008,7 @@ if __name__ == "__main__":
     parser.add_argument("--event-name", type=str, default="秋の感謝セール")
     parser.add_argument("--title-template",
                     type=str,
-                    default="{yy}年 {range} {cat}単品データ（{page}）",
+                    default=DEFAULT_TITLE_TEMPLATE,
                     help=("A1タイトルのテンプレ。{event},{cat},{page} に加えて "
                           "{range},{dates},{dates_short},{category},{year},{yy},{date},{date_short} が利用可。"
                           "イベント名が空欄のとき自動で本テンプレが使用されます"))
@@ -560,7 +1022,63 @@ if __name__ == "__main__":
                         help="店番ごとに別ファイルで出力する")
     parser.add_argument("--split-dir", type=str, default="",
                         help="店別ファイルの出力先ルート（未指定なら out と同階層に stores/）")
+    parser.add_argument("--progress-fd", type=int, default=None,
+                        help="進捗イベント(JSON Lines)を書き出すファイルディスクリプタ（例: 2=stderr）")
+    parser.add_argument("--resume", action="store_true",
+                        help="前回中断した split 出力を、同じ入力なら未完了の店だけ続きから出力する")
+    parser.add_argument("--stop-file", type=str, default="",
+                        help="このファイルが現れたら現在の店を書き終えて停止する（GUIの停止ボタン用）")
+    parser.add_argument("--bundle", choices=["none", "zip"], default="none",
+                        help="zip: 店別ファイルを個別に置かず split-dir 直下の zip にまとめて出力（--split-by-store 扱い）")
+    parser.add_argument("--bundle-size", type=int, default=0,
+                        help="--bundle zip のとき N 店ごとに zip を分割（0=1つにまとめる）")
+    parser.add_argument("--format", choices=("xlsx",) + TABLE_FORMATS, default="xlsx",
+                        help="csv/jsonl/parquet: テンプレートを使わず TopN 明細とフッタ合計を表形式で出力（拡張子は自動）")
+    parser.add_argument("--strict", action="store_true",
+                        help="データ品質チェックで error 項目（重複行・金額欠損・未知の大分類・日付不正）があれば描画前に中止（終了コード 4）")
+    parser.add_argument("--dq-report", type=str, default="",
+                        help="データ品質チェックの結果を JSON で保存するパス")
+    parser.add_argument("--sales-db", type=str, default="",
+                        help="SQLite 売上ストアのパス。必要な月を差分取込し、TopN/合計をクエリで取得（CSV の品質チェックは sync 側の対象外）")
+    parser.add_argument("--topn-cache", action="store_true",
+                        help="日単位の TopN 結果キャッシュ（data/cache/topn_days.sqlite）を使い、未計算の日だけ集計する")
+    parser.add_argument("--topn-cache-mb", type=int, default=256,
+                        help="--topn-cache の上限サイズ(MB)。超えたら古く使われた日から破棄")
+    parser.add_argument("--stores", type=str, default="",
+                        help="対象店舗を絞る（店番や店舗マスターの group/area/chain 名をカンマ区切り。例: 3,17,25）")
+    parser.add_argument("--arrow-cache", action="store_true",
+                        help="正規化済みの月データを Arrow(Feather v2) で data/cache/arrow に置き、メモリマップで読む（pyarrow が必要）")
+    parser.add_argument("--rollup", type=str, default="",
+                        help="店舗マスターの列でロールアップ（例: area,chain）。店別に加えてグループ単位の TopN ページを出す")
+    parser.add_argument("--compare-previous-year", nargs="?", const="weekday", default="",
+                        choices=("weekday", "date"),
+                        help="前年比較: 各日を前年の対応日（weekday=364日前の同じ曜日 / date=同じ月日）と突き合わせ、"
+                             "前年金額・前年比をテンプレの空き列に出す（値なしは weekday）")
+    parser.add_argument("--write-queue", type=int, default=0,
+                        help="店別保存を書込スレッドで行い次の店の描画と重ねる。保留できる店数（0=逐次保存）")
+    parser.add_argument("--optimize", action="store_true",
+                        help="保存前に未使用スタイル・定義名・TEMPLATE の名残を除き、文字列を共有化してサイズを縮める")
+    parser.add_argument("--zip-level", type=int, default=DEFAULT_LEVEL, choices=range(0, 10), metavar="0-9",
+                        help=f"--optimize 時の zip 圧縮レベル（既定 {DEFAULT_LEVEL}）")
+    parser.add_argument("--layout", type=str, default="",
+                        help="ページ配置のJSON（days_per_page, block_offsets, max_rank 等。未指定ならテンプレから自動）")
     args = parser.parse_args()
+    if args.format != "xlsx" and args.bundle != "none":
+        parser.error("--bundle は --format xlsx のときだけ使えます")
+    if args.format == "parquet" and not parquet_available():
+        parser.error("--format parquet には pyarrow が必要です（pip install pyarrow）")
+    if args.arrow_cache and args.sales_db:
+        parser.error("--arrow-cache と --sales-db は同時に使えません")
+    if args.arrow_cache and (args.strict or args.dq_report):
+        # Arrow キャッシュは正規化済み（合算後）のデータなので、合算前の品質チェックができない
+        parser.error("--strict / --dq-report は --arrow-cache と同時に使えません（CSV から読むときだけ品質チェックします）")
+    if args.arrow_cache and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--arrow-cache には pyarrow が必要です（pip install pyarrow）")
+    if args.rollup and (args.sales_db or args.topn_cache or args.stores):
+        parser.error("--rollup は --sales-db / --topn-cache / --stores と同時に使えません")
+    if args.bundle == "zip" and not args.split_by_store:
+        print("[bundle] --bundle zip は店別出力のため --split-by-store を有効にします")
+        args.split_by_store = True
 
     print("[debug] 開始")
     proj_root = Path(__file__).resolve().parents[1]
@@ -568,25 +1086,250 @@ if __name__ == "__main__":
     template_path = proj_root / "data" / "template" / "配布フォーマット.xlsx"
     store_master = sales_root / "master" / "store_master.xlsx"
 
-    dates = [pd.to_datetime(x).date() for x in args.dates.split(",")]
-    df_sales = load_sales(sales_root, dates=dates)  # ← 年月またぎで必要なCSVだけ読む
-    store_names = load_store_master(store_master)
+    # 進捗: --progress-fd 指定時は JSON Lines、無ければ人向けの [progress] 行
+    progress = (ProgressReporter.from_fd(args.progress_fd) if args.progress_fd is not None
+                else ProgressReporter(echo=True))
 
-    topn = aggregate_topn(df_sales, category=args.category, top_n=35, dates=dates)
+    # 停止要求（停止ファイル / 店別出力中の Ctrl+C）は1店ごとに確認する
+    cancel = CancelToken(args.stop_file or None)
 
-    write_excel(
-        template_path=template_path,
-        out_path=Path(args.out),
-        topn_dict=topn,
-        store_names=store_names,
-        category=args.category,
-        dates=dates,
-        event_name=args.event_name,
-        df_sales_all=df_sales,         # 使っているなら
-        split_by_store=args.split_by_store,
-        split_dir=args.split_dir,      # ← これだけ渡す
-        title_template=args.title_template,
-        no_date_in_title=args.no_date_in_title,
+    dates = [pd.to_datetime(x).date() for x in args.dates.split(",")]
+    # 大分類名・タイトル（category_map.json はここで1回だけ読む）
+    run = RunContext(args.category, dates, args.event_name, args.title_template, args.no_date_in_title)
+    # ページ配置（TopN件数 = テンプレの明細行数）
+    layout = load_page_layout(load_template_snapshot(template_path), args.layout or None)
+
+    # 前年比較: 今年の各日 → 前年の対応日
+    prev_dates = None
+    if args.compare_previous_year:
+        from scripts.year_compare import previous_year_dates
+        prev_dates = previous_year_dates(dates, args.compare_previous_year)
+        if not args.sales_db and not any(find_month_file(sales_root, d.year, d.month)
+                                         for d in prev_dates.values()):
+            print("[warn] 前年の月次ファイルがありません（前年比較なしで出力します）")
+            prev_dates = None
+
+    sales_db = None
+    if args.sales_db:
+        # SQLite ストア: 必要な月だけ差分取込し、TopN / フッタ合計はインデックス付きクエリで取る
+        from scripts.sales_store import SalesStore
+        sales_db = SalesStore(args.sales_db)
+        with progress.stage("sync_sales_db") as info:
+            res = sales_db.sync(sales_root, months={(d.year, d.month)
+                                                    for d in [*dates, *(prev_dates or {}).values()]})
+            info.update(loaded=res["loaded"], skipped=res["skipped"], rows=res["rows"])
+        print(f"[db] {sales_db.path} 取込 {res['loaded'] or 'なし'}（変更なし {res['skipped']} か月）")
+    with progress.stage("load_store_master") as info:
+        store_names = load_store_master(store_master)
+        info["stores"] = len(store_names)
+
+    # 店舗指定（店番 / 店舗マスターのグループ名）: 読込・集計・描画のすべてで対象店だけ扱う
+    stores = None
+    if args.stores:
+        try:
+            stores = resolve_stores(args.stores, load_store_groups(store_master))
+        except ValueError as e:
+            parser.error(f"--stores: {e}")
+        print(f"[stores] 対象 {len(stores)} 店: {', '.join(stores)}")
+
+    # ロールアップ（エリア・チェーン等）: 店×JAN の集計からグループ単位の TopN も作る
+    rollup = None
+    if args.rollup:
+        try:
+            rollup = load_rollup_levels(store_master, [x.strip() for x in args.rollup.split(",") if x.strip()])
+        except ValueError as e:
+            parser.error(f"--rollup: {e}")
+        for level, mapping in rollup.items():
+            print(f"[rollup] {level}: {len(set(mapping.values()))} グループ / {len(mapping)} 店")
+
+    def _load(days, check=True, **stage_fields):
+        """
+        days 分の売上（load_sales と同じ形）を --sales-db / --arrow-cache / CSV のいずれかから読む。
+        CSV は合算前に品質チェックする（check=False で省略。前年分など）
+        """
+        if sales_db is not None:
+            with progress.stage("load_sales", **stage_fields) as info:
+                df_sales = sales_db.sales(days, stores=stores)
+                info["rows"] = len(df_sales)
+            return df_sales
+
+        if args.arrow_cache:
+            # Arrow キャッシュ: 正規化済みの月をメモリマップで開く（CSV パース・品質チェックなし）
+            from scripts.arrow_dataset import load_sales_arrow
+            with progress.stage("load_sales", **stage_fields) as info:
+                df_sales, map_stats = load_sales_arrow(sales_root, days, stores=stores)
+                info["rows"] = len(df_sales)
+                info["arrow"] = map_stats.to_dict()
+            print(map_stats.line())
+            return df_sales
+
+        with progress.stage("load_sales", **stage_fields) as info:
+            raw_sales = read_sales_raw(sales_root, dates=days, stores=stores)  # ← 年月またぎで必要なCSVだけ読む
+            info["raw_rows"] = len(raw_sales)
+            info["files"] = [st.to_dict() for st in raw_sales.attrs["read_stats"]]
+        for st in raw_sales.attrs["read_stats"]:
+            print(st.line())
+        if not check:
+            return normalize_sales(raw_sales, days)
+
+        # 合算前にデータ品質を確認（重複行・品名不一致・金額異常・未知の店/大分類・日付）
+        with progress.stage("validate") as info:
+            dq = validate_sales(raw_sales, store_ids=store_names.keys(), categories=run.category_map.keys())
+            info["issues"] = {i.check: i.count for i in dq.issues}
+        for line in dq.summary_lines():
+            print(line)
+        if args.dq_report:
+            dq.write_json(args.dq_report)
+        if args.strict and dq.errors:
+            print(f"[error] {DataQualityError(dq)}（--strict のため中止）")
+            progress.run_end(failed="data_quality")
+            raise SystemExit(EXIT_DATA_QUALITY)
+
+        df_sales = normalize_sales(raw_sales, days)
+        del raw_sales
+        return df_sales
+
+    def _compute(days):
+        """days 分の TopN を集計 → (topn, totals, df_sales)。totals=None なら描画時に df_sales から計算"""
+        if sales_db is not None:
+            with progress.stage("aggregate") as info:
+                topn = sales_db.topn(args.category, days, top_n=layout.max_rank, stores=stores)
+                totals = sales_db.totals(args.category, days, stores=stores)
+                info["stores"] = len(topn)
+            return topn, totals, None
+
+        df_sales = _load(days)
+        with progress.stage("aggregate") as info:
+            topn = aggregate_topn(df_sales, category=args.category, top_n=layout.max_rank, dates=days,
+                                  rollup=rollup)
+            info["stores"] = len(topn)
+        return topn, None, df_sales
+
+    if args.topn_cache:
+        # 日単位の TopN キャッシュ: 計算済みの日は組み立てるだけ、未計算の日だけ集計して保存
+        from scripts.topn_cache import TopNDayCache, month_fingerprints
+        cache = TopNDayCache(max_bytes=args.topn_cache_mb * 1024 * 1024)
+        fps = month_fingerprints(sales_root, dates)
+        with progress.stage("topn_cache") as info:
+            topn, totals, missing = cache.get(args.category, dates, layout.max_rank, fps, stores=stores)
+            n_hit = len(dates) - len(missing)
+            info.update(hit=n_hit, miss=len(missing))
+        print(f"[cache] TopN 日キャッシュ: ヒット {n_hit} 日 / 未計算 {len(missing)} 日")
+        if n_hit and (args.strict or args.dq_report):
+            # キャッシュから組み立てた日は CSV を読まないので品質チェックされない
+            print(f"[warn] TopN 日キャッシュのヒット {n_hit} 日はデータ品質チェックの対象外です"
+                  + ("（チェックした日が無いため --dq-report は書き出しません）" if args.dq_report and not missing else ""))
+            if args.strict and not missing:
+                print("[error] --strict ですが品質チェックした日がありません（--topn-cache を外して実行してください）")
+                cache.close()
+                progress.run_end(failed="data_quality_unchecked")
+                raise SystemExit(EXIT_DATA_QUALITY)
+        if missing:
+            new_topn, new_totals, df_part = _compute(missing)
+            if new_totals is None:
+                new_totals = build_totals(df_part, new_topn, args.category, missing)
+            if stores is None:  # 店舗を絞った結果は全店分ではないので保存しない
+                cache.put(args.category, missing, layout.max_rank, fps, new_topn, new_totals)
+            for store, day_map in new_topn.items():
+                topn.setdefault(store, {}).update(day_map)
+            totals[0].update(new_totals[0])
+            totals[1].update(new_totals[1])
+        cache.close()
+        df_sales = None
+    else:
+        topn, totals, df_sales = _compute(dates)
+    sales_store_ids = df_sales["store_id"].unique() if totals is None else {s for (_, s) in totals[0]}
+
+    # 短縮名の無い店はヘッダが空欄になるので、描画前に知らせる
+    missing_names = validate_store_master(store_names, sales_store_ids)
+    if missing_names:
+        print(f"[warn] 店舗マスターに短縮名がありません（ヘッダ空欄になります）: {', '.join(missing_names)}")
+
+    if rollup:
+        # フッタ合計は店の合計を足し上げる。ブロックヘッダ（店名欄）にはグループ名を出す
+        totals = build_totals(df_sales, topn, args.category, dates, rollup=rollup)
+        store_names = {**store_names, **{k: unit_label(k) for k in topn if is_rollup(k)}}
+
+    compare = None
+    if prev_dates:
+        # 前年分も同じ経路で読み、(日付, 店, JAN) の前年金額を TopN 明細へ1回の merge で付ける
+        from scripts.year_compare import attach_previous_year, previous_year_amounts, previous_year_totals
+        df_prev = _load(sorted(set(prev_dates.values())), check=False, window="previous_year")
+        with progress.stage("compare_previous_year", align=args.compare_previous_year) as info:
+            prev = previous_year_amounts(df_prev, args.category, prev_dates, rollup=rollup)
+            topn, n_rows, n_hit = attach_previous_year(topn, prev)
+            compare = {"dates": prev_dates,
+                       "totals": previous_year_totals(df_prev, args.category, prev_dates, rollup=rollup)}
+            info.update(rows=n_rows, matched=n_hit)
+        del df_prev, prev
+        p0, p1 = min(prev_dates.values()), max(prev_dates.values())
+        print(f"[yoy] 前年 {p0}〜{p1}（{args.compare_previous_year}）: 明細 {n_rows} 行中 {n_hit} 行に前年実績あり")
+    if sales_db is not None:
+        sales_db.close()
+
+    if args.format != "xlsx":
+        # 表形式: テンプレート描画・チェックポイントは不要（数秒で終わる）
+        with progress.stage("export", format=args.format):
+            write_table(
+                out_path=Path(args.out),
+                topn_dict=topn,
+                store_names=store_names,
+                category=args.category,
+                dates=dates,
+                df_sales_all=df_sales,
+                fmt=args.format,
+                split_by_store=args.split_by_store,
+                split_dir=args.split_dir,
+                event_name=args.event_name,
+                progress=progress,
+                totals=totals,
+                partial=stores is not None,
+                compare=compare,
+            )
+        progress.run_end()
+        raise SystemExit(0)
+
+    # 再開判定用: 入力CSV・テンプレートが同じか
+    fingerprint = run_fingerprint(
+        sales=sales_fingerprint(sales_source_files(sales_root, dates)),
+        template=load_template_snapshot(template_path).sha256,
+        stores=stores,
+        rollup=rollup,
+        compare=args.compare_previous_year,
     )
 
+    try:
+        with progress.stage("render"):
+            write_excel(
+                template_path=template_path,
+                out_path=Path(args.out),
+                topn_dict=topn,
+                store_names=store_names,
+                category=args.category,
+                dates=dates,
+                event_name=args.event_name,
+                df_sales_all=df_sales,         # 使っているなら
+                split_by_store=args.split_by_store,
+                split_dir=args.split_dir,      # ← これだけ渡す
+                title_template=args.title_template,
+                no_date_in_title=args.no_date_in_title,
+                run=run,
+                layout=layout,
+                progress=progress,
+                resume=args.resume,
+                cancel=cancel,
+                fingerprint=fingerprint,
+                bundle=args.bundle if args.bundle != "none" else "",
+                bundle_size=args.bundle_size,
+                totals=totals,
+                partial=stores is not None,
+                compare=compare,
+                write_queue=args.write_queue,
+                optimize=args.optimize,
+                zip_level=args.zip_level,
+            )
+    except RunCancelled:
+        progress.run_end(cancelled=True)
+        raise SystemExit(EXIT_CANCELLED)
+    progress.run_end()
 
@@ -0,0 +1,107 @@
+# scripts/manifest.py
+"""
+実行マニフェスト（JSON）。出力した全ファイルのパス・サイズ・sha256・シート数・描画時間を1ファイルにまとめる。
+
+    split 出力 : <split_dir>/manifest_<大分類コード>.json（path は split_dir からの相対。zip 出力時は zip 内のパス）
+                 split_dir は大分類をまたいで共有するので、大分類ごとに別ファイル
+    まとめ版   : <out と同じ場所>/<out名>.manifest.json
+
+GUI のポストチェックや配布同期スクリプトは、ディレクトリを走査せずにこれを読む。
+pandas / openpyxl に依存しない（GUI からも import する）。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from scripts.checkpoint import atomic_write_bytes
+
+MANIFEST_NAME = "manifest_{category}.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(out_path, split_by_store: bool, split_dir="", category="") -> Path:
+    if split_by_store:
+        base_dir = Path(split_dir) if split_dir else Path(out_path).parent / "stores"
+        return base_dir / MANIFEST_NAME.format(category=category)
+    out_path = Path(out_path)
+    return out_path.with_name(out_path.stem + ".manifest.json")
+
+
+def read_manifest(path) -> dict | None:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class RunManifest:
+    def __init__(self, path, **meta):
+        self.path = Path(path)
+        self.meta = meta
+        self.files: dict[str, dict] = {}
+        self._t0 = time.perf_counter()
+
+    def _previous_files(self) -> list[dict]:
+        """前回マニフェストの行。大分類・対象日が今回と違えば別の出力なので引き継がない"""
+        prev = read_manifest(self.path)
+        if not prev:
+            return []
+        for key in ("category", "dates"):
+            if key in self.meta and prev.get(key) != self.meta[key]:
+                print(f"[manifest] 前回のマニフェストは {key} が異なるため引き継ぎません"
+                      f"（前回 {prev.get(key)} / 今回 {self.meta[key]}）")
+                return []
+        return prev.get("files", [])
+
+    def keep_previous(self, stores: set[str]) -> None:
+        """--resume 時: 前回マニフェストのうち完了済み店舗の行を引き継ぐ"""
+        for f in self._previous_files():
+            if str(f.get("store")) in stores:
+                self.files[f["path"]] = f
+
+    def keep_previous_except(self, stores) -> None:
+        """店舗を絞った再発行時: 今回出力しない店の前回マニフェスト行を引き継ぐ（大分類・対象日が同じときだけ）"""
+        skip = {str(s) for s in stores}
+        for f in self._previous_files():
+            if f.get("store") is not None and str(f["store"]) not in skip:
+                self.files[f["path"]] = f
+
+    def add(self, relpath, data: bytes, store=None, sheets: int = 0, render_sec: float = 0.0,
+            bundle: str | None = None, raw_size: int | None = None) -> None:
+        """
+        bundle: zip 出力時の格納先 zip 名（path は zip 内のパス）
+        raw_size: --optimize 時の最適化前のサイズ
+        """
+        rel = Path(relpath).as_posix()
+        self.files[rel] = {
+            "path": rel,
+            "store": None if store is None else str(store),
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "sheets": int(sheets),
+            "render_sec": round(float(render_sec), 3),
+        }
+        if bundle:
+            self.files[rel]["bundle"] = bundle
+        if raw_size is not None:
+            self.files[rel]["raw_size"] = int(raw_size)
+
+    def write(self, complete: bool = True) -> Path:
+        files = sorted(self.files.values(), key=lambda f: f["path"])
+        doc = {
+            "version": MANIFEST_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "complete": complete,
+            **self.meta,
+            "elapsed_sec": round(time.perf_counter() - self._t0, 3),
+            "file_count": len(files),
+            "total_bytes": sum(f["size"] for f in files),
+            "files": files,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(doc, ensure_ascii=False, indent=1).encode("utf-8"))
+        return self.path
@@ -0,0 +1,120 @@
+# scripts/page_layout.py
+"""
+ページ/ブロック配置の記述子。
+
+テンプレートスナップショットの geometry（または JSON 設定）から、
+1ページ内の全セル座標 (ブロック, 順位, 項目) を一度だけ計算しておく。
+描画側は座標計算をせず、決まったスロットに値を書くだけになる。
+
+JSON 設定（任意。指定したキーだけ上書き）:
+    {"days_per_page": 7, "block_offsets": [0, 8, 16, 24, 32, 40, 48], "max_rank": 50,
+     "detail_first_row": 4, "header_row": 3, "block_header_row": 2, "footer_rows": [55, 56, 57],
+     "compare_columns": [7, 8]}
+
+compare_columns はブロック内の空き列（1始まり）。前年比較（--compare-previous-year）の
+前年金額・前年比をここに書く。
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+# 明細の項目（列順）
+DETAIL_FIELDS = ("rank", "name", "amount", "qty", "discount", "rate")
+DETAIL_HEADERS = ("順位", "商品名", "売上金額", "売上数量", "値引金額", "値引率")
+RATE_FORMAT = "0.00%"
+COMPARE_HEADERS = ("前年金額", "前年比")
+
+Cell = tuple[int, int]  # (row, column) 1始まり
+
+
+@dataclass(frozen=True)
+class BlockSlots:
+    """1ブロック（=1日分）のセル座標"""
+    block_header: tuple[Cell, Cell, Cell, Cell]   # 年(2桁), 月/日, 店名, 大分類単品
+    headers: tuple[Cell, ...]                      # DETAIL_HEADERS の位置
+    details: tuple[tuple[Cell, ...], ...]          # [順位-1][項目] → 座標
+    footer_labels: tuple[Cell, Cell, Cell]         # 惣菜売上金額 / 大分類売上金額 / 大分類構成比
+    footer_values: tuple[Cell, Cell, Cell]
+    compare_date: Cell                             # 前年の日付（ブロックヘッダ行）
+    compare_headers: tuple[Cell, Cell]             # COMPARE_HEADERS の位置
+    compare_details: tuple[tuple[Cell, Cell], ...]  # [順位-1] → (前年金額, 前年比)
+    compare_footer: tuple[tuple[Cell, Cell], ...]   # フッタ3行 → (前年値, 前年比)
+
+
+@dataclass(frozen=True)
+class PageLayout:
+    days_per_page: int
+    block_offsets: tuple[int, ...]
+    block_header_row: int
+    header_row: int
+    detail_first_row: int
+    max_rank: int
+    footer_rows: tuple[int, int, int]
+    compare_columns: tuple[int, int]
+    blocks: tuple[BlockSlots, ...]
+
+    @classmethod
+    def build(cls, *, block_offsets, block_header_row=2, header_row=3, detail_first_row=4,
+              max_rank=35, footer_rows=(40, 41, 42), days_per_page=None,
+              compare_columns=(7, 8)) -> "PageLayout":
+        block_offsets = tuple(int(x) for x in block_offsets)
+        c1, c2 = (int(c) for c in compare_columns)
+        days_per_page = int(days_per_page or len(block_offsets))
+        if days_per_page > len(block_offsets):
+            raise ValueError(f"days_per_page={days_per_page} exceeds blocks={len(block_offsets)}")
+        f1, f2, f3 = (int(r) for r in footer_rows)
+
+        blocks = []
+        for off in block_offsets[:days_per_page]:
+            blocks.append(BlockSlots(
+                block_header=tuple((block_header_row, off + i) for i in range(1, 5)),
+                headers=tuple((header_row, off + 1 + i) for i in range(len(DETAIL_HEADERS))),
+                details=tuple(
+                    tuple((detail_first_row + rank, off + 1 + i) for i in range(len(DETAIL_FIELDS)))
+                    for rank in range(max_rank)
+                ),
+                footer_labels=((f1, off + 1), (f2, off + 1), (f3, off + 1)),
+                footer_values=((f1, off + 3), (f2, off + 3), (f3, off + 3)),
+                compare_date=(block_header_row, off + c1),
+                compare_headers=((header_row, off + c1), (header_row, off + c2)),
+                compare_details=tuple(
+                    ((detail_first_row + rank, off + c1), (detail_first_row + rank, off + c2))
+                    for rank in range(max_rank)
+                ),
+                compare_footer=tuple(((f, off + c1), (f, off + c2)) for f in (f1, f2, f3)),
+            ))
+        return cls(days_per_page=days_per_page, block_offsets=block_offsets,
+                   block_header_row=int(block_header_row), header_row=int(header_row),
+                   detail_first_row=int(detail_first_row), max_rank=int(max_rank),
+                   footer_rows=(f1, f2, f3), compare_columns=(c1, c2), blocks=tuple(blocks))
+
+    @classmethod
+    def default(cls) -> "PageLayout":
+        """従来のハードコード値（4ブロック×8列、Top35、フッタ40–42行）"""
+        return cls.build(block_offsets=(0, 8, 16, 24))
+
+    @classmethod
+    def from_geometry(cls, geo, **overrides) -> "PageLayout":
+        """template_snapshot.TemplateGeometry から作る（overrides で個別に上書き）"""
+        params = dict(
+            block_offsets=geo.block_offsets,
+            block_header_row=geo.block_header_row,
+            header_row=geo.header_row,
+            detail_first_row=geo.detail_first_row,
+            max_rank=geo.max_rank,
+            footer_rows=geo.footer_rows,
+        )
+        params.update({k: v for k, v in overrides.items() if v is not None})
+        return cls.build(**params)
+
+
+def load_page_layout(snapshot=None, config_path: Path | str | None = None) -> PageLayout:
+    """スナップショットの geometry を基本に、config_path の JSON があれば上書きして返す"""
+    overrides = {}
+    if config_path:
+        overrides = json.loads(Path(config_path).read_text(encoding="utf-8"))
+    if snapshot is None:
+        return PageLayout.build(**{**dict(block_offsets=(0, 8, 16, 24)), **overrides})
+    return PageLayout.from_geometry(snapshot.geometry, **overrides)
@@ -0,0 +1,99 @@
+# scripts/progress.py
+"""
+機械可読な進捗イベント（JSON Lines）。
+
+    {"event": "stage_start", "stage": "load_sales", "ts": ...}
+    {"event": "stage_end",   "stage": "load_sales", "elapsed_sec": 1.2, "rows": 123456, "ts": ...}
+    {"event": "stores_start", "total": 41, "ts": ...}
+    {"event": "store_done", "store": "3", "done": 3, "total": 41, "rows": 140, "bytes": 36008,
+     "elapsed_sec": 2.1, "stores_per_sec": 1.4, "eta_sec": 27.1, "ts": ...}
+    {"event": "run_end", "elapsed_sec": 30.2, "bytes": 1480000, "ts": ...}
+
+CLI では --progress-fd N で出力先のファイルディスクリプタを指定する（GUI は 2=stderr を使う）。
+ライブラリからは ProgressReporter(callback=...) でイベント dict を受け取れる。
+出力先なしの ProgressReporter() は何も出さない（呼び出しごとに新しく作る。件数・バイト数を持つので共有しない）。
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ProgressReporter:
+    def __init__(self, stream=None, callback=None, echo: bool = False):
+        self.stream = stream          # JSON Lines の書き出し先（text）
+        self.callback = callback      # callback(event_dict)
+        self.echo = echo              # 人向けの [progress] 行を stdout に出す
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._stores_t0 = None
+        self._stores_total = 0
+        self._stores_done = 0
+        self._bytes = 0
+
+    @classmethod
+    def from_fd(cls, fd: int, **kwargs) -> "ProgressReporter":
+        stream = os.fdopen(fd, "w", buffering=1, encoding="utf-8", closefd=False)
+        return cls(stream=stream, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.stream or self.callback or self.echo)
+
+    def emit(self, event: str, **fields) -> None:
+        if not (self.stream or self.callback):
+            return
+        rec = {"event": event, **fields, "ts": round(time.time(), 3)}
+        with self._lock:
+            if self.stream is not None:
+                self.stream.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                self.stream.flush()
+            if self.callback is not None:
+                self.callback(rec)
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """with progress.stage("render") as info: info["rows"] = ...  → stage_end に載る"""
+        info: dict = {}
+        t0 = time.perf_counter()
+        self.emit("stage_start", stage=name, **fields)
+        try:
+            yield info
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.emit("stage_end", stage=name, elapsed_sec=round(elapsed, 3), **fields, **info)
+            if self.echo:
+                print(f"[progress] {name} {elapsed:.1f}s", flush=True)
+
+    def stores_start(self, total: int) -> None:
+        self._stores_t0 = time.perf_counter()
+        self._stores_total = int(total)
+        self._stores_done = 0
+        self.emit("stores_start", total=self._stores_total)
+
+    def store_done(self, store, rows: int = 0, bytes_written: int = 0) -> None:
+        with self._lock:
+            self._stores_done += 1
+            self._bytes += int(bytes_written)
+            done, total = self._stores_done, self._stores_total
+        elapsed = time.perf_counter() - (self._stores_t0 or self._t0)
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else None
+        self.emit("store_done", store=str(store), done=done, total=total, rows=int(rows),
+                  bytes=int(bytes_written), elapsed_sec=round(elapsed, 3),
+                  stores_per_sec=round(rate, 3), eta_sec=None if eta is None else round(eta, 1))
+        if self.echo:
+            eta_s = "-" if eta is None else f"{eta:.0f}s"
+            print(f"[progress] {done}/{total} store={store} eta={eta_s}", flush=True)
+
+    def add_bytes(self, n: int) -> None:
+        """店ごと以外の保存（まとめ版1冊など）のバイト数を run_end の bytes に足す"""
+        with self._lock:
+            self._bytes += int(n)
+
+    def run_end(self, **fields) -> None:
+        self.emit("run_end", elapsed_sec=round(time.perf_counter() - self._t0, 3),
+                  bytes=self._bytes, **fields)
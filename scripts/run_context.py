@@ -0,0 +1,118 @@
+# scripts/run_context.py
+"""
+1回の実行で変わらない設定（大分類名・ページタイトル）をまとめた実行コンテキスト。
+
+- 大分類名は config/category_map.json を唯一の正とする（無い・壊れているときだけビルトイン）。
+  読込はファイルの mtime ごとに1回（常駐サービスで設定を書き換えても次の実行から反映）。
+- タイトルはテンプレートと日付から作る値を最初に1回だけ組み立て、ページ番号ごとの結果を覚える。
+  店が何百あってもタイトル生成はページ数ぶんだけ。
+
+CLI・描画（_prepare_render）・GUI のタイトルプレビューが同じものを使う。
+pandas に依存しない（GUI からも import する）。
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+CATEGORY_MAP_PATH = Path(__file__).resolve().parents[1] / "config" / "category_map.json"
+BUILTIN_CATEGORY_MAP = {"1": "寿司", "2": "弁当", "3": "温総菜", "4": "冷総菜", "5": "軽食", "6": "魚惣菜"}
+DEFAULT_TITLE_TEMPLATE = "{yy}年 {range} {cat}単品データ（{page}）"
+
+
+# === 大分類名 ===
+@lru_cache(maxsize=4)
+def _read_category_map(path: str, mtime_ns: int) -> tuple[tuple[str, str], ...]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return tuple((str(k), str(v)) for k, v in data.items())
+    except (OSError, ValueError, AttributeError):
+        return tuple(BUILTIN_CATEGORY_MAP.items())
+
+
+def load_category_map(path: Path | str = CATEGORY_MAP_PATH) -> dict[str, str]:
+    """{大分類コード: 大分類名}。category_map.json を優先、無ければビルトイン"""
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return dict(BUILTIN_CATEGORY_MAP)
+    return dict(_read_category_map(str(path), mtime))
+
+
+def category_name(code, category_map: dict[str, str] | None = None) -> str:
+    m = load_category_map() if category_map is None else category_map
+    return m.get(str(code), str(code))
+
+
+# === タイトル ===
+def dates_to_range(dates) -> str:
+    """['2024-12-24','2025-01-03'] → '2024-12–2025-01'（同月なら '2024-12'）"""
+    try:
+        ds = sorted(datetime.strptime(str(d).strip(), "%Y-%m-%d") for d in dates if str(d).strip())
+    except ValueError:
+        return ",".join(map(str, dates))
+    if not ds:
+        return ""
+    a, b = ds[0], ds[-1]
+    if a.year == b.year and a.month == b.month:
+        return f"{a.year}-{a.month:02d}"
+    return f"{a.year}-{a.month:02d}–{b.year}-{b.month:02d}"
+
+
+class RunContext:
+    """
+    イベント名あり → 「{event} {cat}単品データ（{page}）」。
+    イベント名が空 → テンプレ（未指定なら DEFAULT_TITLE_TEMPLATE）。$var と {var} の両方を展開。
+    年（{year}/{yy}）・{date} は末尾日で決める。no_date_in_title=True なら日付系は空。
+    """
+
+    def __init__(self, category, dates=(), event_name: str | None = "", title_template: str | None = None,
+                 no_date_in_title: bool = False, category_map: dict[str, str] | None = None):
+        self.category = str(category)
+        self.category_map = load_category_map() if category_map is None else category_map
+        self.cat_name = self.category_map.get(self.category, self.category)
+        self.event_name = (event_name or "").strip()
+        self.dates = [] if no_date_in_title else [str(d) for d in dates]
+        self.template = (title_template or DEFAULT_TITLE_TEMPLATE).strip()
+        self._values = None if self.event_name else self._title_values()
+        self._titles: dict[int, str] = {}
+
+    def _title_values(self) -> dict[str, str]:
+        last = sorted(self.dates)[-1] if self.dates else ""
+        return {
+            "event": self.event_name,
+            "cat": self.cat_name,
+            "category": self.category,
+            "dates": ",".join(self.dates),
+            "dates_short": ",".join(d[5:].replace("-", "/") for d in self.dates),
+            "range": dates_to_range(self.dates),
+            "year": last[:4],
+            "yy": last[2:4],
+            "date": last,
+            "date_short": last[5:].replace("-", "/"),
+        }
+
+    def _render(self, page_no: int) -> str:
+        if self.event_name:
+            return f"{self.event_name} {self.cat_name}単品データ（{page_no}）"
+        values = dict(self._values, page=str(page_no))
+        # 1) $var 形式 → 2) {var} 形式（展開できなければ 1 の結果のまま）
+        s = Template(self.template).safe_substitute(values)
+        try:
+            return s.format(**values)
+        except Exception:
+            return s
+
+    def title(self, page_no: int) -> str:
+        t = self._titles.get(page_no)
+        if t is None:
+            t = self._titles[page_no] = self._render(page_no)
+        return t
+
+    def make_title(self, date_str: str, page_no: int) -> str:
+        """_add_pages_for_one_store の make_title 形（タイトルはページ番号だけで決まる）"""
+        return self.title(page_no)
@@ -0,0 +1,169 @@
+# scripts/sales_source.py
+"""
+月次売上ファイル（data/material/YYYY/IT_YYYYMM.csv）の探索と読込ストリーム。
+
+圧縮版も同じ名前の後ろに拡張子を付けて置ける:
+    IT_202412.csv / .csv.gz / .csv.zst / .csv.xz / .csv.bz2
+同じ月に複数あるときは SALES_SUFFIXES の順（非圧縮が最優先）で1つだけ採用する。
+展開はストリームで行い、ディスクに展開済みファイルは作らない。
+zstd は zstandard パッケージがある環境のみ（無ければ .csv.zst は探索対象外）。
+
+pandas に依存しない（GUI の事前チェックからも import する）。
+"""
+from __future__ import annotations
+
+import bz2
+import gzip
+import hashlib
+import importlib.util
+import io
+import lzma
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+SALES_SUFFIXES = (".csv", ".csv.gz", ".csv.zst", ".csv.xz", ".csv.bz2")
+CODEC_OF = {".csv": "none", ".csv.gz": "gzip", ".csv.zst": "zstd", ".csv.xz": "xz", ".csv.bz2": "bz2"}
+
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def available_suffixes() -> tuple[str, ...]:
+    return tuple(s for s in SALES_SUFFIXES if s != ".csv.zst" or zstd_available())
+
+
+def month_stem(y: int, m: int) -> str:
+    return f"IT_{y}{m:02d}"
+
+
+def sales_suffix(path: Path) -> str:
+    name = Path(path).name
+    for suf in sorted(SALES_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suf):
+            return suf
+    return ""
+
+
+def find_month_file(root: Path, y: int, m: int) -> Path | None:
+    """root/YYYY/IT_YYYYMM.csv[.gz|.zst|.xz|.bz2] のうち最初に見つかったもの"""
+    base = Path(root) / f"{y}"
+    for suf in available_suffixes():
+        p = base / f"{month_stem(y, m)}{suf}"
+        if p.exists():
+            return p
+    return None
+
+
+def source_fingerprint(path: Path, salt: str = "") -> str:
+    """月次ファイルの同一性（名前・サイズ・mtime）の短いハッシュ。派生キャッシュのキー用"""
+    path = Path(path)
+    st = path.stat()
+    raw = f"{salt}|{path.name}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_month_keys(root: Path) -> list[tuple[int, int]]:
+    """root 配下にある月次ファイルの (年, 月) 一覧（圧縮版も含む）"""
+    keys = set()
+    for y_dir in Path(root).glob("*"):
+        if not (y_dir.is_dir() and y_dir.name.isdigit()):
+            continue
+        for f in y_dir.glob("IT_*.csv*"):
+            if sales_suffix(f) not in available_suffixes():
+                continue
+            ym = f.name[3:9]  # IT_YYYYMM...
+            if ym.isdigit():
+                keys.add((int(ym[:4]), int(ym[4:6])))
+    return sorted(keys)
+
+
+# === 読込ストリーム ===
+class _CountingReader(io.RawIOBase):
+    """展開後のバイト数を数えるだけの薄いラッパ"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self.count += n
+        return n
+
+    def close(self) -> None:
+        try:
+            self.raw.close()
+        finally:
+            super().close()
+
+
+def _open_raw(path: Path):
+    codec = CODEC_OF.get(sales_suffix(path), "none")
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "bz2":
+        return bz2.open(path, "rb")
+    if codec == "xz":
+        return lzma.open(path, "rb")
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+@dataclass
+class ReadStats:
+    file: str
+    codec: str
+    disk_bytes: int
+    decoded_bytes: int = 0
+    rows: int = 0
+    sec: float = 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        """ディスク上のバイト数基準の読込スループット（MB/s）"""
+        return self.disk_bytes / 1e6 / self.sec if self.sec > 0 else 0.0
+
+    @property
+    def decoded_mb_per_sec(self) -> float:
+        """展開後のバイト数基準（CSV パース込みの処理速度）"""
+        return self.decoded_bytes / 1e6 / self.sec if self.sec > 0 else 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.decoded_bytes / self.disk_bytes if self.disk_bytes else 0.0
+
+    def line(self) -> str:
+        return (f"[read] {self.file} codec={self.codec} {self.disk_bytes / 1e6:.1f}MB"
+                f"→{self.decoded_bytes / 1e6:.1f}MB (x{self.ratio:.1f}) {self.rows} rows "
+                f"{self.sec:.2f}s {self.mb_per_sec:.1f}MB/s (展開後 {self.decoded_mb_per_sec:.1f}MB/s)")
+
+    def to_dict(self) -> dict:
+        return {"file": self.file, "codec": self.codec, "disk_bytes": self.disk_bytes,
+                "decoded_bytes": self.decoded_bytes, "rows": self.rows, "sec": round(self.sec, 3),
+                "mb_per_sec": round(self.mb_per_sec, 1),
+                "decoded_mb_per_sec": round(self.decoded_mb_per_sec, 1)}
+
+
+def read_with_stats(path: Path, reader) -> tuple[object, ReadStats]:
+    """
+    reader(binary_stream) で読み（例: lambda f: pd.read_csv(f, encoding=...)）、結果と ReadStats を返す。
+    圧縮ファイルはストリームで展開しながら reader に渡す。
+    """
+    path = Path(path)
+    stats = ReadStats(path.name, CODEC_OF.get(sales_suffix(path), "none"), path.stat().st_size)
+    t0 = time.perf_counter()
+    counter = _CountingReader(_open_raw(path))
+    with io.BufferedReader(counter, buffer_size=1 << 20) as f:
+        result = reader(f)
+    stats.sec = time.perf_counter() - t0
+    stats.decoded_bytes = counter.count
+    return result, stats
@@ -0,0 +1,224 @@
+# scripts/sales_store.py
+"""
+売上の組込み SQLite ストア（任意。標準ライブラリ sqlite3 のみ）。
+
+月次CSVを毎回パースせず、load_sales と同じ正規化済みの行を1つの DB に貯めておき、
+TopN とフッタ合計をインデックス付きのクエリで取り出す。何年分もまたぐイベントでも
+必要な日だけを読む。
+
+    sales(date 'YYYY-MM-DD', store_id, category_large, jan, name, amount, qty, discount)
+      idx_sales_cat_date_store (category_large, date, store_id)  … TopN / 大分類合計
+      idx_sales_date_store     (date, store_id)                  … 惣菜合計
+    months(ym, file, size, mtime_ns, rows, loaded_at)             … 取込済みの月と元ファイル
+
+sync() は月次ファイルのサイズ・mtime が変わった月（と新しい月）だけを入れ替える。
+
+    python -m scripts.sales_store                  # data/material 配下を全月同期
+    python -m scripts.sales_store --db path.sqlite --months 2024-12,2025-01
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from scripts.make_topn_simple_refactor import normalize_sales, read_sales_raw
+from scripts.sales_source import find_month_file, iter_month_keys
+from scripts.template_snapshot import CACHE_DIR
+
+DEFAULT_DB = CACHE_DIR / "sales.sqlite"
+SALES_COLUMNS = ("date", "store_id", "category_large", "jan", "name", "amount", "qty", "discount")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales (
+    date TEXT NOT NULL,
+    store_id TEXT NOT NULL,
+    category_large TEXT NOT NULL,
+    jan TEXT NOT NULL,
+    name TEXT,
+    amount REAL NOT NULL,
+    qty REAL NOT NULL,
+    discount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_cat_date_store ON sales (category_large, date, store_id);
+CREATE INDEX IF NOT EXISTS idx_sales_date_store ON sales (date, store_id);
+CREATE TABLE IF NOT EXISTS months (
+    ym TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL
+);
+"""
+
+
+def _iso(d) -> str:
+    return pd.to_datetime(d).strftime("%Y-%m-%d")
+
+
+def _month_range(y: int, m: int) -> tuple[str, str]:
+    """[月初, 翌月初) の ISO 文字列"""
+    ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
+    return f"{y:04d}-{m:02d}-01", f"{ny:04d}-{nm:02d}-01"
+
+
+def _in_clause(values) -> tuple[str, list]:
+    values = list(values)
+    return ",".join("?" * len(values)), values
+
+
+class SalesStore:
+    def __init__(self, path: Path | str = DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SalesStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # === 取込（差分） ===
+    def loaded_months(self) -> dict[str, tuple[str, int, int]]:
+        rows = self.conn.execute("SELECT ym, file, size, mtime_ns FROM months").fetchall()
+        return {ym: (f, size, mtime) for ym, f, size, mtime in rows}
+
+    def sync(self, root: Path, months=None) -> dict:
+        """
+        root（data/material）の月次ファイルを取り込む。months=[(年, 月), ...] 未指定なら全月。
+        元ファイルが前回と同じ（名前・サイズ・mtime）月は読まない。
+        """
+        root = Path(root)
+        keys = sorted(set(months)) if months else iter_month_keys(root)
+        loaded = self.loaded_months()
+        result = {"loaded": [], "skipped": 0, "rows": 0}
+        for y, m in keys:
+            f = find_month_file(root, y, m)
+            if f is None:
+                continue
+            st = f.stat()
+            ym = f"{y:04d}-{m:02d}"
+            if loaded.get(ym) == (f.name, st.st_size, st.st_mtime_ns):
+                result["skipped"] += 1
+                continue
+            n = self._load_month(root, y, m, f, st)
+            result["loaded"].append(ym)
+            result["rows"] += n
+        return result
+
+    def _load_month(self, root: Path, y: int, m: int, f: Path, st) -> int:
+        df = normalize_sales(read_sales_raw(root, dates=[date(y, m, 1)]))
+        lo, hi = _month_range(y, m)
+        df = df.assign(date=pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"))
+        df = df[(df["date"] >= lo) & (df["date"] < hi)]
+        rows = df[list(SALES_COLUMNS)].itertuples(index=False, name=None)
+        with self.conn:  # 1か月分を1トランザクションで入れ替え
+            self.conn.execute("DELETE FROM sales WHERE date >= ? AND date < ?", (lo, hi))
+            self.conn.executemany(f"INSERT INTO sales VALUES ({','.join('?' * len(SALES_COLUMNS))})", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO months VALUES (?, ?, ?, ?, ?, ?)",
+                (f"{y:04d}-{m:02d}", f.name, st.st_size, st.st_mtime_ns, len(df),
+                 datetime.now().isoformat(timespec="seconds")),
+            )
+        return len(df)
+
+    # === 参照 ===
+    def topn(self, category, dates, top_n: int = 35, stores=None) -> dict:
+        """aggregate_topn と同じ形: {店番: {date: DataFrame(金額降順TopN)}}"""
+        d_in, d_vals = _in_clause(_iso(d) for d in dates)
+        sql = f"""
+            SELECT date, store_id, jan, amount, qty, discount, name FROM (
+                SELECT date, store_id, jan, amount, qty, discount, name,
+                       ROW_NUMBER() OVER (PARTITION BY date, store_id ORDER BY amount DESC) AS rn
+                FROM sales
+                WHERE category_large = ? AND date IN ({d_in}) {{store_filter}}
+            ) WHERE rn <= ?
+            ORDER BY date, store_id, rn
+        """
+        params = [str(category), *d_vals]
+        store_filter = ""
+        if stores is not None:
+            s_in, s_vals = _in_clause(str(s) for s in stores)
+            store_filter = f"AND store_id IN ({s_in})"
+            params += s_vals
+        params.append(int(top_n))
+        df = pd.read_sql_query(sql.format(store_filter=store_filter), self.conn, params=params)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+
+        out: dict = {}
+        for (store, d), sub in df.groupby(["store_id", "date"], sort=False):
+            out.setdefault(store, {})[d] = sub.reset_index(drop=True)
+        return out
+
+    def totals(self, category, dates, stores=None) -> tuple[dict, dict]:
+        """build_totals と同じ形: (惣菜合計, 大分類合計) いずれも {(date, 店番): 金額}"""
+        d_in, params = _in_clause(_iso(d) for d in dates)
+        store_filter = ""
+        if stores is not None:
+            s_in, s_vals = _in_clause(str(s) for s in stores)
+            store_filter = f"AND store_id IN ({s_in})"
+            params += s_vals
+        sql = f"""
+            SELECT date, store_id, SUM(amount),
+                   SUM(CASE WHEN category_large = ? THEN amount ELSE 0 END),
+                   SUM(category_large = ?)
+            FROM sales
+            WHERE date IN ({d_in}) {store_filter}
+            GROUP BY date, store_id
+        """
+        total_all, total_cat = {}, {}
+        cat = str(category)
+        for d, store, amt_all, amt_cat, n_cat in self.conn.execute(sql, [cat, cat, *params]):
+            key = (date.fromisoformat(d), store)
+            total_all[key] = amt_all
+            if n_cat:
+                total_cat[key] = amt_cat
+        return total_all, total_cat
+
+    def sales(self, dates, stores=None) -> pd.DataFrame:
+        """load_sales と同じ形の行（date は datetime.date）。前年比較など明細全体が要るとき用"""
+        d_in, params = _in_clause(_iso(d) for d in dates)
+        store_filter = ""
+        if stores is not None:
+            s_in, s_vals = _in_clause(str(s) for s in stores)
+            store_filter = f"AND store_id IN ({s_in})"
+            params += s_vals
+        sql = f"SELECT {', '.join(SALES_COLUMNS)} FROM sales WHERE date IN ({d_in}) {store_filter}"
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        return df
+
+    def stats(self) -> dict:
+        n, = self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()
+        return {"path": str(self.path), "rows": n, "months": sorted(self.loaded_months()),
+                "bytes": self.path.stat().st_size if self.path.exists() else 0}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    proj_root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="月次CSVを SQLite ストアへ差分取込")
+    parser.add_argument("--db", type=str, default=str(DEFAULT_DB))
+    parser.add_argument("--material", type=str, default=str(proj_root / "data" / "material"))
+    parser.add_argument("--months", type=str, default="", help="YYYY-MM をカンマ区切り（未指定なら全月）")
+    args = parser.parse_args()
+
+    months = [tuple(int(x) for x in ym.split("-")) for ym in args.months.split(",") if ym]
+    t0 = time.perf_counter()
+    with SalesStore(args.db) as store:
+        res = store.sync(Path(args.material), months or None)
+        info = store.stats()
+    print(f"[ok] sync {time.perf_counter() - t0:.1f}s loaded={res['loaded']} skipped={res['skipped']} "
+          f"rows+={res['rows']} total_rows={info['rows']} → {info['path']}")
@@ -0,0 +1,107 @@
+# scripts/table_export.py
+"""
+Excel を作らない軽量出力（--format csv / jsonl / parquet）。
+
+aggregate_topn の結果（store → date → DataFrame）を縦持ちの1表にまとめる。
+openpyxl は使わない。1行 = 店×日×順位で、フッタ合計は同じ店×日の行に繰り返して載せる。
+
+    store_id, store_name, date, rank, jan, name, amount, qty, discount, rate,
+    total_all（惣菜売上金額）, total_cat（大分類売上金額）, cat_ratio（大分類構成比）
+
+rate / cat_ratio は xlsx と同じく 0〜1 の比率。
+前年比較（--compare-previous-year）時は末尾に COMPARE_COLUMNS（前年金額・前年比・前年の合計）が付く。
+parquet は pyarrow（または fastparquet）が入っている環境でのみ使える。
+"""
+from __future__ import annotations
+
+import importlib.util
+from io import BytesIO
+
+import pandas as pd
+
+TABLE_FORMATS = ("csv", "jsonl", "parquet")
+TABLE_SUFFIX = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+TABLE_COLUMNS = (
+    "store_id", "store_name", "date", "rank", "jan", "name", "amount", "qty", "discount", "rate",
+    "total_all", "total_cat", "cat_ratio",
+)
+COMPARE_COLUMNS = ("prev_amount", "yoy", "prev_total_all", "prev_total_cat")
+
+
+def topn_table(topn_dict: dict, store_names: dict[str, str],
+               total_all_dict: dict, total_cat_dict: dict, prev_totals=None) -> pd.DataFrame:
+    """
+    TopN 辞書 + フッタ合計辞書（build_totals の戻り値）→ TABLE_COLUMNS の DataFrame。
+    prev_totals（前年の (惣菜合計, 大分類合計)）を渡すと COMPARE_COLUMNS も付ける
+    """
+    frames = [
+        df_day.assign(store_id=str(store), date=d)
+        for store, day_map in topn_dict.items()
+        for d, df_day in day_map.items()
+        if df_day is not None and not df_day.empty
+    ]
+    if not frames:
+        return pd.DataFrame(columns=list(TABLE_COLUMNS))
+
+    df = pd.concat(frames, ignore_index=True)
+    for col, default in (("jan", ""), ("name", ""), ("qty", 0.0), ("discount", 0.0)):
+        if col not in df.columns:
+            df[col] = default
+    # 店番順 → ロールアップ（"area:鹿行" 等）の順
+    from scripts.make_topn_simple_refactor import unit_sort_key
+    order = {s: i for i, s in enumerate(sorted(df["store_id"].unique(), key=unit_sort_key))}
+    df = df.sort_values(["store_id", "date"], kind="stable",
+                        key=lambda s: s.map(order) if s.name == "store_id" else s)
+    # 各 day_map は金額降順なので、店×日の中での出現順がそのまま順位
+    df["rank"] = df.groupby(["store_id", "date"], sort=False).cumcount() + 1
+
+    amount = df["amount"].astype(float).fillna(0.0)
+    discount = df["discount"].astype(float).fillna(0.0)
+    df["amount"] = amount
+    df["qty"] = df["qty"].astype(float).fillna(0.0)
+    df["discount"] = discount
+    df["rate"] = (discount / amount.where(amount != 0)).fillna(0.0)
+    df["store_name"] = df["store_id"].map(store_names).fillna("")
+
+    keys = list(zip(df["date"], df["store_id"]))
+    total_all = pd.Series([total_all_dict.get(k, 0.0) for k in keys], index=df.index, dtype=float)
+    total_cat = pd.Series([total_cat_dict.get(k, 0.0) for k in keys], index=df.index, dtype=float)
+    df["total_all"] = total_all
+    df["total_cat"] = total_cat
+    df["cat_ratio"] = (total_cat / total_all.where(total_all != 0)).fillna(0.0)
+
+    columns = list(TABLE_COLUMNS)
+    if prev_totals is not None:
+        prev_all_dict, prev_cat_dict = prev_totals
+        for col in ("prev_amount", "yoy"):
+            if col not in df.columns:
+                df[col] = float("nan")
+        df["prev_total_all"] = pd.Series([prev_all_dict.get(k) for k in keys], index=df.index, dtype=float)
+        df["prev_total_cat"] = pd.Series([prev_cat_dict.get(k) for k in keys], index=df.index, dtype=float)
+        columns += COMPARE_COLUMNS
+
+    df["jan"] = df["jan"].astype(str)
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    return df[columns].reset_index(drop=True)
+
+
+def parquet_available() -> bool:
+    return any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
+
+def table_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    """DataFrame → 指定形式のバイト列（CSV は Excel でそのまま開けるよう BOM 付き UTF-8）"""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "jsonl":
+        if df.empty:
+            return b""
+        return df.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8")
+    if fmt == "parquet":
+        buf = BytesIO()
+        try:
+            df.to_parquet(buf, index=False)
+        except ImportError as e:
+            raise RuntimeError("parquet 出力には pyarrow が必要です（pip install pyarrow）") from e
+        return buf.getvalue()
+    raise ValueError(f"unknown table format: {fmt}")
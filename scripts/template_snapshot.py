@@ -0,0 +1,217 @@
+# scripts/template_snapshot.py
+"""
+配布フォーマット.xlsx のコンパイル済みスナップショット。
+
+テンプレートを一度だけ openpyxl で解析し、
+  - ブロック配置（4ブロック×8列、見出し行3、明細行4–38、フッタ行40–42）
+  - 明細列の表示形式
+  - TEMPLATE シートの条件付き書式ルール
+  - 解析済み Workbook（pickle）
+を data/cache/<テンプレ名>.snapshot.pkl に保存する。
+テンプレートの mtime/サイズ/sha256 または openpyxl のバージョンが変わると作り直す。
+
+明示的にコンパイルする場合:
+    python -m scripts.template_snapshot [テンプレートのパス]
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import openpyxl
+from openpyxl import load_workbook
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "cache"
+DEFAULT_TEMPLATE = Path(__file__).resolve().parents[1] / "data" / "template" / "配布フォーマット.xlsx"
+SNAPSHOT_VERSION = 1
+TEMPLATE_SHEET = "TEMPLATE"
+
+
+@dataclass
+class TemplateGeometry:
+    """TEMPLATE シートのブロック配置（1始まりの行/列番号）"""
+    block_offsets: list[int] = field(default_factory=lambda: [0, 8, 16, 24])
+    block_width: int = 8
+    block_header_row: int = 2          # 年・月日・店名・大分類
+    header_row: int = 3                # 順位/商品名/...
+    detail_first_row: int = 4
+    detail_last_row: int = 38
+    footer_rows: list[int] = field(default_factory=lambda: [40, 41, 42])
+    headers: list[str] = field(default_factory=lambda: ["順位", "商品名", "売上金額", "売上数", "値引金額", "値引率"])
+
+    @property
+    def max_rank(self) -> int:
+        return self.detail_last_row - self.detail_first_row + 1
+
+
+@dataclass
+class TemplateSnapshot:
+    source: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    openpyxl_version: str
+    geometry: TemplateGeometry
+    detail_number_formats: list[str]       # 明細1行目の各列の表示形式
+    cf_items: list[tuple[str, list]]       # [(sqref, [Rule, ...]), ...]
+    workbook_pickle: bytes
+    version: int = SNAPSHOT_VERSION
+
+    def new_workbook(self):
+        """テンプレートを開いた直後と同じ Workbook を返す（xlsx の再解析なし）"""
+        return pickle.loads(self.workbook_pickle)
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def conditional_formatting_items(ws) -> list[tuple[str, list]]:
+    """ワークシートの条件付き書式を [(sqref, [Rule, ...])] で返す"""
+    cf = ws.conditional_formatting
+    # openpyxlの内部構造はバージョンで差があります。代表的な2系統に対応。
+    if hasattr(cf, "cf_rules"):  # 3.1系で公開属性がある場合
+        items = cf.cf_rules.items()
+    elif hasattr(cf, "_cf_rules"):  # 旧来: _cf_rules にレンジ→ルールlist
+        items = cf._cf_rules.items()
+    else:  # 3.1系: ConditionalFormatting を列挙
+        items = ((c.sqref, c.rules) for c in cf)
+    return [(str(getattr(rng, "sqref", rng)), list(rules)) for rng, rules in items]
+
+
+def analyze_template(ws) -> TemplateGeometry:
+    """
+    TEMPLATE シートからブロック配置を読み取る。
+    見出し「順位」の位置でブロック列を、A列の連番で明細行を、その後の非空行でフッタ行を決める。
+    読み取れない部分は既定値（従来のハードコード値）のまま。
+    """
+    geo = TemplateGeometry()
+
+    header_row = next((r for r in range(1, 11) if ws.cell(r, 1).value == "順位"), None)
+    if header_row is None:
+        return geo
+    geo.header_row = header_row
+    geo.block_header_row = header_row - 1
+
+    cols = [c for c in range(1, ws.max_column + 1) if ws.cell(header_row, c).value == "順位"]
+    if cols:
+        geo.block_offsets = [c - 1 for c in cols]
+        if len(cols) > 1:
+            geo.block_width = cols[1] - cols[0]
+        headers = []
+        for c in range(cols[0], cols[0] + geo.block_width):
+            v = ws.cell(header_row, c).value
+            if v is None:
+                break
+            headers.append(str(v))
+        geo.headers = headers
+
+    r = header_row + 1
+    geo.detail_first_row = r
+    while ws.cell(r, 1).value == r - header_row:
+        r += 1
+    if r > geo.detail_first_row:
+        geo.detail_last_row = r - 1
+
+    footer = [rr for rr in range(geo.detail_last_row + 1, ws.max_row + 1)
+              if ws.cell(rr, 1).value not in (None, "")]
+    if footer:
+        geo.footer_rows = footer[:3]
+    return geo
+
+
+def compile_template(template_path: Path = DEFAULT_TEMPLATE, cache_dir: Path | None = CACHE_DIR) -> TemplateSnapshot:
+    """テンプレートを解析してスナップショットを作る（cache_dir があれば保存）"""
+    template_path = Path(template_path)
+    st = template_path.stat()
+    wb = load_workbook(template_path)
+    ws = wb[TEMPLATE_SHEET]
+    geo = analyze_template(ws)
+    formats = [ws.cell(geo.detail_first_row, 1 + i).number_format for i in range(len(geo.headers))]
+
+    snap = TemplateSnapshot(
+        source=str(template_path.resolve()),
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        sha256=file_sha256(template_path),
+        openpyxl_version=openpyxl.__version__,
+        geometry=geo,
+        detail_number_formats=formats,
+        cf_items=conditional_formatting_items(ws),
+        workbook_pickle=pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL),
+    )
+    if cache_dir is not None:
+        out = _snapshot_path(template_path, cache_dir)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(out.name + ".tmp")
+        tmp.write_bytes(pickle.dumps(snap, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, out)
+    return snap
+
+
+def _snapshot_path(template_path: Path, cache_dir: Path) -> Path:
+    return Path(cache_dir) / f"{Path(template_path).stem}.snapshot.pkl"
+
+
+def _is_fresh(snap: TemplateSnapshot, template_path: Path, st: os.stat_result) -> bool:
+    if snap.version != SNAPSHOT_VERSION or snap.openpyxl_version != openpyxl.__version__:
+        return False
+    if snap.size != st.st_size:
+        return False
+    if snap.mtime_ns == st.st_mtime_ns:
+        return True
+    # mtime だけ変わった（コピーし直し等）なら内容で判定
+    return snap.sha256 == file_sha256(template_path)
+
+
+_memo: dict[tuple[str, int, int], TemplateSnapshot] = {}
+_memo_lock = threading.Lock()
+
+
+def load_template_snapshot(template_path: Path = DEFAULT_TEMPLATE,
+                           cache_dir: Path | None = CACHE_DIR) -> TemplateSnapshot:
+    """
+    最新のスナップショットを返す。プロセス内メモ → キャッシュファイル → 再コンパイルの順。
+    """
+    template_path = Path(template_path)
+    st = template_path.stat()
+    key = (str(template_path.resolve()), st.st_mtime_ns, st.st_size)
+    with _memo_lock:
+        snap = _memo.get(key)
+        if snap is not None:
+            return snap
+
+        snap = None
+        if cache_dir is not None:
+            p = _snapshot_path(template_path, cache_dir)
+            try:
+                with open(p, "rb") as f:
+                    cand = pickle.load(f)
+                if isinstance(cand, TemplateSnapshot) and _is_fresh(cand, template_path, st):
+                    snap = cand
+            except Exception:
+                snap = None
+        if snap is None:
+            snap = compile_template(template_path, cache_dir=cache_dir)
+        _memo[key] = snap
+        return snap
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TEMPLATE
+    snap = compile_template(path)
+    g = snap.geometry
+    print(f"[ok] compiled → {_snapshot_path(path, CACHE_DIR)}")
+    print(f"     blocks={g.block_offsets} width={g.block_width} header_row={g.header_row} "
+          f"detail={g.detail_first_row}-{g.detail_last_row} footer={g.footer_rows} "
+          f"cf_ranges={len(snap.cf_items)}")
@@ -0,0 +1,113 @@
+# scripts/topn_api.py
+"""
+ライブラリ用の公開API。CLI（__main__）を経由せず、読込済みの DataFrame から
+配布用ブックをメモリ上で生成する。
+
+    from scripts.make_topn_simple_refactor import load_sales, load_store_master
+    from scripts.topn_api import generate
+
+    res = generate(df_sales, store_names, category=1, dates=dates, event_name="年末年始")
+    for f in res.files:
+        f.relpath, f.data      # "3/3_寿司単品データ.xlsx", b"PK..."
+
+sink を渡すとブックのバイト列は保持せず、生成し次第 sink(relpath, data) に渡す
+（zip やHTTPレスポンスへの逐次書き出し用）。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from scripts.make_topn_simple_refactor import (
+    aggregate_topn, build_combined_workbook, iter_store_workbooks, store_row_count, workbook_bytes,
+)
+from scripts.page_layout import PageLayout, load_page_layout
+from scripts.progress import ProgressReporter
+from scripts.run_context import DEFAULT_TITLE_TEMPLATE
+from scripts.template_snapshot import DEFAULT_TEMPLATE, load_template_snapshot
+
+
+@dataclass
+class OutputFile:
+    store: str | None        # まとめ版は None
+    relpath: str             # split と同じ相対パス（まとめ版は out_name）
+    size: int
+    data: bytes | None = None  # sink 指定時は None
+
+
+@dataclass
+class TopNResult:
+    files: list[OutputFile] = field(default_factory=list)
+    topn: dict = field(default_factory=dict)  # aggregate_topn の結果（store → date → DataFrame）
+
+    def by_store(self) -> dict[str, bytes]:
+        """{店番: xlsx バイト列}（sink 指定時は空）"""
+        return {f.store: f.data for f in self.files if f.store is not None and f.data is not None}
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(f.size for f in self.files)
+
+
+def generate(sales: pd.DataFrame,
+             store_names: dict[str, str],
+             category: int | str,
+             dates: list,
+             *,
+             event_name: str = "",
+             title_template: str = DEFAULT_TITLE_TEMPLATE,
+             no_date_in_title: bool = False,
+             top_n: int | None = None,
+             layout: PageLayout | None = None,
+             template_path: Path | str = DEFAULT_TEMPLATE,
+             stores: list[str] | None = None,
+             split_by_store: bool = True,
+             out_name: str = "topN.xlsx",
+             sink: Callable[[str, bytes], None] | None = None,
+             progress: ProgressReporter | None = None) -> TopNResult:
+    """
+    sales       : load_sales の戻り値（category_large を含む標準列）
+    store_names : load_store_master の戻り値 {店番: 短縮名}
+    dates       : list[date or 'YYYY-MM-DD']
+    split_by_store=True なら店別ブック、False ならまとめ版1冊を返す。
+    top_n 未指定ならページ配置の明細行数（既定テンプレは35）。
+    progress を渡すと店ごとの完了（行数・バイト数・ETA）を通知する。
+    stores（店番リスト）を渡すとその店だけ集計・描画する（resolve_stores でグループ名も展開可）。
+    """
+    progress = progress or ProgressReporter()
+    dates = [pd.to_datetime(d).date() for d in dates]
+    layout = layout or load_page_layout(load_template_snapshot(template_path))
+    if stores is not None:
+        sales = sales[sales["store_id"].astype(str).isin({str(s) for s in stores})]
+    topn = aggregate_topn(sales, category=category, top_n=top_n or layout.max_rank, dates=dates)
+    render_args = dict(
+        template_path=template_path, topn_dict=topn, store_names=store_names,
+        category=category, dates=dates, event_name=event_name, df_sales_all=sales,
+        title_template=title_template, no_date_in_title=no_date_in_title, layout=layout,
+    )
+
+    result = TopNResult(topn=topn)
+
+    def _emit(store, relpath: str, data: bytes) -> None:
+        if sink is not None:
+            sink(relpath, data)
+            result.files.append(OutputFile(store, relpath, len(data)))
+        else:
+            result.files.append(OutputFile(store, relpath, len(data), data))
+
+    if split_by_store:
+        progress.stores_start(len(topn))
+        for store, relpath, wb in iter_store_workbooks(**render_args):
+            data = workbook_bytes(wb)
+            _emit(store, relpath.as_posix(), data)
+            progress.store_done(store, rows=store_row_count(topn[store]), bytes_written=len(data))
+    else:
+        data = workbook_bytes(build_combined_workbook(**render_args, progress=progress))
+        _emit(None, out_name, data)
+        progress.add_bytes(len(data))
+    progress.run_end(files=len(result.files))
+
+    return result
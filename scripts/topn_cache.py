@@ -0,0 +1,181 @@
+# scripts/topn_cache.py
+"""
+日単位の TopN 結果キャッシュ（data/cache/topn_days.sqlite）。
+
+イベントは日付が重なる（12/24–25 はクリスマス・年末・年末年始のどれにも入る）ので、
+(大分類, 日付, top_n, 元データのフィンガープリント) ごとに全店分の
+「順位付きの明細行」と「フッタ合計（惣菜/大分類）」を保存しておき、
+新しいイベントでは未計算の日だけを集計する。
+
+- フィンガープリントはその日が属する月次ファイルの (名前, サイズ, mtime)。
+  その月のファイルが差し替われば、その月の日だけが自然に再計算になる。
+- 1日分は全店まとめて保存・破棄する（days テーブルが「その日は全店計算済み」の印）。
+- 合計サイズが max_bytes を超えたら、最後に使われた時刻が古い日から捨てる（LRU）。
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from scripts.sales_source import find_month_file, source_fingerprint
+from scripts.template_snapshot import CACHE_DIR
+
+DEFAULT_CACHE = CACHE_DIR / "topn_days.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_VERSION = 1
+
+# aggregate_topn の戻り値と同じ列順
+TOPN_COLUMNS = ("date", "store_id", "jan", "amount", "qty", "discount", "name")
+_ROW_FIELDS = ("jan", "name", "amount", "qty", "discount")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    top_n INTEGER NOT NULL,
+    fp TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (category, date, top_n, fp)
+);
+CREATE TABLE IF NOT EXISTS store_days (
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    top_n INTEGER NOT NULL,
+    fp TEXT NOT NULL,
+    store_id TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    total_all REAL,
+    total_cat REAL,
+    PRIMARY KEY (category, date, top_n, fp, store_id)
+);
+"""
+
+
+def month_fingerprints(sales_root: Path, dates) -> dict[date, str]:
+    """{日付: その月の月次ファイルのフィンガープリント}（ファイルが無い月の日は含めない）"""
+    by_month: dict[tuple[int, int], str | None] = {}
+    out = {}
+    for d in dates:
+        d = pd.to_datetime(d).date()
+        ym = (d.year, d.month)
+        if ym not in by_month:
+            f = find_month_file(sales_root, *ym)
+            by_month[ym] = None if f is None else source_fingerprint(f, salt=str(CACHE_VERSION))
+        if by_month[ym] is not None:
+            out[d] = by_month[ym]
+    return out
+
+
+class TopNDayCache:
+    def __init__(self, path: Path | str = DEFAULT_CACHE, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, category, dates, top_n: int, fps: dict,
+            stores=None) -> tuple[dict, tuple[dict, dict], list]:
+        """
+        キャッシュ済みの日を組み立てて (topn_dict, (惣菜合計, 大分類合計), 未計算の日付リスト) を返す。
+        fps は month_fingerprints の戻り値（無い日は常に未計算扱い）。
+        stores を渡すとその店の行だけ返す。
+        """
+        cat = str(category)
+        keep = None if stores is None else {str(s) for s in stores}
+        topn: dict = {}
+        total_all: dict = {}
+        total_cat: dict = {}
+        missing = []
+        now = time.time()
+        for d in dates:
+            d = pd.to_datetime(d).date()
+            fp = fps.get(d)
+            key = (cat, d.isoformat(), int(top_n), fp)
+            if fp is None or self.conn.execute(
+                    "SELECT 1 FROM days WHERE category=? AND date=? AND top_n=? AND fp=?", key).fetchone() is None:
+                missing.append(d)
+                continue
+            self.conn.execute("UPDATE days SET last_used=? WHERE category=? AND date=? AND top_n=? AND fp=?",
+                              (now, *key))
+            for store, rows, amt_all, amt_cat in self.conn.execute(
+                    "SELECT store_id, rows, total_all, total_cat FROM store_days "
+                    "WHERE category=? AND date=? AND top_n=? AND fp=?", key):
+                if keep is not None and store not in keep:
+                    continue
+                if amt_all is not None:
+                    total_all[(d, store)] = amt_all
+                if amt_cat is not None:
+                    total_cat[(d, store)] = amt_cat
+                records = json.loads(rows)
+                if records:
+                    df = pd.DataFrame(records, columns=list(_ROW_FIELDS))
+                    df.insert(0, "store_id", store)
+                    df.insert(0, "date", d)
+                    topn.setdefault(store, {})[d] = df[list(TOPN_COLUMNS)]
+        self.conn.commit()
+        return topn, (total_all, total_cat), missing
+
+    def put(self, category, dates, top_n: int, fps: dict, topn: dict, totals: tuple[dict, dict]) -> None:
+        """
+        dates の各日について、全店分の TopN 行と合計を保存する（fps に無い日は保存しない）。
+        店舗を絞って集計した結果は渡さないこと（その日が全店計算済みとして記録される）。
+        """
+        cat = str(category)
+        total_all, total_cat = totals
+        now = time.time()
+        with self.conn:
+            for d in dates:
+                d = pd.to_datetime(d).date()
+                fp = fps.get(d)
+                if fp is None:
+                    continue
+                key = (cat, d.isoformat(), int(top_n), fp)
+                stores = ({s for (dd, s) in total_all if dd == d} | {s for (dd, s) in total_cat if dd == d}
+                          | {s for s, day_map in topn.items() if d in day_map})
+                nbytes = 0
+                self.conn.execute("DELETE FROM store_days WHERE category=? AND date=? AND top_n=? AND fp=?", key)
+                for store in stores:
+                    df_day = topn.get(store, {}).get(d)
+                    records = [] if df_day is None else [
+                        [str(jan), name, float(amt), float(qty), float(disc)]
+                        for jan, name, amt, qty, disc in df_day[list(_ROW_FIELDS)].itertuples(index=False, name=None)
+                    ]
+                    rows = json.dumps(records, ensure_ascii=False)
+                    nbytes += len(rows.encode("utf-8"))
+                    self.conn.execute("INSERT INTO store_days VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (*key, store, rows, total_all.get((d, store)), total_cat.get((d, store))))
+                self.conn.execute("INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?)", (*key, nbytes, now))
+        self.evict()
+
+    def evict(self) -> int:
+        """合計サイズが max_bytes 以下になるまで、最後に使われたのが古い日から捨てる"""
+        total, = self.conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM days").fetchone()
+        removed = 0
+        if total <= self.max_bytes:
+            return 0
+        with self.conn:
+            for cat, d, top_n, fp, nbytes in self.conn.execute(
+                    "SELECT category, date, top_n, fp, nbytes FROM days ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                key = (cat, d, top_n, fp)
+                self.conn.execute("DELETE FROM store_days WHERE category=? AND date=? AND top_n=? AND fp=?", key)
+                self.conn.execute("DELETE FROM days WHERE category=? AND date=? AND top_n=? AND fp=?", key)
+                total -= nbytes
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        days, nbytes = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM days").fetchone()
+        return {"path": str(self.path), "days": days, "bytes": nbytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,331 @@
+# scripts/topn_serve.py
+"""
+TopN データを常駐プロセスから返す簡易 HTTP サーバ（標準ライブラリのみ）。
+
+起動:
+    python -m scripts.topn_serve --port 8765
+
+エンドポイント（127.0.0.1 のみで待受）:
+    GET /topn?category=1&dates=2024-12-24,2024-12-25[&store=3][&top_n=35]
+        → {store: {date: [{rank, jan, name, amount, qty, discount, rate}, ...]}}
+    GET /totals?category=1&dates=...[&store=3]
+        → {store: {date: {all, cat, ratio}}}  （フッタの惣菜/大分類合計と構成比）
+    GET /xlsx?category=1&dates=...&store=3[&event_name=..][&title_template=..][&no_date_in_title=1]
+        → 店別 xlsx（split 出力と同じ内容。メモリ上で生成しディスクを経由しない）
+    GET /metrics → エンドポイント別の件数・レイテンシ(ms)
+    GET /health
+
+月単位の売上（load_sales 済み）は LRU でメモリに保持し（--max-months）、
+2回目以降のリクエストは CSV を読み直さない。
+--arrow なら月データは Arrow キャッシュをメモリマップで開く（CLI・GUI ジョブとページを共有）。
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from calendar import monthrange
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlparse
+
+import pandas as pd
+
+from scripts.make_topn_simple_refactor import (
+    aggregate_topn, build_totals, load_sales, load_store_master,
+)
+from scripts.topn_api import DEFAULT_TITLE_TEMPLATE, generate
+
+
+class MonthCache:
+    """(year, month) → load_sales 済み DataFrame の LRU"""
+
+    def __init__(self, sales_root: Path, max_months: int = 6, use_arrow: bool = False):
+        self.sales_root = Path(sales_root)
+        self.max_months = max(1, int(max_months))
+        self.use_arrow = use_arrow
+        self._data: OrderedDict[tuple[int, int], pd.DataFrame] = OrderedDict()
+        self._loading: dict[tuple[int, int], Future] = {}  # 読込中の月（同じ月の並行読込をまとめる）
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_month(self, y: int, m: int) -> pd.DataFrame:
+        days = [date(y, m, d) for d in range(1, monthrange(y, m)[1] + 1)]
+        if self.use_arrow:
+            # 他プロセス（CLI・GUI ジョブ）と同じ Arrow ファイルをメモリマップで共有
+            from scripts.arrow_dataset import load_sales_arrow
+            df, stats = load_sales_arrow(self.sales_root, days)
+            print(stats.line(), flush=True)
+            return df
+        return load_sales(self.sales_root, dates=days)
+
+    def _month(self, key: tuple[int, int]) -> pd.DataFrame:
+        """
+        1か月分を返す。グローバルロックは辞書の参照・登録だけに使い、読込はロックの外で行う
+        （読込中の月があっても、読込済みの月のリクエストは待たない）。
+        同じ月の読込が並行したら、最初のリクエストだけが読み、他はその Future を待つ。
+        """
+        with self._lock:
+            df = self._data.get(key)
+            if df is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return df
+            fut = self._loading.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._loading[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return fut.result()
+
+        try:
+            df = self._load_month(*key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._data[key] = df
+            while len(self._data) > self.max_months:
+                self._data.popitem(last=False)
+            del self._loading[key]
+        fut.set_result(df)
+        return df
+
+    def get(self, dates: list[date]) -> pd.DataFrame:
+        """dates を含む月を（必要なら読み込んで）結合し、dates だけに絞って返す"""
+        frames = [self._month(key) for key in sorted({(d.year, d.month) for d in dates})]
+        df = pd.concat(frames, ignore_index=True)
+        return df[df["date"].isin(set(dates))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            months = [f"{y:04d}-{m:02d}" for y, m in self._data]
+        return {"months": months, "max_months": self.max_months,
+                "hits": self.hits, "misses": self.misses}
+
+
+class LatencyMetrics:
+    """エンドポイント別のリクエスト数・エラー数・レイテンシ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+
+    def record(self, path: str, ms: float, ok: bool) -> None:
+        with self._lock:
+            m = self._data.setdefault(path, {"count": 0, "errors": 0, "total_ms": 0.0,
+                                             "max_ms": 0.0, "last_ms": 0.0})
+            m["count"] += 1
+            m["errors"] += 0 if ok else 1
+            m["total_ms"] += ms
+            m["max_ms"] = max(m["max_ms"], ms)
+            m["last_ms"] = ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                path: {**m, "avg_ms": (m["total_ms"] / m["count"]) if m["count"] else 0.0}
+                for path, m in self._data.items()
+            }
+
+
+# === クエリ解釈 ===
+def _q(params: dict, key: str, default=None):
+    v = params.get(key)
+    return v[0] if v else default
+
+
+def _parse_dates(raw: str | None) -> list[date]:
+    if not raw:
+        raise ValueError("dates is required (YYYY-MM-DD をカンマ区切り)")
+    return [pd.to_datetime(x.strip()).date() for x in raw.split(",") if x.strip()]
+
+
+def _parse_common(params: dict) -> tuple[str, list[date], str | None]:
+    category = _q(params, "category")
+    if category is None or not str(category).isdigit():
+        raise ValueError("category is required (整数コード)")
+    return str(int(category)), _parse_dates(_q(params, "dates")), _q(params, "store")
+
+
+# === JSON 化 ===
+def topn_rows(df_day: pd.DataFrame) -> list[dict]:
+    rows = []
+    for rank, row in enumerate(df_day.itertuples(index=False), start=1):
+        amt = float(getattr(row, "amount", 0) or 0.0)
+        disc = float(getattr(row, "discount", 0) or 0.0)
+        rows.append({
+            "rank": rank,
+            "jan": str(getattr(row, "jan", "")),
+            "name": getattr(row, "name", ""),
+            "amount": amt,
+            "qty": float(getattr(row, "qty", 0) or 0.0),
+            "discount": disc,
+            "rate": (disc / amt) if amt else 0.0,
+        })
+    return rows
+
+
+class TopNService:
+    """ハンドラから使う処理本体（キャッシュ済みデータ → TopN / 合計 / xlsx）"""
+
+    def __init__(self, proj_root: Path, max_months: int = 6, use_arrow: bool = False):
+        self.proj_root = Path(proj_root)
+        self.sales_root = self.proj_root / "data" / "material"
+        self.template_path = self.proj_root / "data" / "template" / "配布フォーマット.xlsx"
+        store_master = self.sales_root / "master" / "store_master.xlsx"
+        self.store_names = load_store_master(store_master) if store_master.exists() else {}
+        self.months = MonthCache(self.sales_root, max_months=max_months, use_arrow=use_arrow)
+        self.metrics = LatencyMetrics()
+
+    def _topn(self, category, dates, store, top_n=35):
+        df_sales = self.months.get(dates)
+        topn = aggregate_topn(df_sales, category=category, top_n=top_n, dates=dates)
+        if store is not None:
+            if store not in topn:
+                raise KeyError(f"store {store} has no data for category {category}")
+            topn = {store: topn[store]}
+        return df_sales, topn
+
+    def topn(self, params: dict) -> dict:
+        category, dates, store = _parse_common(params)
+        top_n = int(_q(params, "top_n", 35))
+        _, topn = self._topn(category, dates, store, top_n=top_n)
+        return {
+            s: {str(d): topn_rows(df_day) for d, df_day in sorted(day_map.items())}
+            for s, day_map in topn.items()
+        }
+
+    def totals(self, params: dict) -> dict:
+        category, dates, store = _parse_common(params)
+        df_sales, topn = self._topn(category, dates, store)
+        total_all, total_cat = build_totals(df_sales, topn, category, dates)
+        out: dict = {}
+        for (d, s), amt_all in sorted(total_all.items()):
+            if store is not None and s != store:
+                continue
+            amt_cat = float(total_cat.get((d, s), 0.0))
+            out.setdefault(s, {})[str(d)] = {
+                "all": float(amt_all),
+                "cat": amt_cat,
+                "ratio": (amt_cat / amt_all) if amt_all else 0.0,
+            }
+        return out
+
+    def xlsx(self, params: dict) -> tuple[str, bytes]:
+        category, dates, store = _parse_common(params)
+        if store is None:
+            raise ValueError("store is required for /xlsx")
+        df_sales = self.months.get(dates)
+        res = generate(
+            df_sales[df_sales["store_id"] == store],
+            self.store_names,
+            category=category,
+            dates=dates,
+            event_name=_q(params, "event_name", ""),
+            title_template=_q(params, "title_template", DEFAULT_TITLE_TEMPLATE),
+            no_date_in_title=_q(params, "no_date_in_title", "") in ("1", "true"),
+            template_path=self.template_path,
+        )
+        if not res.files:
+            raise KeyError(f"store {store} has no data for category {category}")
+        f = res.files[0]
+        return Path(f.relpath).name, f.data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "topn-serve/1"
+
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, obj) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8")
+
+    def do_GET(self):  # noqa: N802 (http.server の規約)
+        svc: TopNService = self.server.service  # type: ignore[attr-defined]
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        t0 = time.perf_counter()
+        status = 200
+        try:
+            if url.path == "/topn":
+                self._send_json(200, svc.topn(params))
+            elif url.path == "/totals":
+                self._send_json(200, svc.totals(params))
+            elif url.path == "/xlsx":
+                name, data = svc.xlsx(params)
+                self._send(200, data,
+                           "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(name)}"})
+            elif url.path == "/metrics":
+                self._send_json(200, {"latency": svc.metrics.snapshot(),
+                                      "cache": svc.months.stats()})
+            elif url.path == "/health":
+                self._send_json(200, {"ok": True})
+            else:
+                status = 404
+                self._send_json(404, {"error": f"unknown path: {url.path}"})
+        except (ValueError, TypeError) as e:
+            status = 400
+            self._send_json(400, {"error": str(e)})
+        except (FileNotFoundError, KeyError) as e:
+            status = 404
+            self._send_json(404, {"error": str(e)})
+        except Exception as e:
+            status = 500
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            if url.path != "/metrics":
+                svc.metrics.record(url.path, ms, ok=status < 400)
+            print(f"[serve] GET {url.path} {status} {ms:.1f}ms", flush=True)
+
+    def log_message(self, format, *args):  # 既定の stderr アクセスログは抑止
+        pass
+
+
+def serve(proj_root: Path, host: str = "127.0.0.1", port: int = 8765, max_months: int = 6,
+          use_arrow: bool = False):
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.service = TopNService(proj_root, max_months=max_months, use_arrow=use_arrow)  # type: ignore[attr-defined]
+    print(f"[ok] serving on http://{host}:{port}/ (max_months={max_months})", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TopN distributor local HTTP service")
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="待受アドレス（既定はローカルのみ）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-months", type=int, default=6,
+                        help="メモリに保持する月数（LRU）")
+    parser.add_argument("--arrow", action="store_true",
+                        help="月データを Arrow キャッシュ（data/cache/arrow）からメモリマップで読む（pyarrow が必要）")
+    args = parser.parse_args()
+
+    serve(Path(__file__).resolve().parents[1], host=args.host, port=args.port,
+          max_months=args.max_months, use_arrow=args.arrow)
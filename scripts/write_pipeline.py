@@ -0,0 +1,97 @@
+# scripts/write_pipeline.py
+"""
+店別出力の「描画」と「保存」を重ねるための書込スレッド（--write-queue N）。
+
+メインスレッドは店ごとに描画 → xlsx バイト列化までを行い、保存処理
+（アトミック書込・fsync・zip 追記・チェックポイント/マニフェスト記録）を submit する。
+書込スレッドは1本で、submit された順に実行する（店の順番・ジャーナルの順序は従来どおり）。
+
+- キューは max_pending 件まで。溢れたら submit がブロックする（背圧。メモリ上に持つ
+  xlsx バイト列は最大 max_pending + 1 件）。
+- 書込スレッドで例外が出たら以降の仕事は捨て、次の submit / close で呼び出し側に再送出する。
+- max_pending <= 0 なら submit の場でそのまま実行する（従来の逐次保存と同じ）。
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    def __init__(self, max_pending: int = 0):
+        self.max_pending = max(0, int(max_pending))
+        self.blocked_sec = 0.0   # submit が満杯のキューで待った時間（= 書込が律速）
+        self.write_sec = 0.0     # 保存処理そのものに掛かった時間
+        self.count = 0
+        self._error: BaseException | None = None
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        if self.max_pending:
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._thread = threading.Thread(target=self._run, name="topn-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if self._error is None:  # 失敗後の仕事は実行しない（捨てるだけ）
+                    fn, args, kwargs = item
+                    t0 = time.perf_counter()
+                    try:
+                        fn(*args, **kwargs)
+                    except BaseException as e:
+                        self._error = e
+                    self.write_sec += time.perf_counter() - t0
+                    self.count += 1
+            finally:
+                self._queue.task_done()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, fn, *args, **kwargs) -> None:
+        """fn(*args, **kwargs) を書込スレッドで（順番に）実行する。キューが満杯なら空くまで待つ"""
+        if self._queue is None:
+            t0 = time.perf_counter()
+            fn(*args, **kwargs)
+            self.write_sec += time.perf_counter() - t0
+            self.count += 1
+            return
+        self._raise_if_failed()
+        t0 = time.perf_counter()
+        while True:
+            try:
+                self._queue.put((fn, args, kwargs), timeout=0.5)
+                break
+            except queue.Full:
+                self._raise_if_failed()  # 書込側が落ちていたら待ち続けない
+        self.blocked_sec += time.perf_counter() - t0
+
+    def close(self) -> None:
+        """残りを書き終えてスレッドを止める（失敗していれば再送出）。停止要求時もこれで描画済みの店を書き切る"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        self._raise_if_failed()
+
+    def abort(self) -> None:
+        """描画側の例外時: 未実行の仕事を捨ててスレッドを止める（書込側の例外は再送出しない）"""
+        if self._thread is None:
+            return
+        if self._error is None:
+            self._error = RuntimeError("writer aborted")
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def line(self) -> str:
+        return (f"[pipeline] queue={self.max_pending} files={self.count} "
+                f"write={self.write_sec:.2f}s blocked={self.blocked_sec:.2f}s")
@@ -0,0 +1,321 @@
+# scripts/xlsx_golden_diff.py
+"""
+write_excel の出力どうしの構造比較（ゴールデン出力との同値確認）。
+
+性能改善（エンジン差し替え・並列化・dtype 変更など）で配布ファイルの数字や書式が
+黙って変わっていないかを確かめる。openpyxl でブックを開かず、zip 内の XML を直接読む。
+
+    シート名   : workbook.xml のシートの並び
+    セル値     : 共有文字列 / インライン文字列 / 数値 / 真偽 / 数式（数式があれば式を比べる）
+    表示形式   : セルの s → styles.xml の cellXfs → numFmtId → 書式コード（組込み番号も解決）
+    条件付き書式: 範囲・種類・演算子・式・dxf の中身（優先順位の並びで比較。番号そのものは見ない）
+
+zip 内のパーツ（docProps 以外）がバイト単位で一致するファイルは XML を読まずに同値とみなす。
+スタイル番号や文字列の格納方法（--optimize の共有文字列化など）が違っても、見た目が同じなら差分なし。
+比較対象はファイル1つ・ディレクトリ（配下の *.xlsx と *.zip の中身を相対パスで対応付け）・--bundle zip のどれでもよい。
+
+    python -m scripts.xlsx_golden_diff data/golden/split data/output/split
+    python -m scripts.xlsx_golden_diff golden.xlsx data/output/t.xlsx --max-diffs 50
+
+差分があれば終了コード 1。
+"""
+from __future__ import annotations
+
+import math
+import posixpath
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+from xml.etree import ElementTree as ET
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+DEFAULT_MAX_DIFFS = 20
+
+_N = f"{{{MAIN_NS}}}"
+_C, _V, _F, _IS, _T, _R = (_N + t for t in ("c", "v", "f", "is", "t", "r"))
+_CF, _RULE, _FORMULA = _N + "conditionalFormatting", _N + "cfRule", _N + "formula"
+_CELL_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+@dataclass
+class SheetData:
+    cells: dict[str, tuple]                  # {"A1": (値, 書式コード)}
+    cf: list[tuple] = field(default_factory=list)
+
+
+@dataclass
+class BookData:
+    sheet_names: list[str]
+    sheets: dict[str, SheetData]
+
+
+# === 読込 ===
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _canon(el) -> tuple:
+    """名前空間・属性順に依存しない要素の正規形（dxf や colorScale の比較用）"""
+    return (_local(el.tag), tuple(sorted((_local(k), v) for k, v in el.attrib.items())),
+            (el.text or "").strip(), tuple(_canon(c) for c in el))
+
+
+def _text(el) -> str:
+    """<si> / <is> の文字列（リッチテキストの run は連結、ふりがな rPh は除く）"""
+    t = el.find(_T)
+    if t is not None:
+        return t.text or ""
+    return "".join(r.findtext(_T, "") for r in el.iter(_R))
+
+
+def _shared_strings(data: bytes | None) -> list[str]:
+    if data is None:
+        return []
+    return [_text(si) for si in ET.fromstring(data)]
+
+
+@lru_cache(maxsize=8)
+def _styles(data: bytes | None) -> tuple[list[str], list[tuple]]:
+    """(cellXfs の番号 → 書式コード, dxfs の正規形)。店別ファイルは styles.xml が同一なので内容でキャッシュ"""
+    if data is None:
+        return [], []
+    root = ET.fromstring(data)
+    codes = dict(BUILTIN_FORMATS)
+    for nf in root.iterfind(f"{_N}numFmts/{_N}numFmt"):
+        codes[int(nf.get("numFmtId"))] = nf.get("formatCode")
+    fmts = [codes.get(int(xf.get("numFmtId", 0)), f"numFmtId={xf.get('numFmtId')}")
+            for xf in root.iterfind(f"{_N}cellXfs/{_N}xf")]
+    dxfs = [_canon(d) for d in root.iterfind(f"{_N}dxfs/{_N}dxf")]
+    return fmts, dxfs
+
+
+def _sheet_paths(zf: zipfile.ZipFile) -> list[tuple[str, str]]:
+    """[(シート名, zip 内のパス)]（workbook.xml の並び）"""
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    target = {}
+    for r in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        t = r.get("Target", "")
+        target[r.get("Id")] = t.lstrip("/") if t.startswith("/") else posixpath.normpath(posixpath.join("xl", t))
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    return [(s.get("name"), target.get(s.get(f"{{{REL_NS}}}id"), ""))
+            for s in wb.iterfind(f"{_N}sheets/{_N}sheet")]
+
+
+def _number(text: str):
+    v = float(text)
+    return int(v) if v.is_integer() and abs(v) < 2 ** 53 else v
+
+
+def _cell_value(c, sst: list[str]):
+    f = c.find(_F)
+    if f is not None and f.text:
+        return "=" + f.text
+    t = c.get("t", "n")
+    if t == "inlineStr":
+        el = c.find(_IS)
+        return None if el is None else _text(el)
+    v = c.findtext(_V)
+    if v is None:
+        return None
+    if t == "s":
+        return sst[int(v)]
+    if t == "n":
+        return _number(v)
+    if t == "b":
+        return v == "1"
+    return v  # str（数式の結果）/ e（エラー値）
+
+
+def _read_sheet(stream, sst: list[str], fmts: list[str], dxfs: list[tuple]) -> SheetData:
+    cells: dict[str, tuple] = {}
+    rules: list[tuple] = []
+    for _, el in ET.iterparse(stream, events=("end",)):
+        if el.tag == _C:
+            s = int(el.get("s", 0))
+            cells[el.get("r")] = (_cell_value(el, sst), fmts[s] if s < len(fmts) else "General")
+            el.clear()
+        elif el.tag == _CF:
+            sqref = " ".join(sorted(el.get("sqref", "").split()))
+            for rule in el.iter(_RULE):
+                dxf_id = rule.get("dxfId")
+                rules.append((int(rule.get("priority", 0)), (
+                    sqref, rule.get("type"), rule.get("operator"), rule.get("text"),
+                    rule.get("stopIfTrue") == "1",
+                    tuple(f.text or "" for f in rule.iter(_FORMULA)),
+                    dxfs[int(dxf_id)] if dxf_id is not None and int(dxf_id) < len(dxfs) else None,
+                    tuple(_canon(c) for c in rule if c.tag != _FORMULA),  # colorScale / dataBar / iconSet
+                )))
+    return SheetData(cells, [r for _, r in sorted(rules, key=lambda x: x[0])])
+
+
+def read_book(data: bytes) -> BookData:
+    """xlsx のバイト列 → BookData"""
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        names = set(zf.namelist())
+        sst = _shared_strings(zf.read("xl/sharedStrings.xml") if "xl/sharedStrings.xml" in names else None)
+        fmts, dxfs = _styles(zf.read("xl/styles.xml") if "xl/styles.xml" in names else None)
+        order, sheets = [], {}
+        for name, path in _sheet_paths(zf):
+            order.append(name)
+            with zf.open(path) as f:
+                sheets[name] = _read_sheet(f, sst, fmts, dxfs)
+    return BookData(order, sheets)
+
+
+def _content_parts(data: bytes) -> dict[str, bytes]:
+    """docProps（作成日時など）以外の zip 内パーツ。全部一致すれば XML を読むまでもなく同値"""
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        return {n: zf.read(n) for n in zf.namelist() if not n.startswith("docProps/")}
+
+
+# === 比較 ===
+def _cell_key(ref: str) -> tuple:
+    m = _CELL_RE.match(ref)
+    if not m:
+        return (0, 0, ref)
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + ord(ch) - 64
+    return (int(m.group(2)), col, ref)
+
+
+def _same_value(a, b, tol: float) -> bool:
+    if a == b:
+        return True
+    if tol and isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+            and not isinstance(a, bool) and not isinstance(b, bool):
+        return math.isclose(a, b, rel_tol=0, abs_tol=tol)
+    return False
+
+
+def diff_books(a: BookData, b: BookData, tol: float = 0.0) -> list[str]:
+    """差分の説明行のリスト（空なら同値）"""
+    out = []
+    if a.sheet_names != b.sheet_names:
+        out.append(f"sheets: {a.sheet_names} != {b.sheet_names}")
+    for name in a.sheet_names:
+        if name not in b.sheets:
+            continue
+        sa, sb = a.sheets[name], b.sheets[name]
+        empty = (None, "General")
+        for ref in sorted(sa.cells.keys() | sb.cells.keys(), key=_cell_key):
+            (va, fa), (vb, fb) = sa.cells.get(ref, empty), sb.cells.get(ref, empty)
+            if not _same_value(va, vb, tol):
+                out.append(f"{name}!{ref}: {va!r} != {vb!r}")
+            if fa != fb:
+                out.append(f"{name}!{ref} format: {fa!r} != {fb!r}")
+        if sa.cf != sb.cf:
+            n = sum(x != y for x, y in zip(sa.cf, sb.cf)) + abs(len(sa.cf) - len(sb.cf))
+            out.append(f"{name} conditional formatting: {len(sa.cf)} rules vs {len(sb.cf)} ({n} differ)")
+    return out
+
+
+# === 入力（ファイル / ディレクトリ / zip 束） ===
+def _zip_books(path: Path) -> dict[str, Callable[[], bytes]]:
+    """zip 内の *.xlsx → {zip 内のパス: バイト列を返す関数}"""
+    with zipfile.ZipFile(path) as zf:
+        members = [n for n in zf.namelist() if n.lower().endswith(".xlsx")]
+
+    def _reader(member):
+        def read():
+            with zipfile.ZipFile(path) as zf:
+                return zf.read(member)
+        return read
+    return {m: _reader(m) for m in sorted(members)}
+
+
+def collect_books(path: Path) -> dict[str, Callable[[], bytes]]:
+    """
+    {相対パス: バイト列を返す関数}。.xlsx は単体、.zip は中の *.xlsx（zip 内のパス）。
+    ディレクトリは配下の *.xlsx（相対パス）に加えて、配下の *.zip（--bundle zip の分割 zip 等）の
+    中身も zip 内のパスで並べる。店別ファイルと zip、分割数の違う zip どうしでも同じ店が対応する。
+    同じパスがファイルと zip の両方にあればファイルを採る。
+    """
+    path = Path(path)
+    if path.is_dir():
+        books = {}
+        for z in sorted(path.rglob("*.zip")):
+            books.update(_zip_books(z))
+        books.update({p.relative_to(path).as_posix(): p.read_bytes
+                      for p in sorted(path.rglob("*.xlsx")) if not p.name.startswith("~$")})
+        return dict(sorted(books.items()))
+    if path.suffix.lower() == ".zip":
+        return _zip_books(path)
+    return {path.name: path.read_bytes}
+
+
+@dataclass
+class DiffResult:
+    files: int = 0
+    diff_files: int = 0
+    diffs: int = 0
+    only_a: list[str] = field(default_factory=list)
+    only_b: list[str] = field(default_factory=list)
+    sec: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.diffs or self.only_a or self.only_b)
+
+
+def compare_outputs(a: Path, b: Path, tol: float = 0.0, max_diffs: int = DEFAULT_MAX_DIFFS,
+                    out=print) -> DiffResult:
+    t0 = time.perf_counter()
+    books_a, books_b = collect_books(a), collect_books(b)
+    if len(books_a) == 1 and len(books_b) == 1 and not Path(a).is_dir() and not Path(b).is_dir():
+        books_b = {next(iter(books_a)): next(iter(books_b.values()))}  # ファイル名が違っても1対1で比べる
+    res = DiffResult(only_a=sorted(books_a.keys() - books_b.keys()),
+                     only_b=sorted(books_b.keys() - books_a.keys()))
+    for rel in res.only_a:
+        out(f"[diff] {rel}: only in {a}")
+    for rel in res.only_b:
+        out(f"[diff] {rel}: only in {b}")
+
+    for rel in sorted(books_a.keys() & books_b.keys()):
+        res.files += 1
+        data_a, data_b = books_a[rel](), books_b[rel]()
+        if data_a == data_b or _content_parts(data_a) == _content_parts(data_b):
+            continue
+        lines = diff_books(read_book(data_a), read_book(data_b), tol=tol)
+        if not lines:
+            continue
+        res.diff_files += 1
+        res.diffs += len(lines)
+        out(f"[diff] {rel}: {len(lines)} differences")
+        for line in lines[:max_diffs]:
+            out(f"  {line}")
+        if len(lines) > max_diffs:
+            out(f"  ... (+{len(lines) - max_diffs})")
+    res.sec = time.perf_counter() - t0
+    return res
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="xlsx 出力の構造比較（セル値・表示形式・条件付き書式・シート名）")
+    parser.add_argument("expected", type=str, help="基準（ゴールデン）: .xlsx / ディレクトリ / .zip")
+    parser.add_argument("actual", type=str, help="比較対象: .xlsx / ディレクトリ / .zip")
+    parser.add_argument("--tol", type=float, default=0.0, help="数値の許容誤差（絶対値。既定 0 = 完全一致）")
+    parser.add_argument("--max-diffs", type=int, default=DEFAULT_MAX_DIFFS, help="ファイルごとに表示する差分の上限")
+    args = parser.parse_args()
+
+    for p in (args.expected, args.actual):
+        if not Path(p).exists():
+            parser.error(f"not found: {p}")
+    r = compare_outputs(Path(args.expected), Path(args.actual), tol=args.tol, max_diffs=args.max_diffs)
+    summary = (f"files={r.files} diff_files={r.diff_files} diffs={r.diffs} "
+               f"missing={len(r.only_a)} extra={len(r.only_b)} {r.sec:.2f}s")
+    if not r.ok:
+        print(f"[error] 差分あり: {summary}")
+        raise SystemExit(1)
+    print(f"[ok] 差分なし: {summary}")
@@ -0,0 +1,230 @@
+# scripts/xlsx_optimize.py
+"""
+配布用 xlsx の出力サイズ最適化（--optimize）。openpyxl で開き直さず、zip 内の XML を直接書き換える。
+
+配布フォーマット.xlsx は長年の流用で名前付きスタイル（cellStyles）が約2000個あり、
+openpyxl はそれと未使用の書式（フォント/塗り/罫線/表示形式）を全ファイルに書き出す。
+店別ファイルでは styles.xml が圧縮後サイズの大半を占める。
+
+    1. スタイル: シートのセル・行・列が参照する cellXfs だけを残し、そこから辿れる
+       cellStyleXfs / cellStyles / fonts / fills / borders / numFmts 以外を捨てて番号を詰め直す
+       （dxfs は条件付き書式が番号で参照するのでそのまま）
+    2. 文字列: openpyxl のインライン文字列を共有文字列表（sharedStrings.xml）へ寄せる
+       （日をまたいで繰り返す商品名・見出しが1回だけになる）
+    3. TEMPLATE の名残: 削除済みシートや #REF! を指す定義名、複製で全シートに付いた codeName を除く
+    4. zip の圧縮レベルを指定して詰め直す（既定 9）
+
+値・書式・条件付き書式の見た目は変わらない。
+"""
+from __future__ import annotations
+
+import re
+import zipfile
+from dataclasses import dataclass
+from io import BytesIO
+from xml.etree import ElementTree as ET
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+SST_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+SST_CT = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+DEFAULT_LEVEL = 9
+
+_N = f"{{{MAIN_NS}}}"
+ET.register_namespace("", MAIN_NS)
+
+_SHEET_RE = re.compile(r"^xl/worksheets/sheet\d+\.xml$")
+_CELL_STYLE_RE = re.compile(r'(<(?:c|row) [^>]*?\bs=")(\d+)(")')
+_COL_STYLE_RE = re.compile(r'(<col [^>]*?\bstyle=")(\d+)(")')
+_INLINE_RE = re.compile(r'<c ([^>]*?)t="inlineStr"([^>]*)><is>(<t(?: [^>]*)?>.*?</t>|<t */>)</is></c>', re.S)
+_CODENAME_RE = re.compile(r' codeName="[^"]*"')
+_DEFINED_NAME_RE = re.compile(r"<definedName [^>]*>(.*?)</definedName>|<definedName [^>]*/>", re.S)
+_SHEET_NAME_RE = re.compile(r'<sheet [^>]*?name="([^"]*)"')
+
+
+@dataclass
+class OptimizeStats:
+    before: int = 0
+    after: int = 0
+    cell_xfs: tuple[int, int] = (0, 0)       # (前, 後)
+    named_styles: tuple[int, int] = (0, 0)
+    strings: tuple[int, int] = (0, 0)        # (インライン文字列のセル数, 共有文字列の種類)
+    names_removed: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+    def line(self, name: str = "") -> str:
+        pct = self.saved / self.before * 100 if self.before else 0.0
+        return (f"[optimize] {name} {self.before / 1024:.1f}KB→{self.after / 1024:.1f}KB (-{pct:.0f}%) "
+                f"xfs {self.cell_xfs[0]}→{self.cell_xfs[1]} styles {self.named_styles[0]}→{self.named_styles[1]} "
+                f"strings {self.strings[0]}→{self.strings[1]}")
+
+
+# === スタイル ===
+def _children(parent, tag):
+    return [] if parent is None else list(parent.findall(_N + tag))
+
+
+def _replace_children(parent, items) -> None:
+    for child in list(parent):
+        parent.remove(child)
+    parent.extend(items)
+    parent.set("count", str(len(items)))
+
+
+def _remap(items, used: set[int], keep_first: int = 0) -> tuple[list, dict[int, int]]:
+    keep = sorted({i for i in used if i < len(items)} | set(range(min(keep_first, len(items)))))
+    return [items[i] for i in keep], {old: new for new, old in enumerate(keep)}
+
+
+def _prune_styles(styles_xml: bytes, used_xfs: set[int]) -> tuple[bytes, dict[int, int], OptimizeStats]:
+    root = ET.fromstring(styles_xml)
+    stats = OptimizeStats()
+    cell_xfs_el = root.find(_N + "cellXfs")
+    style_xfs_el = root.find(_N + "cellStyleXfs")
+    styles_el = root.find(_N + "cellStyles")
+
+    cell_xfs = _children(cell_xfs_el, "xf")
+    kept_xfs, xf_map = _remap(cell_xfs, used_xfs | {0}, keep_first=1)
+    stats.cell_xfs = (len(cell_xfs), len(kept_xfs))
+
+    # 名前付きスタイル: 残したセル書式が親として参照するものと「標準」（builtinId=0）だけ
+    style_xfs = _children(style_xfs_el, "xf")
+    named = _children(styles_el, "cellStyle")
+    used_parent = {int(x.get("xfId", 0)) for x in kept_xfs}
+    kept_named = [s for s in named if int(s.get("xfId", 0)) in used_parent or s.get("builtinId") == "0"]
+    kept_style_xfs, style_map = _remap(style_xfs, used_parent | {int(s.get("xfId", 0)) for s in kept_named},
+                                       keep_first=1)
+    stats.named_styles = (len(named), len(kept_named))
+    for x in kept_xfs:
+        if x.get("xfId") is not None:
+            x.set("xfId", str(style_map.get(int(x.get("xfId")), 0)))
+    for s in kept_named:
+        s.set("xfId", str(style_map.get(int(s.get("xfId", 0)), 0)))
+
+    # フォント / 塗り / 罫線 / 表示形式: 残した xf から辿れるものだけ（先頭の既定値は残す）
+    all_xfs = kept_xfs + kept_style_xfs
+    for tag, attr, keep_first in (("fonts", "fontId", 1), ("fills", "fillId", 2), ("borders", "borderId", 1)):
+        parent = root.find(_N + tag)
+        if parent is None:
+            continue
+        items = list(parent)
+        kept, id_map = _remap(items, {int(x.get(attr, 0)) for x in all_xfs}, keep_first=keep_first)
+        for x in all_xfs:
+            x.set(attr, str(id_map.get(int(x.get(attr, 0)), 0)))
+        _replace_children(parent, kept)
+    num_fmts = root.find(_N + "numFmts")
+    if num_fmts is not None:
+        used_fmt = {x.get("numFmtId", "0") for x in all_xfs}
+        _replace_children(num_fmts, [f for f in num_fmts if f.get("numFmtId") in used_fmt])
+
+    _replace_children(cell_xfs_el, kept_xfs)
+    if style_xfs_el is not None:
+        _replace_children(style_xfs_el, kept_style_xfs)
+    if styles_el is not None:
+        _replace_children(styles_el, kept_named)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True), xf_map, stats
+
+
+# === 共有文字列 ===
+def _share_strings(sheets: dict[str, str]) -> tuple[dict[str, str], list[str], int]:
+    """インライン文字列セル → 共有文字列参照。戻り値は (書換後のシート, 文字列表の <t> 要素, セル数)"""
+    table: dict[str, int] = {}
+    cells = 0
+
+    def _sub(m) -> str:
+        nonlocal cells
+        cells += 1
+        idx = table.setdefault(m.group(3), len(table))
+        return f'<c {m.group(1)}t="s"{m.group(2)}><v>{idx}</v></c>'
+
+    out = {name: _INLINE_RE.sub(_sub, xml) for name, xml in sheets.items()}
+    return out, list(table), cells
+
+
+def _sst_xml(items: list[str], refs: int) -> bytes:
+    body = "".join(f"<si>{t}</si>" for t in items)
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="{MAIN_NS}" count="{refs}" uniqueCount="{len(items)}">{body}</sst>').encode("utf-8")
+
+
+def _add_sst_parts(parts: dict[str, bytes]) -> None:
+    """[Content_Types].xml と workbook.xml.rels に sharedStrings.xml を登録（無ければ）"""
+    ct = parts["[Content_Types].xml"].decode("utf-8")
+    if "/xl/sharedStrings.xml" not in ct:
+        ct = ct.replace("</Types>", f'<Override PartName="/xl/sharedStrings.xml" ContentType="{SST_CT}"/></Types>')
+        parts["[Content_Types].xml"] = ct.encode("utf-8")
+    rels = parts["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    if SST_TYPE not in rels:
+        ids = {int(i) for i in re.findall(r'Id="rId(\d+)"', rels)}
+        rid = max(ids | {0}) + 1
+        rels = rels.replace("</Relationships>",
+                            f'<Relationship Id="rId{rid}" Type="{SST_TYPE}" Target="sharedStrings.xml"/>'
+                            f"</Relationships>")
+        parts["xl/_rels/workbook.xml.rels"] = rels.encode("utf-8")
+
+
+# === 定義名 ===
+def _prune_defined_names(workbook_xml: str) -> tuple[str, int]:
+    """存在しないシート（TEMPLATE 等）や #REF! を指す定義名を除く"""
+    sheet_names = set(_SHEET_NAME_RE.findall(workbook_xml))
+    removed = 0
+
+    def _sub(m) -> str:
+        nonlocal removed
+        text = m.group(1) or ""
+        refs = {r.strip("'") for r in re.findall(r"('[^']+'|[^!,:'()\s]+)!", text)}
+        if not text or "#REF!" in text or any(r not in sheet_names for r in refs):
+            removed += 1
+            return ""
+        return m.group(0)
+
+    workbook_xml = _DEFINED_NAME_RE.sub(_sub, workbook_xml)
+    workbook_xml = re.sub(r"<definedNames\s*/>|<definedNames>\s*</definedNames>", "", workbook_xml)
+    return workbook_xml, removed
+
+
+def optimize_xlsx(data: bytes, level: int = DEFAULT_LEVEL) -> tuple[bytes, OptimizeStats]:
+    """xlsx のバイト列 → (最適化後のバイト列, OptimizeStats)"""
+    with zipfile.ZipFile(BytesIO(data)) as zin:
+        names = zin.namelist()
+        parts = {n: zin.read(n) for n in names}
+
+    sheets = {n: parts[n].decode("utf-8") for n in names if _SHEET_RE.match(n)}
+    used_xfs: set[int] = set()
+    for xml in sheets.values():
+        used_xfs.update(int(v[1]) for v in _CELL_STYLE_RE.findall(xml))
+        used_xfs.update(int(v[1]) for v in _COL_STYLE_RE.findall(xml))
+
+    stats = OptimizeStats(before=len(data))
+    if "xl/styles.xml" in parts:
+        parts["xl/styles.xml"], xf_map, st = _prune_styles(parts["xl/styles.xml"], used_xfs)
+        stats.cell_xfs, stats.named_styles = st.cell_xfs, st.named_styles
+
+        def _restyle(m) -> str:
+            return f"{m.group(1)}{xf_map.get(int(m.group(2)), 0)}{m.group(3)}"
+
+        sheets = {n: _COL_STYLE_RE.sub(_restyle, _CELL_STYLE_RE.sub(_restyle, xml)) for n, xml in sheets.items()}
+
+    if "xl/sharedStrings.xml" not in parts:  # 既に共有文字列がある場合は触らない
+        sheets, items, refs = _share_strings(sheets)
+        if items:
+            parts["xl/sharedStrings.xml"] = _sst_xml(items, refs)
+            names.append("xl/sharedStrings.xml")
+            _add_sst_parts(parts)
+        stats.strings = (refs, len(items))
+
+    for n, xml in sheets.items():
+        parts[n] = _CODENAME_RE.sub("", xml).encode("utf-8")
+    if "xl/workbook.xml" in parts:
+        wb_xml, stats.names_removed = _prune_defined_names(parts["xl/workbook.xml"].decode("utf-8"))
+        parts["xl/workbook.xml"] = wb_xml.encode("utf-8")
+
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=int(level)) as zout:
+        for n in names:
+            zout.writestr(n, parts[n])
+    out = buf.getvalue()
+    stats.after = len(out)
+    return out, stats
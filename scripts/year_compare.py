@@ -0,0 +1,93 @@
+# scripts/year_compare.py
+"""
+前年比較（--compare-previous-year）。
+
+今年の各日を前年の対応日に割り当て、前年の売上（load_sales と同じ形）から
+(今年の日付, 店番, JAN) ごとの前年金額を作り、今年の TopN 明細に1回の merge で付ける。
+
+    weekday : 364日前（同じ曜日。クリスマス・年末の曜日並びを揃えたいとき）
+    date    : 前年の同じ月日（2/29 は 2/28）
+
+前年分の読込は今年と同じ経路（CSV / Arrow キャッシュ / SQLite ストア）で行い、
+集計・描画のパイプラインは1回だけ回す。
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+
+from scripts.make_topn_simple_refactor import build_totals, rollup_rows
+
+ALIGN_MODES = ("weekday", "date")
+
+
+def previous_year_date(d, align: str = "weekday") -> date:
+    d = pd.to_datetime(d).date()
+    if align == "weekday":
+        return d - timedelta(days=364)
+    if align == "date":
+        if d.month == 2 and d.day == 29:
+            return date(d.year - 1, 2, 28)
+        return d.replace(year=d.year - 1)
+    raise ValueError(f"unknown align mode: {align}")
+
+
+def previous_year_dates(dates, align: str = "weekday") -> dict[date, date]:
+    """{今年の日付: 前年の日付}（dates の順）"""
+    return {pd.to_datetime(d).date(): previous_year_date(d, align) for d in dates}
+
+
+def _date_frame(date_map: dict) -> pd.DataFrame:
+    return pd.DataFrame({"date": list(date_map.keys()), "prev_date": list(date_map.values())})
+
+
+def previous_year_amounts(df_prev: pd.DataFrame, category, date_map: dict, rollup=None) -> pd.DataFrame:
+    """
+    前年の売上 → 列 date（今年の日付）, store_id, jan, prev_amount。
+    rollup（load_rollup_levels）を渡すとロールアップ単位の行も含める。
+    """
+    g = df_prev[df_prev["category_large"].astype(str) == str(category)]
+    g = g.assign(store_id=g["store_id"].astype(str), jan=g["jan"].astype(str),
+                 prev_date=pd.to_datetime(g["date"]).dt.date)
+    # 前年の日付 → 今年の日付（date モードの 2/28・2/29 のように複数日が同じ前年日を指しても可）
+    g = g[["prev_date", "store_id", "jan", "amount"]].merge(_date_frame(date_map), on="prev_date")
+    g = g.groupby(["date", "store_id", "jan"], as_index=False, sort=False).agg({"amount": "sum"})
+    if rollup:
+        g = pd.concat([g, rollup_rows(g, rollup, {"amount": "sum"})], ignore_index=True)
+    return g.rename(columns={"amount": "prev_amount"})
+
+
+def previous_year_totals(df_prev: pd.DataFrame, category, date_map: dict, rollup=None) -> tuple[dict, dict]:
+    """build_totals と同じ形の前年合計。キーは (今年の日付, 店番)"""
+    prev_all, prev_cat = build_totals(df_prev, {}, category, list(set(date_map.values())), rollup=rollup)
+    out_all, out_cat = {}, {}
+    for src, dst in ((prev_all, out_all), (prev_cat, out_cat)):
+        by_day: dict = {}
+        for (d, store), amt in src.items():
+            by_day.setdefault(d, []).append((store, amt))
+        for cur, prev in date_map.items():
+            for store, amt in by_day.get(prev, ()):
+                dst[(cur, str(store))] = amt
+    return out_all, out_cat
+
+
+def attach_previous_year(topn_dict: dict, prev: pd.DataFrame) -> tuple[dict, int, int]:
+    """
+    TopN 明細（全店・全日を縦に連結）と前年金額を1回の merge で結合し、
+    prev_amount / yoy 列を付けた topn_dict を返す。戻り値は (topn_dict, 明細行数, 前年ありの行数)
+    """
+    frames = [df_day for day_map in topn_dict.values() for df_day in day_map.values()
+              if df_day is not None and not df_day.empty]
+    if not frames:
+        return topn_dict, 0, 0
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.assign(store_id=df["store_id"].astype(str), jan=df["jan"].astype(str))
+    df = df.merge(prev, on=["date", "store_id", "jan"], how="left", sort=False)
+    df["yoy"] = df["amount"] / df["prev_amount"].where(df["prev_amount"] != 0)
+
+    out: dict = {}
+    for (store, d), sub in df.groupby(["store_id", "date"], sort=False):
+        out.setdefault(store, {})[d] = sub.reset_index(drop=True)
+    return out, len(df), int(df["prev_amount"].notna().sum())
@@ -0,0 +1,128 @@
+# tests/conftest.py
+"""
+共通フィクスチャ。実データは使わず、bench_hot_paths と同じ固定シードの合成売上と
+リポジトリ内のテンプレート（data/template/配布フォーマット.xlsx）だけで動く。
+
+    python -m pytest -q                 # 全部（ベンチ込みで 1 分ほど）
+    python -m pytest -q -m "not bench"  # ベンチを除く
+
+project は一時ディレクトリに作る最小のプロジェクト（scripts/・config/・テンプレート・
+店舗マスター・月次 CSV 2か月分）。CLI は __file__ から data/ を探すので、run_cli はその
+コピーの scripts を python -m で実行する（キャッシュ等もすべて一時ディレクトリ側に書かれる）。
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from scripts.bench_hot_paths import N_DAYS, make_raw_sales  # noqa: E402
+from scripts.make_topn_simple_refactor import (  # noqa: E402
+    SALES_RENAME_MAP, aggregate_topn, build_combined_workbook, build_totals, normalize_sales, workbook_bytes,
+)
+from scripts.page_layout import PageLayout  # noqa: E402
+from scripts.template_snapshot import DEFAULT_TEMPLATE, load_template_snapshot  # noqa: E402
+
+N_STORES = 3
+CATEGORY = 1
+# project の月次 CSV: 12月分（dates と同じ 7 日）と、それを 14 日ずらした 1月分
+JAN_SHIFT = timedelta(days=14)
+STORE_MASTER = pd.DataFrame({
+    "store": [1, 2, 3],
+    "name": ["神栖店", "鹿嶋店", "潮来店"],
+    "short_name": ["神栖", "鹿嶋", "潮来"],
+    "area": ["北", "北", "南"],
+})
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: ベースライン比のマイクロベンチ（遅い。-m 'not bench' で除外）")
+
+
+@pytest.fixture(scope="session")
+def dates() -> list[date]:
+    return [date(2024, 12, 20) + timedelta(days=i) for i in range(N_DAYS)]
+
+
+@pytest.fixture(scope="session")
+def sales(dates):
+    """load_sales と同じ形の合成売上（店 1..N_STORES）"""
+    return normalize_sales(make_raw_sales(n_stores=N_STORES), dates)
+
+
+@pytest.fixture(scope="session")
+def layout() -> PageLayout:
+    return PageLayout.from_geometry(load_template_snapshot(DEFAULT_TEMPLATE).geometry)
+
+
+@pytest.fixture(scope="session")
+def combined_xlsx(sales, dates, layout) -> bytes:
+    """全店まとめ版の xlsx バイト列（write_excel の非 split と同じ描画）"""
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=layout.max_rank, dates=dates)
+    totals = build_totals(sales, topn, CATEGORY, dates)
+    wb = build_combined_workbook(DEFAULT_TEMPLATE, topn, {s: f"店{s}" for s in topn}, CATEGORY, dates,
+                                 "テスト", sales, layout=layout, totals=totals)
+    return workbook_bytes(wb)
+
+
+# === 一時プロジェクト ===
+def clean_raw(raw: pd.DataFrame) -> pd.DataFrame:
+    """make_raw_sales から品質チェックの error 項目（重複行・金額欠損）を除いたもの"""
+    raw = raw.drop_duplicates(["date", "store_id", "jan"])
+    return raw.assign(amount=raw["amount"].fillna(1000.0)).reset_index(drop=True)
+
+
+def project_raw() -> pd.DataFrame:
+    """project に置く売上（read_sales_raw の形。12月 7 日 + 1月 7 日）"""
+    dec = clean_raw(make_raw_sales(n_stores=N_STORES))
+    return pd.concat([dec, dec.assign(date=dec["date"] + JAN_SHIFT)], ignore_index=True)
+
+
+def write_sales_csv(material: Path, raw: pd.DataFrame, suffix: str = ".csv") -> list[Path]:
+    """raw（read_sales_raw の形）を月ごとに material/YYYY/IT_YYYYMM<suffix> へ書く（圧縮は拡張子から）"""
+    out = raw.assign(date=raw["date"].dt.strftime("%Y/%m/%d"), category_middle="1", category_small="1")
+    out = out.rename(columns={v: k for k, v in SALES_RENAME_MAP.items()})[list(SALES_RENAME_MAP)]
+    paths = []
+    for (y, m), g in out.groupby([raw["date"].dt.year, raw["date"].dt.month]):
+        path = Path(material) / f"{y}" / f"IT_{y}{m:02d}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        g.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope="session")
+def _project_base(tmp_path_factory) -> Path:
+    root = tmp_path_factory.mktemp("project_base")
+    shutil.copytree(REPO_ROOT / "scripts", root / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copytree(REPO_ROOT / "config", root / "config")
+    (root / "data" / "template").mkdir(parents=True)
+    shutil.copy(DEFAULT_TEMPLATE, root / "data" / "template" / DEFAULT_TEMPLATE.name)
+    material = root / "data" / "material"
+    (material / "master").mkdir(parents=True)
+    STORE_MASTER.to_excel(material / "master" / "store_master.xlsx", index=False)
+    write_sales_csv(material, project_raw())
+    return root
+
+
+@pytest.fixture
+def project(_project_base, tmp_path) -> Path:
+    """テストごとの一時プロジェクト（キャッシュ・出力はテスト間で共有しない）"""
+    root = tmp_path / "project"
+    shutil.copytree(_project_base, root)
+    return root
+
+
+def run_cli(project: Path, *args, timeout: int = 300) -> subprocess.CompletedProcess:
+    """project 側の make_topn_simple_refactor を実行する（stdout+stderr を .stdout に）"""
+    return subprocess.run([sys.executable, "-m", "scripts.make_topn_simple_refactor", *map(str, args)],
+                          cwd=project, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, encoding="utf-8", timeout=timeout)
@@ -0,0 +1,76 @@
+# tests/test_arrow_dataset.py
+"""正規化済み売上の Arrow キャッシュ（load_sales_arrow）: load_sales と同じ行をメモリマップで返す"""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.arrow_dataset import arrow_available, load_sales_arrow, month_arrow_path
+from scripts.make_topn_simple_refactor import load_sales
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, JAN_SHIFT, project_raw, run_cli, write_sales_csv
+
+pytestmark = pytest.mark.skipif(not arrow_available(), reason="pyarrow なし")
+
+
+@pytest.fixture
+def material(tmp_path):
+    root = tmp_path / "material"
+    write_sales_csv(root, project_raw())
+    return root
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["date", "store_id", "jan"]).reset_index(drop=True)
+
+
+def test_matches_load_sales(material, tmp_path, dates):
+    days = [*dates[:2], dates[0] + JAN_SHIFT]                   # 月またぎ
+    df, stats = load_sales_arrow(material, days, arrow_dir=tmp_path / "arrow")
+    pd.testing.assert_frame_equal(_sorted(df), _sorted(load_sales(material, days)), check_dtype=False)
+    assert (stats.files, stats.built) == (2, 2)
+    assert stats.mapped_bytes == sum(p.stat().st_size for p in (tmp_path / "arrow").glob("*.arrow"))
+
+
+def test_second_load_maps_without_building(material, tmp_path, dates):
+    load_sales_arrow(material, dates, arrow_dir=tmp_path / "arrow")
+    df, stats = load_sales_arrow(material, dates, stores=["3"], arrow_dir=tmp_path / "arrow")
+    assert stats.built == 0 and stats.files == 1
+    assert set(df["store_id"]) == {"3"} and set(df["date"]) == set(dates)
+
+
+def test_replaced_month_is_rebuilt(material, tmp_path, dates):
+    arrow = tmp_path / "arrow"
+    load_sales_arrow(material, dates, arrow_dir=arrow)
+    old = month_arrow_path(material, 2024, 12, arrow)
+    f = material / "2024" / "IT_202412.csv"
+    st = f.stat()
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    _, stats = load_sales_arrow(material, dates, arrow_dir=arrow)
+    assert stats.built == 1
+    assert [p.name for p in arrow.glob("IT_202412.*.arrow")] == [month_arrow_path(material, 2024, 12, arrow).name]
+    assert not old.exists()
+
+
+def test_missing_month(material, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_sales_arrow(material, [pd.Timestamp("2023-01-01")], arrow_dir=tmp_path / "arrow")
+
+
+def test_cli_arrow_cache_matches_csv(project, tmp_path, dates):
+    args = ("--category", CATEGORY, "--dates", ",".join(map(str, dates)))
+    assert run_cli(project, *args, "--out", tmp_path / "csv.xlsx").returncode == 0
+    r = run_cli(project, *args, "--out", tmp_path / "arrow.xlsx", "--arrow-cache")
+    assert r.returncode == 0 and "[arrow] 1 files" in r.stdout and "built=1" in r.stdout, r.stdout
+    assert diff_books(read_book((tmp_path / "csv.xlsx").read_bytes()),
+                      read_book((tmp_path / "arrow.xlsx").read_bytes())) == []
+    assert list((project / "data" / "cache" / "arrow").glob("IT_202412.*.arrow"))
+
+
+def test_cli_arrow_cache_rejects_strict(project, tmp_path, dates):
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx",
+                "--arrow-cache", "--strict")
+    assert r.returncode == 2 and "--arrow-cache と同時に使えません" in r.stdout
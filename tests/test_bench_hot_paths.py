@@ -0,0 +1,49 @@
+# tests/test_bench_hot_paths.py
+"""
+ホットパスのマイクロベンチ（scripts.bench_hot_paths の BENCHES）を pytest から回し、
+config/bench_baseline.json と較正比で比べる。遅化が DEFAULT_TOLERANCE を超えたら失敗。
+
+ベースラインの更新は python -m scripts.bench_hot_paths --update。
+"""
+from __future__ import annotations
+
+import pytest
+
+from scripts.bench_hot_paths import (
+    BENCHES, DEFAULT_REPEAT, DEFAULT_TOLERANCE, _calibration_workload, best_of, compare, load_baseline,
+)
+
+REPEAT = DEFAULT_REPEAT
+
+pytestmark = pytest.mark.bench
+
+
+@pytest.fixture(scope="module")
+def baseline() -> dict:
+    base = load_baseline()
+    if not base.get("benches"):
+        pytest.skip("config/bench_baseline.json がありません（--update で作成）")
+    return base
+
+
+@pytest.fixture(scope="module")
+def calibration() -> float:
+    return best_of(_calibration_workload(), REPEAT)
+
+
+def _measure(name: str, calibration: float) -> dict:
+    sec = best_of(BENCHES[name](), REPEAT)
+    return {"benches": {name: {"sec": sec, "ratio": sec / calibration}}}
+
+
+@pytest.mark.parametrize("name", list(BENCHES))
+def test_hot_path_within_baseline(name, baseline, calibration):
+    if name not in baseline["benches"]:
+        pytest.skip(f"{name} のベースラインがありません")
+    run = _measure(name, calibration)
+    if compare(run, baseline, DEFAULT_TOLERANCE):
+        # 一時的な負荷（直前のテストの GC 等）と区別するため、較正ごと1回だけ測り直す
+        run = _measure(name, best_of(_calibration_workload(), REPEAT))
+    slow = compare(run, baseline, DEFAULT_TOLERANCE)
+    assert not slow, (f"{name}: 較正比 {run['benches'][name]['ratio']:.3f} がベースライン "
+                      f"{baseline['benches'][name]['ratio']:.3f} の {1 + DEFAULT_TOLERANCE:.1f} 倍を超えました")
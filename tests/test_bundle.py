@@ -0,0 +1,85 @@
+# tests/test_bundle.py
+"""--bundle zip: 店別ブックを zip に直接書き込む（--bundle-size で分割）"""
+from __future__ import annotations
+
+import json
+import zipfile
+
+import pytest
+
+from scripts.bundle import ZipBundleWriter
+from scripts.make_topn_simple_refactor import EXIT_CANCELLED
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, run_cli
+
+SUFFIX = "_寿司単品データ.xlsx"
+
+
+def _add_stores(writer, n):
+    for s in range(1, n + 1):
+        writer.add(f"{s}/{s}{SUFFIX}", f"book{s}".encode(), store=s)
+
+
+def test_group_size_splits_into_parts(tmp_path):
+    w = ZipBundleWriter(tmp_path, "寿司単品データ", group_size=2)
+    _add_stores(w, 5)
+    bundles = w.close()
+    assert [(b["path"], b["stores"]) for b in bundles] == [
+        ("寿司単品データ_part01.zip", ["1", "2"]),
+        ("寿司単品データ_part02.zip", ["3", "4"]),
+        ("寿司単品データ_part03.zip", ["5"]),
+    ]
+    with zipfile.ZipFile(tmp_path / "寿司単品データ_part02.zip") as zf:
+        assert zf.namelist() == [f"3/3{SUFFIX}", f"4/4{SUFFIX}"]
+        assert zf.read(f"4/4{SUFFIX}") == b"book4"
+        assert {i.compress_type for i in zf.infolist()} == {zipfile.ZIP_STORED}
+    assert all(b["size"] == (tmp_path / b["path"]).stat().st_size for b in bundles)
+
+
+def test_single_bundle_without_group_size(tmp_path):
+    w = ZipBundleWriter(tmp_path, "寿司単品データ")
+    _add_stores(w, 3)
+    assert [b["path"] for b in w.close()] == ["寿司単品データ.zip"]
+
+
+def test_abort_keeps_finished_parts_only(tmp_path):
+    w = ZipBundleWriter(tmp_path, "b", group_size=2)
+    _add_stores(w, 3)
+    w.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b_part01.zip"]
+
+
+def _run(project, tmp_path, dates, *extra):
+    return run_cli(project, "--category", CATEGORY, "--dates", ",".join(map(str, dates[:2])),
+                   "--out", tmp_path / "t.xlsx", *extra)
+
+
+@pytest.mark.parametrize("size,parts", [(0, ["寿司単品データ.zip"]),
+                                        (2, ["寿司単品データ_part01.zip", "寿司単品データ_part02.zip"])])
+def test_cli_bundle_matches_split_files(project, tmp_path, dates, size, parts):
+    r = _run(project, tmp_path, dates, "--split-by-store", "--split-dir", tmp_path / "split")
+    assert r.returncode == 0, r.stdout
+    r = _run(project, tmp_path, dates, "--bundle", "zip", "--bundle-size", size, "--split-dir", tmp_path / "zip")
+    assert r.returncode == 0, r.stdout
+    assert sorted(p.name for p in (tmp_path / "zip").glob("*.zip")) == parts
+    assert not list((tmp_path / "zip").glob("*/*.xlsx"))           # 店別ファイルは置かない
+
+    manifest = json.loads((tmp_path / "zip" / "manifest_1.json").read_text(encoding="utf-8"))
+    assert [b["path"] for b in manifest["bundles"]] == parts
+    for row in manifest["files"]:
+        with zipfile.ZipFile(tmp_path / "zip" / row["bundle"]) as zf:
+            data = zf.read(row["path"])
+        assert len(data) == row["size"]
+        assert diff_books(read_book((tmp_path / "split" / row["path"]).read_bytes()), read_book(data)) == []
+
+
+def test_cli_bundle_cancel(project, tmp_path, dates):
+    stop = tmp_path / "STOP"
+    stop.touch()
+    r = _run(project, tmp_path, dates, "--bundle", "zip", "--split-dir", tmp_path / "zip", "--stop-file", stop)
+    assert r.returncode == EXIT_CANCELLED
+    assert "--bundle zip は再開できない" in r.stdout and "--resume で続きから" not in r.stdout
+    with zipfile.ZipFile(tmp_path / "zip" / "寿司単品データ.zip") as zf:
+        assert zf.namelist() == [f"1/1{SUFFIX}"]
+    assert not list((tmp_path / "zip").glob(".*.tmp"))
@@ -0,0 +1,121 @@
+# tests/test_checkpoint.py
+"""--resume: チェックポイントの記録・再開と、大分類ごとのジャーナル/一時ファイル掃除"""
+from __future__ import annotations
+
+import json
+import signal
+
+import pytest
+
+from scripts.checkpoint import CancelToken, CheckpointJournal, atomic_write_bytes, run_fingerprint
+from scripts.make_topn_simple_refactor import EXIT_CANCELLED
+
+from conftest import CATEGORY, run_cli
+
+SUFFIX = "_寿司単品データ.xlsx"
+
+
+def _write_store(root, store, suffix=SUFFIX):
+    rel = f"{store}/{store}{suffix}"
+    (root / store).mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(root / rel, b"xlsx")
+    return rel
+
+
+@pytest.fixture
+def fp():
+    return run_fingerprint(category="1", dates=["2024-12-24"], stores=["1", "2", "3"])
+
+
+def test_resume_returns_completed_stores(tmp_path, fp):
+    j = CheckpointJournal(tmp_path, fp, category="1", file_suffix=SUFFIX)
+    assert j.start(resume=False) == set()
+    for store in ("1", "2"):
+        j.record(store, _write_store(tmp_path, store), 4)
+
+    assert CheckpointJournal(tmp_path, fp, category="1", file_suffix=SUFFIX).start(resume=True) == {"1", "2"}
+
+
+def test_resume_skips_records_whose_file_is_gone(tmp_path, fp):
+    j = CheckpointJournal(tmp_path, fp, category="1", file_suffix=SUFFIX)
+    j.start(resume=False)
+    for store in ("1", "2"):
+        j.record(store, _write_store(tmp_path, store), 4)
+    (tmp_path / f"2/2{SUFFIX}").unlink()
+
+    assert CheckpointJournal(tmp_path, fp, category="1").start(resume=True) == {"1"}
+
+
+def test_resume_with_other_inputs_starts_over(tmp_path, fp):
+    j = CheckpointJournal(tmp_path, fp, category="1")
+    j.start(resume=False)
+    j.record("1", _write_store(tmp_path, "1"), 4)
+
+    other = run_fingerprint(category="1", dates=["2024-12-25"], stores=["1", "2", "3"])
+    assert CheckpointJournal(tmp_path, other, category="1").start(resume=True) == set()
+    assert CheckpointJournal(tmp_path, fp, category="1").start(resume=True) == set()  # 作り直し済み
+
+
+def test_journal_is_per_category(tmp_path, fp):
+    sushi = CheckpointJournal(tmp_path, fp, category="1", file_suffix=SUFFIX)
+    sushi.start(resume=False)
+    sushi.record("1", _write_store(tmp_path, "1"), 4)
+
+    bento = CheckpointJournal(tmp_path, fp, category="2", file_suffix="_弁当単品データ.xlsx")
+    bento.start(resume=False)
+    bento.finish()
+
+    assert sushi.path != bento.path and not bento.path.exists()
+    assert CheckpointJournal(tmp_path, fp, category="1").start(resume=True) == {"1"}
+
+
+def test_start_removes_only_own_stale_tmp_files(tmp_path, fp):
+    (tmp_path / "1").mkdir()
+    own = tmp_path / "1" / f".1{SUFFIX}.123.tmp"
+    other = tmp_path / "1" / ".1_弁当単品データ.xlsx.456.tmp"
+    own.write_bytes(b"")
+    other.write_bytes(b"")
+
+    CheckpointJournal(tmp_path, fp, category="1", file_suffix=SUFFIX).start(resume=True)
+    assert not own.exists() and other.exists()
+
+
+def test_handle_signals_restores_previous_handler():
+    token = CancelToken()
+    before = signal.getsignal(signal.SIGINT)
+    with token.handle_signals():
+        assert signal.getsignal(signal.SIGINT) is not before
+        signal.raise_signal(signal.SIGINT)
+        assert token.requested()
+        with pytest.raises(KeyboardInterrupt):
+            signal.raise_signal(signal.SIGINT)
+    assert signal.getsignal(signal.SIGINT) is before
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+def test_stop_file_requests_cancel(tmp_path):
+    token = CancelToken(tmp_path / "STOP")
+    assert not token.requested()
+    (tmp_path / "STOP").touch()
+    assert token.requested()
+
+
+def test_cli_stop_then_resume(project, tmp_path, dates):
+    split, stop = tmp_path / "split", tmp_path / "STOP"
+    args = ["--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--out", tmp_path / "t.xlsx",
+            "--split-by-store", "--split-dir", split, "--stop-file", stop]
+    stop.touch()
+    r = run_cli(project, *args)
+    assert r.returncode == EXIT_CANCELLED, r.stdout
+    first = split / f"1/1{SUFFIX}"
+    assert first.exists() and not (split / f"2/2{SUFFIX}").exists()
+    assert (split / ".topn_checkpoint_1.jsonl").exists()
+    mtime = first.stat().st_mtime_ns
+
+    stop.unlink()
+    r = run_cli(project, *args, "--resume")
+    assert r.returncode == 0, r.stdout
+    assert sorted(p.parent.name for p in split.glob(f"*/*{SUFFIX}")) == ["1", "2", "3"]
+    assert first.stat().st_mtime_ns == mtime        # 完了済みの店は書き直さない
+    assert not (split / ".topn_checkpoint_1.jsonl").exists()
+    assert json.loads((split / "manifest_1.json").read_text(encoding="utf-8"))["complete"] is True
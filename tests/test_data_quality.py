@@ -0,0 +1,107 @@
+# tests/test_data_quality.py
+"""集計前のデータ品質チェック（validate_sales）と --strict / --dq-report"""
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+
+from scripts.data_quality import DataQualityError, validate_sales
+from scripts.make_topn_simple_refactor import EXIT_DATA_QUALITY
+
+from conftest import CATEGORY, clean_raw, project_raw, run_cli, write_sales_csv
+
+
+def _raw(rows, source_rows=None) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["date", "store_id", "category_large", "jan", "name", "amount"])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    if source_rows is not None:
+        df.attrs["source_rows"] = source_rows
+    return df
+
+
+GOOD = [
+    ("2024-12-20", "1", "1", "49001", "鉄火巻", 500.0),
+    ("2024-12-20", "2", "1", "49002", "いなり", 300.0),
+]
+
+
+def _checks(report) -> dict:
+    return {i.check: (i.count, i.level) for i in report.issues}
+
+
+def test_clean_data_is_ok():
+    report = validate_sales(_raw(GOOD, [(2024, 12, 2)]), store_ids=["1", "2"], categories=["1"])
+    assert report.ok and report.rows == 2
+    assert report.summary_lines()[0].startswith("[dq] ok: 2 rows")
+
+
+def test_each_check_is_counted():
+    rows = GOOD + [
+        GOOD[0],                                                    # 完全一致の重複
+        ("2024-12-21", "1", "1", "49001", "鉄火巻（大）", 800.0),  # 品名不一致
+        ("2024-12-21", "1", "1", "49003", "サラダ巻", -50.0),
+        ("2024-12-21", "2", "1", "49004", "海鮮丼", None),
+        ("2024-12-21", "9", "1", "49005", "穴子", 100.0),
+        ("2024-12-21", "1", "7", "49006", "謎", 100.0),
+        ("2025-01-02", "1", "1", "49007", "翌月", 100.0),          # 読込元は 12 月ファイル
+        ("not a date", "1", "1", "49008", "日付なし", 100.0),
+    ]
+    report = validate_sales(_raw(rows, [(2024, 12, len(rows))]), store_ids=["1", "2"], categories=["1", "2"])
+    assert _checks(report) == {
+        "duplicate_rows": (1, "error"),
+        "jan_name_conflict": (1, "warn"),
+        "negative_amount": (1, "warn"),
+        "nan_amount": (1, "error"),
+        "unknown_store": (1, "warn"),
+        "unknown_category": (1, "error"),
+        "date_out_of_window": (2, "error"),
+    }
+    assert [i.check for i in report.errors] == ["duplicate_rows", "nan_amount", "unknown_category",
+                                                "date_out_of_window"]
+    assert "unknown_category=1" in str(DataQualityError(report))
+
+
+def test_store_and_category_checks_are_optional():
+    rows = GOOD + [("2024-12-21", "9", "7", "49005", "穴子", 100.0)]
+    assert validate_sales(_raw(rows)).ok
+
+
+def test_month_check_needs_matching_source_rows():
+    rows = GOOD + [("2025-01-02", "1", "1", "49007", "翌月", 100.0)]
+    assert validate_sales(_raw(rows, [(2024, 12, 99)])).ok      # 行数が合わなければ月は見ない
+    assert not validate_sales(_raw(rows, [(2024, 12, 3)])).ok
+
+
+@pytest.fixture
+def dirty_project(project):
+    raw = project_raw()
+    raw = pd.concat([raw, raw.head(3)], ignore_index=True)      # 重複行 3 件
+    write_sales_csv(project / "data" / "material", raw)
+    return project
+
+
+def test_cli_strict_stops_before_render(dirty_project, tmp_path, dates):
+    report = tmp_path / "dq.json"
+    r = run_cli(dirty_project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx",
+                "--strict", "--dq-report", report)
+    assert r.returncode == EXIT_DATA_QUALITY, r.stdout
+    assert "duplicate_rows=3" in r.stdout and "--strict のため中止" in r.stdout
+    assert not (tmp_path / "t.xlsx").exists()
+    data = json.loads(report.read_text(encoding="utf-8"))
+    assert data["ok"] is False
+    assert {i["check"]: i["count"] for i in data["issues"]} == {"duplicate_rows": 3}
+
+
+def test_cli_without_strict_only_warns(dirty_project, tmp_path, dates):
+    r = run_cli(dirty_project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx")
+    assert r.returncode == 0, r.stdout
+    assert "duplicate_rows: 3" in r.stdout
+    assert (tmp_path / "t.xlsx").exists()
+
+
+def test_project_data_is_clean(project, tmp_path, dates):
+    assert validate_sales(clean_raw(project_raw())).ok
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx", "--strict")
+    assert r.returncode == 0 and "[dq] ok:" in r.stdout, r.stdout
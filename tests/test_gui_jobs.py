@@ -0,0 +1,151 @@
+# tests/test_gui_jobs.py
+"""
+GUI のジョブキュー: 出力先が重なるジョブは順番に、重ならないジョブは並行に実行する。
+Tk は起動せず、ジョブキューに必要な属性だけを持つ TopNGuiApp で確かめる。
+"""
+from __future__ import annotations
+
+import itertools
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+from app import gui_topn_launcher as gui
+from app.gui_topn_launcher import DONE_STATUSES, Job, TopNGuiApp
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _Tree:
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, iid):
+        self.deleted.append(iid)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(gui, "JOB_WORKERS", 4)
+    a = object.__new__(TopNGuiApp)
+    a.jobs = {}
+    a._job_ids = itertools.count(1)
+    a._job_pending = queue.Queue()
+    a._job_updates = queue.Queue()
+    a._job_workers = []
+    a._job_cond = threading.Condition()
+    a._busy_targets = set()
+    a.log_queue = queue.Queue()
+    a.tree_jobs = _Tree()
+    a.runs = []          # (job id, 開始, 終了)
+    return a
+
+
+def _fake_run(app, sec=0.3):
+    def run(job):
+        t0 = time.perf_counter()
+        app._set_job(job, "実行中")
+        time.sleep(sec)
+        app.runs.append((job.id, t0, time.perf_counter()))
+        app._set_job(job, "完了")
+    return run
+
+
+def _submit(app, *targets):
+    jid = next(app._job_ids)
+    job = Job(id=jid, args=[], category="1", dates="", event="", out="", targets=frozenset(targets))
+    app.jobs[jid] = job
+    app._ensure_job_workers()
+    app._job_pending.put(jid)
+    return job
+
+
+def _wait(app, jobs, timeout=5.0):
+    t_end = time.time() + timeout
+    while time.time() < t_end:
+        if all(j.status in DONE_STATUSES for j in jobs):
+            return
+        time.sleep(0.02)
+    raise AssertionError([j.status for j in jobs])
+
+
+def _overlap(a, b) -> bool:
+    return a[1] < b[2] and b[1] < a[2]
+
+
+def test_jobs_sharing_a_target_run_one_after_another(app):
+    app._run_job = _fake_run(app)
+    jobs = [_submit(app, "/out/t.xlsx", "/out/split"), _submit(app, "/out/u.xlsx", "/out/split")]
+    _wait(app, jobs)
+    a, b = sorted(app.runs)
+    assert not _overlap(a, b)
+    assert not app._busy_targets
+
+
+def test_jobs_with_disjoint_targets_run_in_parallel(app):
+    app._run_job = _fake_run(app)
+    jobs = [_submit(app, "/out/a.xlsx"), _submit(app, "/out/b.xlsx")]
+    _wait(app, jobs)
+    a, b = sorted(app.runs)
+    assert _overlap(a, b)
+
+
+def test_cancelled_waiting_job_never_runs(app):
+    app._run_job = _fake_run(app, sec=0.5)
+    first = _submit(app, "/out/split")
+    second = _submit(app, "/out/split")
+    time.sleep(0.1)
+    assert second.status == "待機" and second.detail == "出力先が使用中のため待機"
+    app.tree_jobs.selection = lambda: (str(second.id),)
+    app._on_cancel_job()
+    _wait(app, [first, second])
+    assert second.status == "取消"
+    assert [r[0] for r in app.runs] == [first.id]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")  # ワーカーごと落ちる
+def test_failed_job_releases_its_targets(app):
+    def boom(job):
+        raise RuntimeError("x")
+    app._run_job = boom
+    _submit(app, "/out/split")
+    time.sleep(0.2)
+    assert not app._busy_targets
+    app._run_job = _fake_run(app, sec=0.0)
+    _wait(app, [_submit(app, "/out/split")])
+
+
+@pytest.mark.parametrize("code,status", [(0, "完了"), (3, "停止"), (4, "データ不備"), (1, "失敗")])
+def test_exit_code_to_status_and_clear(app, code, status):
+    job = Job(id=1, args=[sys.executable, "-c", f"import sys; sys.exit({code})"], category="1",
+              dates="", event="", out="")
+    app.jobs[1] = job
+    app._run_job(job)
+    assert job.status == status and status in DONE_STATUSES
+    app._on_clear_jobs()
+    assert app.jobs == {} and app.tree_jobs.deleted == ["1"]
+
+
+def test_running_and_waiting_jobs_are_not_cleared(app):
+    for jid, st in ((1, "待機"), (2, "実行中"), (3, "データ不備")):
+        app.jobs[jid] = Job(id=jid, args=[], category="1", dates="", event="", out="", status=st)
+    app._on_clear_jobs()
+    assert sorted(app.jobs) == [1, 2]
+
+
+def test_output_targets_include_split_dir_only_when_splitting(app, tmp_path):
+    app.var_out = _Var(str(tmp_path / "t.xlsx"))
+    app.var_split_dir = _Var(str(tmp_path / "split"))
+    app.var_split = _Var(False)
+    assert app._output_targets() == {str(tmp_path / "t.xlsx")}
+    app.var_split = _Var(True)
+    assert app._output_targets() == {str(tmp_path / "t.xlsx"), str(tmp_path / "split")}
@@ -0,0 +1,66 @@
+# tests/test_page_layout.py
+"""ページ配置（PageLayout）: 事前計算したセル座標と、JSON 設定での配置変更"""
+from __future__ import annotations
+
+import json
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from scripts.page_layout import DETAIL_FIELDS, PageLayout, load_page_layout
+from scripts.template_snapshot import DEFAULT_TEMPLATE, load_template_snapshot
+from scripts.topn_api import generate
+
+from conftest import CATEGORY
+
+
+def test_default_matches_template_geometry(layout):
+    assert layout == PageLayout.default()
+    assert (layout.days_per_page, layout.max_rank, layout.footer_rows) == (4, 35, (40, 41, 42))
+
+
+def test_slots_of_first_and_last_block():
+    lay = PageLayout.default()
+    first, last = lay.blocks[0], lay.blocks[-1]
+    assert first.block_header == ((2, 1), (2, 2), (2, 3), (2, 4))
+    assert first.details[0] == tuple((4, c) for c in range(1, len(DETAIL_FIELDS) + 1))
+    assert first.details[-1][0] == (38, 1)
+    assert last.headers[0] == (3, 25)
+    assert last.footer_labels == ((40, 25), (41, 25), (42, 25))
+    assert last.footer_values == ((40, 27), (41, 27), (42, 27))
+    assert last.compare_headers == ((3, 31), (3, 32))
+    assert last.compare_details[0] == ((4, 31), (4, 32))
+    assert len(first.details) == len(first.compare_details) == 35
+
+
+def test_build_custom_layout():
+    lay = PageLayout.build(block_offsets=range(0, 56, 8), max_rank=50, footer_rows=(55, 56, 57),
+                           compare_columns=(7, 8))
+    assert lay.days_per_page == 7 and len(lay.blocks) == 7
+    assert lay.blocks[6].details[49][1] == (53, 50)
+    assert lay.blocks[6].footer_values[2] == (57, 51)
+
+
+def test_days_per_page_cannot_exceed_blocks():
+    with pytest.raises(ValueError):
+        PageLayout.build(block_offsets=(0, 8), days_per_page=3)
+
+
+def test_json_overrides_snapshot_geometry(tmp_path):
+    cfg = tmp_path / "layout.json"
+    cfg.write_text(json.dumps({"days_per_page": 2, "max_rank": 10}), encoding="utf-8")
+    lay = load_page_layout(load_template_snapshot(DEFAULT_TEMPLATE), cfg)
+    assert (lay.days_per_page, lay.max_rank, lay.block_offsets) == (2, 10, (0, 8, 16, 24))
+    assert load_page_layout(None).blocks == PageLayout.default().blocks
+
+
+def test_render_follows_layout(sales, dates):
+    lay = PageLayout.from_geometry(load_template_snapshot(DEFAULT_TEMPLATE).geometry, days_per_page=2, max_rank=10)
+    res = generate(sales, {"1": "神栖"}, category=CATEGORY, dates=dates, stores=["1"], layout=lay)
+    wb = load_workbook(BytesIO(res.files[0].data))
+    assert wb.sheetnames == ["1(1)", "1(2)", "1(3)", "1(4)"]       # 7 日 / 2 日
+    ws = wb["1(4)"]
+    assert ws["A13"].value == 10 and ws["B14"].value in (None, "")  # Top10 で打ち切り
+    assert ws["B2"].value == "12/26"                                 # 最終ページは 7 日目だけ
+    assert [len(df) for df in res.topn["1"].values()] == [10] * len(dates)
@@ -0,0 +1,30 @@
+# tests/test_progress.py
+"""進捗イベント: run_end の bytes はまとめ版・店別のどちらでも書いたバイト数の合計"""
+from __future__ import annotations
+
+import pytest
+
+from scripts.progress import ProgressReporter
+from scripts.topn_api import generate
+
+from conftest import CATEGORY
+
+
+@pytest.mark.parametrize("split_by_store", [False, True])
+def test_run_end_reports_written_bytes(sales, dates, split_by_store):
+    events = []
+    res = generate(sales, {s: f"店{s}" for s in sales["store_id"].unique()}, category=CATEGORY, dates=dates,
+                   split_by_store=split_by_store, progress=ProgressReporter(callback=events.append))
+    run_end = [e for e in events if e["event"] == "run_end"]
+    assert len(run_end) == 1
+    assert run_end[0]["bytes"] == sum(f.size for f in res.files) > 0
+
+
+def test_add_bytes_accumulates_with_store_done():
+    events = []
+    p = ProgressReporter(callback=events.append)
+    p.stores_start(1)
+    p.store_done("1", bytes_written=100)
+    p.add_bytes(23)
+    p.run_end()
+    assert events[-1]["bytes"] == 123
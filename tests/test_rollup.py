@@ -0,0 +1,52 @@
+# tests/test_rollup.py
+"""--rollup: グループ単位の明細・フッタ合計が所属店の合計と一致する"""
+from __future__ import annotations
+
+import pytest
+
+from scripts.make_topn_simple_refactor import aggregate_topn, build_totals, rollup_key
+
+from conftest import CATEGORY
+
+ROLLUP = {
+    "area": {"1": "北", "2": "北", "3": "南"},
+    "chain": {"1": "全社", "2": "全社", "3": "全社"},
+}
+
+
+def _members(level: str, group: str) -> list[str]:
+    return [s for s, g in ROLLUP[level].items() if g == group]
+
+
+@pytest.fixture(scope="module")
+def rolled(sales, dates):
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=35, dates=dates, rollup=ROLLUP)
+    return topn, build_totals(sales, topn, CATEGORY, dates, rollup=ROLLUP)
+
+
+def test_rollup_units_are_added(rolled):
+    topn, _ = rolled
+    assert {rollup_key("area", "北"), rollup_key("area", "南"), rollup_key("chain", "全社")} <= set(topn)
+    assert {"1", "2", "3"} <= set(topn)
+
+
+@pytest.mark.parametrize("level,group", [("area", "北"), ("area", "南"), ("chain", "全社")])
+def test_footer_totals_equal_sum_of_members(rolled, dates, level, group):
+    _, (total_all, total_cat) = rolled
+    for d in dates:
+        for totals in (total_all, total_cat):
+            expected = sum(totals.get((d, s), 0.0) for s in _members(level, group))
+            assert totals[(d, rollup_key(level, group))] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("level,group", [("area", "北"), ("chain", "全社")])
+def test_detail_amounts_equal_sum_of_members(rolled, sales, dates, level, group):
+    topn, _ = rolled
+    g = sales[(sales["category_large"].astype(str) == str(CATEGORY))
+              & sales["store_id"].astype(str).isin(_members(level, group))]
+    by_jan = g.groupby(["date", "jan"])["amount"].sum()
+    for d, df_day in topn[rollup_key(level, group)].items():
+        assert len(df_day) > 0
+        for jan, amount in zip(df_day["jan"], df_day["amount"]):
+            assert amount == pytest.approx(by_jan[(d, jan)])
+        assert df_day["amount"].is_monotonic_decreasing
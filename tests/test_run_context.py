@@ -0,0 +1,86 @@
+# tests/test_run_context.py
+"""実行コンテキスト: 大分類名は category_map.json が唯一の正、タイトルはページ番号ごとに1回だけ作る"""
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from scripts.run_context import (
+    BUILTIN_CATEGORY_MAP, CATEGORY_MAP_PATH, RunContext, category_name, dates_to_range, load_category_map,
+)
+
+from conftest import CATEGORY, run_cli
+
+
+def _write_map(path, data, bump_ns=0):
+    path.write_text(data if isinstance(data, str) else json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    if bump_ns:
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+    return path
+
+
+def test_config_map_is_authoritative():
+    assert load_category_map() == json.loads(CATEGORY_MAP_PATH.read_text(encoding="utf-8"))
+    assert load_category_map() == BUILTIN_CATEGORY_MAP          # ビルトインは同じ内容の控え
+    assert category_name(2) == category_name("2") == "弁当"
+    assert category_name(99) == "99"
+
+
+def test_custom_map_wins_over_builtin(tmp_path):
+    m = load_category_map(_write_map(tmp_path / "m.json", {"2": "お弁当", "7": "パン"}))
+    assert m == {"2": "お弁当", "7": "パン"}
+    assert category_name(2, m) == "お弁当" and category_name(1, m) == "1"
+    assert RunContext(7, category_map=m).cat_name == "パン"
+
+
+@pytest.mark.parametrize("content", [None, "{broken", "[1, 2]"])
+def test_missing_or_broken_map_falls_back(tmp_path, content):
+    path = tmp_path / "m.json"
+    if content is not None:
+        _write_map(path, content)
+    assert load_category_map(path) == BUILTIN_CATEGORY_MAP
+
+
+def test_map_is_reread_when_mtime_changes(tmp_path):
+    path = _write_map(tmp_path / "m.json", {"2": "弁当"})
+    assert load_category_map(path)["2"] == "弁当"
+    _write_map(path, {"2": "お弁当"}, bump_ns=10**9)
+    assert load_category_map(path)["2"] == "お弁当"
+
+
+def test_event_title_and_memo():
+    run = RunContext(2, ["2024-12-24"], event_name=" クリスマス ")
+    assert run.title(1) == "クリスマス 弁当単品データ（1）"
+    assert run.make_title("2024-12-24", 2) == "クリスマス 弁当単品データ（2）"
+    assert run.title(1) is run.title(1) and sorted(run._titles) == [1, 2]
+
+
+def test_template_titles():
+    dates = ["2024-12-30", "2025-01-02"]
+    assert RunContext(1, dates).title(3) == "25年 2024-12–2025-01 寿司単品データ（3）"
+    assert RunContext(1, dates, title_template="$cat $date_short p$page").title(1) == "寿司 01/02 p1"
+    assert RunContext(1, dates, title_template="{cat} {dates_short}").title(1) == "寿司 12/30,01/02"
+    assert RunContext(1, dates, title_template="{cat} {unknown}").title(1) == "{cat} {unknown}"
+    assert RunContext(1, dates, title_template="{cat}[{range}{date}]", no_date_in_title=True).title(1) == "寿司[]"
+
+
+def test_dates_to_range():
+    assert dates_to_range(["2024-12-24", "2024-12-20"]) == "2024-12"
+    assert dates_to_range(["2025-01-03", "2024-12-24"]) == "2024-12–2025-01"
+    assert dates_to_range([]) == ""
+    assert dates_to_range(["12/24", "12/25"]) == "12/24,12/25"
+
+
+def test_cli_uses_project_category_map(project, tmp_path, dates):
+    _write_map(project / "config" / "category_map.json", {"1": "すし", "2": "弁当"})
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--event-name", "テスト",
+                "--out", tmp_path / "t.xlsx", "--split-by-store", "--split-dir", tmp_path / "split")
+    assert r.returncode == 0, r.stdout
+    assert sorted(p.name for p in (tmp_path / "split").glob("*/*.xlsx")) == [
+        f"{s}_すし単品データ.xlsx" for s in ("1", "2", "3")]
+    ws = load_workbook(tmp_path / "split" / "1" / "1_すし単品データ.xlsx").worksheets[0]
+    assert ws["A1"].value == "テスト すし単品データ（1）"
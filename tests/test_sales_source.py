@@ -0,0 +1,78 @@
+# tests/test_sales_source.py
+"""圧縮された月次売上（.csv.gz / .xz / .bz2 / .zst）の探索とストリーム読込"""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from scripts import sales_source
+from scripts.make_topn_simple_refactor import load_sales, read_sales_raw, sales_source_files
+from scripts.sales_source import find_month_file, iter_month_keys, source_fingerprint
+
+from conftest import CATEGORY, project_raw, run_cli, write_sales_csv
+
+CODECS = [(".csv.gz", "gzip"), (".csv.xz", "xz"), (".csv.bz2", "bz2")]
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return project_raw()
+
+
+@pytest.fixture(scope="module")
+def plain(raw, tmp_path_factory):
+    root = tmp_path_factory.mktemp("plain")
+    write_sales_csv(root, raw)
+    return root
+
+
+@pytest.mark.parametrize("suffix,codec", CODECS)
+def test_compressed_reads_same_as_plain(raw, plain, tmp_path, dates, suffix, codec):
+    paths = write_sales_csv(tmp_path, raw, suffix=suffix)
+    assert paths[0].stat().st_size < (plain / "2024" / "IT_202412.csv").stat().st_size
+    pd.testing.assert_frame_equal(load_sales(tmp_path, dates), load_sales(plain, dates))
+
+    stats = read_sales_raw(tmp_path, dates).attrs["read_stats"]
+    assert [(s.file, s.codec) for s in stats] == [(f"IT_202412{suffix}", codec)]
+    assert stats[0].decoded_bytes == (plain / "2024" / "IT_202412.csv").stat().st_size
+    assert stats[0].ratio > 1
+
+
+def test_plain_csv_takes_priority(raw, tmp_path):
+    write_sales_csv(tmp_path, raw, suffix=".csv.bz2")
+    write_sales_csv(tmp_path, raw, suffix=".csv.gz")
+    assert find_month_file(tmp_path, 2024, 12).name == "IT_202412.csv.gz"
+    write_sales_csv(tmp_path, raw)
+    assert find_month_file(tmp_path, 2024, 12).name == "IT_202412.csv"
+    assert find_month_file(tmp_path, 2024, 11) is None
+
+
+def test_zst_is_skipped_without_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(sales_source, "zstd_available", lambda: False)
+    (tmp_path / "2024").mkdir()
+    (tmp_path / "2024" / "IT_202412.csv.zst").write_bytes(b"")
+    (tmp_path / "2025").mkdir()
+    (tmp_path / "2025" / "IT_202501.csv.xz").write_bytes(b"")
+    assert find_month_file(tmp_path, 2024, 12) is None
+    assert iter_month_keys(tmp_path) == [(2025, 1)]
+    with pytest.raises(FileNotFoundError):
+        sales_source_files(tmp_path, [pd.Timestamp("2024-12-20")])
+
+
+def test_fingerprint_follows_file(raw, tmp_path):
+    path, _ = write_sales_csv(tmp_path, raw, suffix=".csv.gz")
+    fp = source_fingerprint(path)
+    assert source_fingerprint(path) == fp and source_fingerprint(path, salt="x") != fp
+    write_sales_csv(tmp_path, raw.head(10), suffix=".csv.gz")
+    assert source_fingerprint(path) != fp
+
+
+def test_cli_reads_compressed_month(project, raw, tmp_path, dates):
+    material = project / "data" / "material"
+    for p in material.glob("*/IT_*.csv"):
+        p.unlink()
+    write_sales_csv(material, raw, suffix=".csv.xz")
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx")
+    assert r.returncode == 0, r.stdout
+    assert "[read] IT_202412.csv.xz codec=xz" in r.stdout
+    assert (tmp_path / "t.xlsx").exists()
@@ -0,0 +1,93 @@
+# tests/test_sales_store.py
+"""SQLite 売上ストア（SalesStore）: load_sales / aggregate_topn / build_totals と同じ結果を返す"""
+from __future__ import annotations
+
+import os
+import re
+
+import pandas as pd
+import pytest
+from openpyxl.utils import column_index_from_string
+
+from scripts.make_topn_simple_refactor import aggregate_topn, build_totals, load_sales
+from scripts.sales_store import SALES_COLUMNS, SalesStore
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, project_raw, run_cli, write_sales_csv
+
+
+@pytest.fixture(scope="module")
+def material(tmp_path_factory):
+    root = tmp_path_factory.mktemp("material")
+    write_sales_csv(root, project_raw())
+    return root
+
+
+@pytest.fixture
+def store(material, tmp_path):
+    with SalesStore(tmp_path / "sales.sqlite") as s:
+        s.sync(material)
+        yield s
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df[list(SALES_COLUMNS)].sort_values(["date", "store_id", "jan"]).reset_index(drop=True)
+
+
+def test_sales_match_load_sales(store, material, dates):
+    expected = load_sales(material, dates)
+    got = store.sales(dates)
+    pd.testing.assert_frame_equal(_sorted(got), _sorted(expected), check_dtype=False)
+    assert _sorted(store.sales(dates, stores=["2"]))["store_id"].unique().tolist() == ["2"]
+
+
+def test_topn_and_totals_match(store, material, dates):
+    df = load_sales(material, dates)
+    expected = aggregate_topn(df, category=CATEGORY, top_n=10, dates=dates)
+    got = store.topn(CATEGORY, dates, top_n=10)
+    assert set(got) == set(expected)
+    for s, day_map in expected.items():
+        assert list(got[s]) == list(day_map)
+        for d, want in day_map.items():
+            assert got[s][d]["amount"].tolist() == want["amount"].astype(float).tolist()
+
+    total_all, total_cat = store.totals(CATEGORY, dates)
+    want_all, want_cat = build_totals(df, expected, CATEGORY, dates)
+    assert total_all == pytest.approx(want_all) and total_cat == pytest.approx(want_cat)
+
+
+def test_store_filter(store, dates):
+    assert set(store.topn(CATEGORY, dates[:1], stores=["1", "3"])) == {"1", "3"}
+    total_all, _ = store.totals(CATEGORY, dates[:1], stores=["3"])
+    assert {s for _, s in total_all} == {"3"}
+
+
+def test_resync_only_reloads_changed_months(store, material):
+    assert store.sync(material) == {"loaded": [], "skipped": 2, "rows": 0}
+    jan = material / "2025" / "IT_202501.csv"
+    st = jan.stat()
+    os.utime(jan, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    res = store.sync(material)
+    assert res["loaded"] == ["2025-01"] and res["skipped"] == 1
+    assert store.stats()["months"] == ["2024-12", "2025-01"]
+    assert store.stats()["rows"] == len(load_sales(material))   # 入れ替えで行が増えない
+
+
+def _tie_swap(diff: str) -> bool:
+    m = re.match(r"[^!]+!([A-Z]+)(\d+): ", diff)
+    return bool(m) and 4 <= int(m.group(2)) <= 38 and column_index_from_string(m.group(1)) % 8 != 3
+
+
+def test_cli_sales_db_matches_csv(project, tmp_path, dates):
+    args = ("--category", CATEGORY, "--dates", ",".join(map(str, dates)))
+    r = run_cli(project, *args, "--out", tmp_path / "csv.xlsx")
+    assert r.returncode == 0, r.stdout
+    db = tmp_path / "sales.sqlite"
+    r = run_cli(project, *args, "--out", tmp_path / "db.xlsx", "--sales-db", db)
+    assert r.returncode == 0, r.stdout
+    assert "取込 ['2024-12']" in r.stdout
+    diffs = diff_books(read_book((tmp_path / "csv.xlsx").read_bytes()), read_book((tmp_path / "db.xlsx").read_bytes()))
+    # 同額の商品は並び順が CSV 経路と違ってよい（金額列とフッタは一致）
+    assert [d for d in diffs if not _tie_swap(d)] == []
+    r = run_cli(project, *args, "--out", tmp_path / "db.xlsx", "--sales-db", db)
+    assert "取込 なし（変更なし 1 か月）" in r.stdout
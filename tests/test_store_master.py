@@ -0,0 +1,97 @@
+# tests/test_store_master.py
+"""店舗マスターの JSON キャッシュ（load_store_master）と、グループ・ロールアップ列"""
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from scripts import make_topn_simple_refactor as topn
+from scripts.make_topn_simple_refactor import (
+    load_rollup_levels, load_store_groups, load_store_master, resolve_stores,
+)
+
+from conftest import STORE_MASTER
+
+EXPECTED = {"1": "神栖", "2": "鹿嶋", "3": "潮来"}
+
+
+@pytest.fixture
+def master(tmp_path):
+    path = tmp_path / "store_master.xlsx"
+    STORE_MASTER.to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def xlsx_reads(monkeypatch):
+    """xlsx を実際に読んだ回数"""
+    calls = []
+    real = topn._read_store_master_xlsx
+    monkeypatch.setattr(topn, "_read_store_master_xlsx", lambda p: calls.append(p) or real(p))
+    return calls
+
+
+def test_cache_written_and_reused(master, tmp_path, xlsx_reads):
+    cache = tmp_path / "cache"
+    assert load_store_master(master, cache) == EXPECTED
+    data = json.loads((cache / "store_master.master.json").read_text(encoding="utf-8"))
+    assert data["stores"] == EXPECTED and data["size"] == master.stat().st_size
+    assert load_store_master(master, cache) == EXPECTED
+    assert len(xlsx_reads) == 1
+
+
+def test_touched_but_same_content_uses_hash(master, tmp_path, xlsx_reads):
+    cache = tmp_path / "cache"
+    load_store_master(master, cache)
+    st = master.stat()
+    os.utime(master, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # コピーし直し相当
+    assert load_store_master(master, cache) == EXPECTED
+    assert len(xlsx_reads) == 1
+    data = json.loads((cache / "store_master.master.json").read_text(encoding="utf-8"))
+    assert data["mtime_ns"] == master.stat().st_mtime_ns   # 次回はハッシュ計算もしない
+
+
+def test_changed_content_is_reread(master, tmp_path, xlsx_reads):
+    cache = tmp_path / "cache"
+    load_store_master(master, cache)
+    STORE_MASTER.assign(short_name=["A", "B", "C"]).to_excel(master, index=False)
+    assert load_store_master(master, cache) == {"1": "A", "2": "B", "3": "C"}
+    assert len(xlsx_reads) == 2
+
+
+@pytest.mark.parametrize("content", ["{broken", json.dumps({"stores": {"1": "旧"}, "groups": {}})])
+def test_broken_or_old_cache_is_rebuilt(master, tmp_path, xlsx_reads, content):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "store_master.master.json").write_text(content, encoding="utf-8")
+    assert load_store_master(master, cache) == EXPECTED
+    assert len(xlsx_reads) == 1
+
+
+def test_cache_disabled(master, xlsx_reads):
+    load_store_master(master, None)
+    load_store_master(master, None)
+    assert len(xlsx_reads) == 2
+
+
+def test_short_name_falls_back_to_name(tmp_path):
+    path = tmp_path / "m.xlsx"
+    STORE_MASTER.assign(short_name=[None, "鹿嶋", None]).to_excel(path, index=False)
+    assert load_store_master(path, None) == {"1": "神栖店", "2": "鹿嶋", "3": "潮来店"}
+
+
+def test_groups_levels_and_resolve(master, tmp_path):
+    cache = tmp_path / "cache"
+    groups = load_store_groups(master, cache)
+    assert groups == {"北": ["1", "2"], "南": ["3"]}
+    assert resolve_stores("3,北", groups) == ["3", "1", "2"]
+    with pytest.raises(ValueError):
+        resolve_stores("西", groups)
+
+    levels = load_rollup_levels(master, ["area", "chain"], cache_dir=cache)
+    assert levels["area"] == {"1": "北", "2": "北", "3": "南"}
+    assert set(levels["chain"].values()) == {topn.ROLLUP_CHAIN_NAME}
+    with pytest.raises(ValueError):
+        load_rollup_levels(master, ["region"], cache_dir=cache)
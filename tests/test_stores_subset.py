@@ -0,0 +1,84 @@
+# tests/test_stores_subset.py
+"""--stores: 対象店だけを読込・集計・描画し、マニフェストには他店の前回分を残す"""
+from __future__ import annotations
+
+import json
+
+from scripts.make_topn_simple_refactor import read_sales_raw
+from scripts.manifest import RunManifest
+
+from conftest import CATEGORY, JAN_SHIFT, project_raw, run_cli, write_sales_csv
+
+SUFFIX = "_寿司単品データ.xlsx"
+
+
+def _manifest(path, dates, *stores):
+    m = RunManifest(path, category="1", dates=dates)
+    for s in stores:
+        m.add(f"{s}/{s}{SUFFIX}", f"v1-{s}".encode(), store=s)
+    return m
+
+
+def test_keep_previous_except_merges_other_stores(tmp_path):
+    path = tmp_path / "manifest_1.json"
+    _manifest(path, ["2024-12-20"], "1", "2", "3").write()
+    m = _manifest(path, ["2024-12-20"])
+    m.keep_previous_except(["2"])
+    m.add(f"2/2{SUFFIX}", b"v2", store="2")
+    m.write()
+    files = {f["store"]: f for f in json.loads(path.read_text(encoding="utf-8"))["files"]}
+    assert sorted(files) == ["1", "2", "3"]
+    assert files["2"]["size"] == 2 and files["1"]["size"] == len(b"v1-1")
+
+
+def test_other_dates_are_not_merged(tmp_path, capsys):
+    path = tmp_path / "manifest_1.json"
+    _manifest(path, ["2024-12-20"], "1", "2", "3").write()
+    m = _manifest(path, ["2024-12-21"])
+    m.keep_previous_except(["2"])
+    assert m.files == {}
+    assert "dates が異なるため引き継ぎません" in capsys.readouterr().out
+
+
+def test_read_sales_raw_filters_stores(tmp_path, dates):
+    write_sales_csv(tmp_path, project_raw())
+    raw = read_sales_raw(tmp_path, dates, stores=["3"])
+    assert set(raw["store_id"].astype(str)) == {"3"}
+    assert sum(n for *_, n in raw.attrs["source_rows"]) == len(raw)
+
+
+def test_cli_reissue_one_store(project, tmp_path, dates):
+    split = tmp_path / "split"
+    args = ("--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--out", tmp_path / "t.xlsx",
+            "--split-by-store", "--split-dir", split)
+    assert run_cli(project, *args).returncode == 0
+    before = {p.parent.name: p.stat().st_mtime_ns for p in split.glob("*/*.xlsx")}
+
+    r = run_cli(project, *args, "--stores", "2")
+    assert r.returncode == 0, r.stdout
+    assert "[stores] 対象 1 店: 2" in r.stdout
+    after = {p.parent.name: p.stat().st_mtime_ns for p in split.glob("*/*.xlsx")}
+    assert [s for s in after if after[s] != before[s]] == ["2"]
+    manifest = json.loads((split / "manifest_1.json").read_text(encoding="utf-8"))
+    assert [f["store"] for f in manifest["files"]] == ["1", "2", "3"]
+
+
+def test_cli_group_name_and_unknown_store(project, tmp_path, dates):
+    args = ("--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx",
+            "--split-by-store", "--split-dir", tmp_path / "split")
+    r = run_cli(project, *args, "--stores", "北")
+    assert r.returncode == 0 and "[stores] 対象 2 店: 1, 2" in r.stdout, r.stdout
+    assert sorted(p.parent.name for p in (tmp_path / "split").glob("*/*.xlsx")) == ["1", "2"]
+
+    r = run_cli(project, *args, "--stores", "西")
+    assert r.returncode == 2 and "--stores:" in r.stdout
+
+
+def test_cli_other_dates_drop_previous_rows(project, tmp_path, dates):
+    split = tmp_path / "split"
+    base = ("--category", CATEGORY, "--out", tmp_path / "t.xlsx", "--split-by-store", "--split-dir", split)
+    assert run_cli(project, *base, "--dates", str(dates[0])).returncode == 0
+    r = run_cli(project, *base, "--dates", str(dates[0] + JAN_SHIFT), "--stores", "2")
+    assert "前回のマニフェストは dates が異なるため引き継ぎません" in r.stdout
+    manifest = json.loads((split / "manifest_1.json").read_text(encoding="utf-8"))
+    assert [f["store"] for f in manifest["files"]] == ["2"]
@@ -0,0 +1,98 @@
+# tests/test_table_export.py
+"""--format csv / jsonl / parquet: xlsx と同じ明細・フッタ値を縦持ちの表で書き出す"""
+from __future__ import annotations
+
+import json
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from scripts.make_topn_simple_refactor import aggregate_topn, build_totals
+from scripts.table_export import TABLE_COLUMNS, parquet_available, table_bytes, topn_table
+
+from conftest import CATEGORY, N_STORES, run_cli
+
+NAMES = {str(s): f"店{s}" for s in range(1, N_STORES + 1)}
+
+
+@pytest.fixture(scope="module")
+def table(sales, dates):
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=35, dates=dates)
+    totals = build_totals(sales, topn, CATEGORY, dates)
+    return topn, totals, topn_table(topn, NAMES, *totals)
+
+
+def test_rows_follow_topn(table, dates):
+    topn, _, df = table
+    assert list(df.columns) == list(TABLE_COLUMNS)
+    assert len(df) == sum(len(d) for m in topn.values() for d in m.values())
+    assert list(df["store_id"].unique()) == list(NAMES)
+    first = df[(df["store_id"] == "2") & (df["date"] == str(dates[0]))]
+    src = topn["2"][dates[0]]
+    assert first["rank"].tolist() == list(range(1, len(src) + 1))
+    assert first["amount"].tolist() == src["amount"].astype(float).tolist()
+    assert (first["store_name"] == "店2").all()
+
+
+def test_footer_totals_and_ratios(table, dates):
+    _, (total_all, total_cat), df = table
+    row = df[(df["store_id"] == "1") & (df["date"] == str(dates[3]))].iloc[0]
+    assert row["total_all"] == total_all[(dates[3], "1")]
+    assert row["total_cat"] == total_cat[(dates[3], "1")]
+    assert row["cat_ratio"] == pytest.approx(row["total_cat"] / row["total_all"])
+    assert row["rate"] == pytest.approx(row["discount"] / row["amount"])
+
+
+def test_empty_topn_keeps_columns():
+    assert list(topn_table({}, {}, {}, {}).columns) == list(TABLE_COLUMNS)
+    assert table_bytes(topn_table({}, {}, {}, {}), "jsonl") == b""
+
+
+def test_csv_has_bom_and_round_trips(table):
+    df = table[2]
+    data = table_bytes(df, "csv")
+    assert data.startswith(b"\xef\xbb\xbf")
+    back = pd.read_csv(BytesIO(data), encoding="utf-8-sig", dtype={"store_id": str, "jan": str})
+    pd.testing.assert_frame_equal(back, df, check_dtype=False)
+
+
+def test_jsonl_one_record_per_line(table):
+    df = table[2]
+    lines = table_bytes(df, "jsonl").decode("utf-8").splitlines()
+    assert len(lines) == len(df)
+    assert json.loads(lines[0])["store_name"] == "店1"
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow / fastparquet なし")
+def test_parquet_round_trips(table):
+    df = table[2]
+    pd.testing.assert_frame_equal(pd.read_parquet(BytesIO(table_bytes(df, "parquet"))), df)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        table_bytes(pd.DataFrame(), "xml")
+
+
+def test_cli_csv_split_by_store(project, tmp_path, dates):
+    r = run_cli(project, "--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--format", "csv",
+                "--out", tmp_path / "t.xlsx", "--split-by-store", "--split-dir", tmp_path / "split")
+    assert r.returncode == 0, r.stdout
+    files = sorted((tmp_path / "split").glob("*/*.csv"))
+    assert [p.name for p in files] == [f"{s}_寿司単品データ.csv" for s in NAMES]
+    df = pd.read_csv(files[0], encoding="utf-8-sig", dtype={"store_id": str})
+    assert list(df.columns) == list(TABLE_COLUMNS)
+    assert (df["store_id"] == "1").all() and (df["store_name"] == "神栖").all()
+    manifest = json.loads((tmp_path / "split" / "manifest_1.json").read_text(encoding="utf-8"))
+    assert manifest["format"] == "csv" and len(manifest["files"]) == N_STORES
+    assert not list(tmp_path.glob("*.xlsx"))
+
+
+def test_cli_jsonl_single_file(project, tmp_path, dates):
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--format", "jsonl",
+                "--out", tmp_path / "t.xlsx")
+    assert r.returncode == 0, r.stdout
+    lines = (tmp_path / "t.jsonl").read_text(encoding="utf-8").splitlines()
+    assert {json.loads(x)["store_id"] for x in lines} == set(NAMES)
+    assert {json.loads(x)["date"] for x in lines} == {str(dates[0])}
@@ -0,0 +1,96 @@
+# tests/test_template_snapshot.py
+"""テンプレートスナップショット: 鮮度判定（mtime/サイズ/sha256/openpyxl）と復元"""
+from __future__ import annotations
+
+import os
+import pickle
+import shutil
+
+import pytest
+from openpyxl import load_workbook
+
+from scripts import template_snapshot as ts
+from scripts.template_snapshot import DEFAULT_TEMPLATE, TEMPLATE_SHEET, load_template_snapshot
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch):
+    monkeypatch.setattr(ts, "_memo", {})   # プロセス内メモはテストごとに空
+    path = tmp_path / "tpl.xlsx"
+    shutil.copy(DEFAULT_TEMPLATE, path)
+    return path
+
+
+@pytest.fixture
+def compiles(monkeypatch):
+    calls = []
+    real = ts.compile_template
+    monkeypatch.setattr(ts, "compile_template", lambda p, cache_dir=None: calls.append(p) or real(p, cache_dir))
+    return calls
+
+
+def _reload(path, cache):
+    ts._memo.clear()   # 別プロセスでの起動相当（キャッシュファイルから読む）
+    return load_template_snapshot(path, cache)
+
+
+def test_geometry_of_bundled_template():
+    g = load_template_snapshot(DEFAULT_TEMPLATE, None).geometry
+    assert g.block_offsets == [0, 8, 16, 24]
+    assert (g.header_row, g.detail_first_row, g.detail_last_row, g.max_rank) == (3, 4, 38, 35)
+    assert g.footer_rows == [40, 41, 42]
+
+
+def test_compiled_once_then_loaded_from_cache(template, tmp_path, compiles):
+    cache = tmp_path / "cache"
+    snap = load_template_snapshot(template, cache)
+    assert (cache / "tpl.snapshot.pkl").exists()
+    assert load_template_snapshot(template, cache) is snap       # プロセス内メモ
+    assert _reload(template, cache).sha256 == snap.sha256         # キャッシュファイル
+    assert len(compiles) == 1
+
+
+def test_touched_template_with_same_content_is_fresh(template, tmp_path, compiles):
+    cache = tmp_path / "cache"
+    load_template_snapshot(template, cache)
+    st = template.stat()
+    os.utime(template, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    _reload(template, cache)
+    assert len(compiles) == 1
+
+
+def test_edited_template_is_recompiled(template, tmp_path, compiles):
+    cache = tmp_path / "cache"
+    load_template_snapshot(template, cache)
+    wb = load_workbook(template)
+    wb[TEMPLATE_SHEET]["A1"] = "編集済み"
+    wb.save(template)
+    snap = _reload(template, cache)
+    assert len(compiles) == 2
+    assert snap.new_workbook()[TEMPLATE_SHEET]["A1"].value == "編集済み"
+
+
+def test_other_openpyxl_version_is_recompiled(template, tmp_path, compiles):
+    cache = tmp_path / "cache"
+    snap = load_template_snapshot(template, cache)
+    snap.openpyxl_version = "0.0"
+    (cache / "tpl.snapshot.pkl").write_bytes(pickle.dumps(snap))
+    assert _reload(template, cache).openpyxl_version != "0.0"
+    assert len(compiles) == 2
+
+
+def test_broken_cache_is_recompiled(template, tmp_path, compiles):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "tpl.snapshot.pkl").write_bytes(b"not a pickle")
+    load_template_snapshot(template, cache)
+    assert len(compiles) == 1
+
+
+def test_new_workbook_returns_independent_copies(template):
+    snap = load_template_snapshot(template, None)
+    a, b = snap.new_workbook(), snap.new_workbook()
+    a[TEMPLATE_SHEET]["A1"] = "a だけ"
+    assert b[TEMPLATE_SHEET]["A1"].value != "a だけ"
+    assert len(snap.cf_items) > 0
+    assert a[TEMPLATE_SHEET].conditional_formatting is not b[TEMPLATE_SHEET].conditional_formatting
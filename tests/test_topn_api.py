@@ -0,0 +1,64 @@
+# tests/test_topn_api.py
+"""ライブラリ API（topn_api.generate）: メモリ上のブックが CLI の出力と同じになる"""
+from __future__ import annotations
+
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from scripts.make_topn_simple_refactor import load_sales, load_store_master
+from scripts.topn_api import generate
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, N_STORES, run_cli
+
+NAMES = {str(s): f"店{s}" for s in range(1, N_STORES + 1)}
+
+
+def test_split_returns_one_workbook_per_store(sales, dates):
+    res = generate(sales, NAMES, category=CATEGORY, dates=dates, event_name="テスト")
+    assert [f.relpath for f in res.files] == [f"{s}/{s}_寿司単品データ.xlsx" for s in NAMES]
+    assert set(res.by_store()) == set(NAMES)
+    assert res.total_bytes == sum(len(d) for d in res.by_store().values())
+    wb = load_workbook(BytesIO(res.by_store()["2"]))
+    assert wb.sheetnames == ["2(1)", "2(2)"]          # 7 日 → 4 日 + 3 日
+    assert wb["2(1)"]["A1"].value == "テスト 寿司単品データ（1）"
+    assert set(res.topn) == set(NAMES)
+
+
+def test_combined_workbook(sales, dates):
+    res = generate(sales, NAMES, category=CATEGORY, dates=dates, split_by_store=False, out_name="all.xlsx")
+    assert [(f.store, f.relpath) for f in res.files] == [(None, "all.xlsx")]
+    assert res.by_store() == {}
+    wb = load_workbook(BytesIO(res.files[0].data))
+    assert len(wb.sheetnames) == 2 * N_STORES
+
+
+def test_sink_receives_bytes_without_keeping_them(sales, dates):
+    got = {}
+    res = generate(sales, NAMES, category=CATEGORY, dates=dates, sink=lambda rel, data: got.setdefault(rel, data))
+    assert list(got) == [f.relpath for f in res.files]
+    assert all(f.data is None for f in res.files)
+    assert [f.size for f in res.files] == [len(d) for d in got.values()]
+
+
+def test_stores_and_top_n(sales, dates):
+    res = generate(sales, NAMES, category=CATEGORY, dates=dates[:1], stores=["3"], top_n=5)
+    assert [f.store for f in res.files] == ["3"]
+    assert [len(df) for df in res.topn["3"].values()] == [5]
+    ws = load_workbook(BytesIO(res.files[0].data)).worksheets[0]
+    assert ws["A8"].value == 5 and ws["C9"].value in (None, "")   # 6 位以降は空
+
+
+def test_matches_cli_split_output(project, tmp_path, dates):
+    split = tmp_path / "split"
+    r = run_cli(project, "--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--out", tmp_path / "t.xlsx",
+                "--split-by-store", "--split-dir", split, "--event-name", "テスト")
+    assert r.returncode == 0, r.stdout
+
+    material = project / "data" / "material"
+    res = generate(load_sales(material, dates), load_store_master(material / "master" / "store_master.xlsx", None),
+                   category=CATEGORY, dates=dates, event_name="テスト",
+                   template_path=project / "data" / "template" / "配布フォーマット.xlsx")
+    for f in res.files:
+        assert diff_books(read_book((split / f.relpath).read_bytes()), read_book(f.data)) == [], f.relpath
@@ -0,0 +1,110 @@
+# tests/test_topn_cache.py
+"""日単位の TopN キャッシュ（TopNDayCache）: 計算済みの日は組み立て、未計算の日だけ集計する"""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.make_topn_simple_refactor import EXIT_DATA_QUALITY, aggregate_topn, build_totals
+from scripts.topn_cache import TopNDayCache, month_fingerprints
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, JAN_SHIFT, project_raw, run_cli, write_sales_csv
+
+TOP_N = 10
+
+
+@pytest.fixture(scope="module")
+def material(tmp_path_factory):
+    root = tmp_path_factory.mktemp("material")
+    write_sales_csv(root, project_raw())
+    return root
+
+
+@pytest.fixture(scope="module")
+def computed(sales, dates):
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=TOP_N, dates=dates)
+    return topn, build_totals(sales, topn, CATEGORY, dates)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = TopNDayCache(tmp_path / "topn_days.sqlite")
+    yield c
+    c.close()
+
+
+def test_fingerprints_per_month(material, dates):
+    jan = [d + JAN_SHIFT for d in dates]
+    fps = month_fingerprints(material, [*dates, *jan, pd.Timestamp("2025-02-01")])
+    assert len(fps) == 2 * len(dates)                       # 2月はファイルが無い
+    assert len({fps[d] for d in dates}) == 1 and fps[dates[0]] != fps[jan[0]]
+
+
+def test_put_then_get_hits_every_day(cache, material, computed, dates):
+    topn, totals = computed
+    fps = month_fingerprints(material, dates)
+    got, _, missing = cache.get(CATEGORY, dates, TOP_N, fps)
+    assert missing == dates and got == {}
+
+    cache.put(CATEGORY, dates, TOP_N, fps, topn, totals)
+    got, got_totals, missing = cache.get(CATEGORY, dates, TOP_N, fps)
+    assert missing == []
+    assert got_totals == totals
+    for s, day_map in topn.items():
+        for d, want in day_map.items():
+            pd.testing.assert_frame_equal(got[s][d].reset_index(drop=True), want.reset_index(drop=True),
+                                          check_dtype=False)
+
+
+def test_partial_hit_and_store_filter(cache, material, computed, dates):
+    topn, totals = computed
+    fps = month_fingerprints(material, dates)
+    cache.put(CATEGORY, dates[:3], TOP_N, fps, topn, totals)
+    got, (total_all, _), missing = cache.get(CATEGORY, dates, TOP_N, fps, stores=["2"])
+    assert missing == dates[3:]
+    assert set(got) == {"2"} and list(got["2"]) == dates[:3]
+    assert {s for _, s in total_all} == {"2"}
+
+
+def test_other_top_n_or_changed_month_misses(cache, material, computed, dates):
+    topn, totals = computed
+    fps = month_fingerprints(material, dates)
+    cache.put(CATEGORY, dates, TOP_N, fps, topn, totals)
+    assert cache.get(CATEGORY, dates, TOP_N + 1, fps)[2] == dates
+    assert cache.get(CATEGORY + 1, dates, TOP_N, fps)[2] == dates
+
+    f = material / "2024" / "IT_202412.csv"
+    st = f.stat()
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # 月次ファイルの差し替え
+    assert cache.get(CATEGORY, dates, TOP_N, month_fingerprints(material, dates))[2] == dates
+
+
+def test_evicts_least_recently_used_day(tmp_path, material, computed, dates):
+    topn, totals = computed
+    fps = month_fingerprints(material, dates)
+    cache = TopNDayCache(tmp_path / "c.sqlite")
+    cache.put(CATEGORY, dates[:2], TOP_N, fps, topn, totals)
+    per_day = cache.stats()["bytes"] // 2
+    cache.get(CATEGORY, dates[:1], TOP_N, fps)                  # 1日目を使った → 2日目が最古
+    cache.max_bytes = per_day * 2 + per_day // 2
+    cache.put(CATEGORY, dates[2:3], TOP_N, fps, topn, totals)
+    assert cache.get(CATEGORY, dates[:3], TOP_N, fps)[2] == [dates[1]]
+    cache.close()
+
+
+def test_cli_second_run_hits_cache(project, tmp_path, dates):
+    args = ("--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--topn-cache")
+    r = run_cli(project, *args, "--out", tmp_path / "a.xlsx")
+    assert r.returncode == 0 and f"ヒット 0 日 / 未計算 {len(dates)} 日" in r.stdout, r.stdout
+    r = run_cli(project, *args, "--out", tmp_path / "b.xlsx")
+    assert r.returncode == 0 and f"ヒット {len(dates)} 日 / 未計算 0 日" in r.stdout, r.stdout
+    assert diff_books(read_book((tmp_path / "a.xlsx").read_bytes()),
+                      read_book((tmp_path / "b.xlsx").read_bytes())) == []
+
+    r = run_cli(project, *args, "--out", tmp_path / "c.xlsx", "--strict")
+    assert r.returncode == EXIT_DATA_QUALITY
+    assert "品質チェックした日がありません" in r.stdout
+    assert not (tmp_path / "c.xlsx").exists()
@@ -0,0 +1,183 @@
+# tests/test_topn_serve.py
+"""常駐サービス（topn_serve）: 月データの LRU、読込の並行制御、各エンドポイント"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+from http.server import ThreadingHTTPServer
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from scripts import topn_serve
+from scripts.make_topn_simple_refactor import aggregate_topn, build_totals, load_sales, load_store_master
+from scripts.topn_serve import MonthCache, TopNService
+
+from conftest import CATEGORY, JAN_SHIFT
+
+DEC, JAN = (2024, 12), (2025, 1)
+
+
+class _FakeMonths(MonthCache):
+    """_load_month を差し替えた MonthCache（読込回数・待ち時間を制御する）"""
+
+    def __init__(self, delays=None, fail=(), **kwargs):
+        super().__init__("unused", **kwargs)
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.calls: list[tuple[int, int]] = []
+
+    def _load_month(self, y, m):
+        self.calls.append((y, m))
+        time.sleep(self.delays.get((y, m), 0.0))
+        if (y, m) in self.fail:
+            self.fail.discard((y, m))  # 1回だけ失敗
+            raise OSError(f"cannot read {y}-{m}")
+        return pd.DataFrame({"date": [date(y, m, 1), date(y, m, 2)], "v": [m, m]})
+
+
+def test_month_cache_lru_and_counters():
+    months = _FakeMonths(max_months=2)
+    months.get([date(2024, 12, 1)])
+    months.get([date(2025, 1, 1), date(2024, 12, 2)])   # 12月はヒット
+    months.get([date(2025, 2, 1)])                      # 12月が追い出される
+    months.get([date(2024, 12, 1)])                     # 読み直し
+    assert months.calls == [DEC, JAN, (2025, 2), DEC]
+    st = months.stats()
+    assert st["months"] == ["2025-02", "2024-12"]
+    assert (st["hits"], st["misses"]) == (1, 4)
+
+
+def test_month_cache_get_filters_to_requested_dates():
+    df = _FakeMonths().get([date(2024, 12, 2), date(2025, 1, 1)])
+    assert sorted(df["date"]) == [date(2024, 12, 2), date(2025, 1, 1)]
+
+
+def test_cold_load_does_not_block_cached_months():
+    months = _FakeMonths(delays={JAN: 1.0})
+    months.get([date(2024, 12, 1)])
+    t = threading.Thread(target=months.get, args=([date(2025, 1, 1)],))
+    t.start()
+    time.sleep(0.1)  # 1月の読込中
+    t0 = time.perf_counter()
+    months.get([date(2024, 12, 1)])
+    assert time.perf_counter() - t0 < 0.5
+    t.join()
+
+
+def test_concurrent_requests_for_same_month_load_once():
+    months = _FakeMonths(delays={JAN: 0.3})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(months.get([date(2025, 1, 1)]))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert months.calls == [JAN]
+    assert len(results) == 4 and all(len(df) == 1 for df in results)
+
+
+def test_failed_load_is_not_cached():
+    months = _FakeMonths(fail={JAN})
+    with pytest.raises(OSError):
+        months.get([date(2025, 1, 1)])
+    assert len(months.get([date(2025, 1, 1)])) == 1
+    assert months.calls == [JAN, JAN]
+
+
+# === サービス本体（一時プロジェクトの CSV を読む） ===
+@pytest.fixture
+def service(project, monkeypatch):
+    # 店舗マスターの JSON キャッシュをリポジトリの data/cache に書かない
+    monkeypatch.setattr(topn_serve, "load_store_master", lambda p: load_store_master(p, cache_dir=None))
+    return TopNService(project, max_months=2)
+
+
+@pytest.fixture
+def days(dates):
+    return [dates[0], dates[1], dates[0] + JAN_SHIFT]   # 年月またぎ
+
+
+def _params(**kw):
+    return {k: [str(v)] for k, v in kw.items()}
+
+
+def test_topn_matches_aggregate_topn(service, project, days):
+    out = service.topn(_params(category=CATEGORY, dates=",".join(map(str, days))))
+    expected = aggregate_topn(load_sales(project / "data" / "material", days), category=CATEGORY,
+                              top_n=35, dates=days)
+    assert set(out) == set(expected)
+    for store, day_map in expected.items():
+        assert set(out[store]) == {str(d) for d in day_map}
+        for d, df_day in day_map.items():
+            rows = out[store][str(d)]
+            assert [r["rank"] for r in rows] == list(range(1, len(df_day) + 1))
+            assert [r["jan"] for r in rows] == list(df_day["jan"])
+            assert [r["amount"] for r in rows] == pytest.approx(list(df_day["amount"]))
+    assert service.months.stats()["misses"] == 2
+
+
+def test_totals_ratio_and_store_filter(service, project, days):
+    out = service.totals(_params(category=CATEGORY, dates=",".join(map(str, days)), store=2))
+    assert set(out) == {"2"}
+    df = load_sales(project / "data" / "material", days)
+    total_all, total_cat = build_totals(df, {}, CATEGORY, days)
+    for d in days:
+        t = out["2"][str(d)]
+        assert t["all"] == pytest.approx(total_all[(d, "2")])
+        assert t["cat"] == pytest.approx(total_cat[(d, "2")])
+        assert t["ratio"] == pytest.approx(t["cat"] / t["all"])
+
+
+def test_xlsx_returns_store_workbook(service, days):
+    name, data = service.xlsx(_params(category=CATEGORY, dates=",".join(map(str, days[:2])), store=3))
+    assert name == "3_寿司単品データ.xlsx"
+    wb = load_workbook(BytesIO(data))
+    assert wb.sheetnames == ["3(1)"]
+
+
+def test_bad_requests(service, days):
+    with pytest.raises(ValueError):
+        service.topn(_params(dates=str(days[0])))
+    with pytest.raises(ValueError):
+        service.xlsx(_params(category=CATEGORY, dates=str(days[0])))
+    with pytest.raises(KeyError):
+        service.topn(_params(category=CATEGORY, dates=str(days[0]), store=99))
+
+
+def test_http_endpoints(service, days):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), topn_serve._Handler)
+    httpd.service = service
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(base + path) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    try:
+        assert get("/health") == (200, b'{"ok": true}')
+        status, body = get(f"/topn?category={CATEGORY}&dates={days[0]}&store=1")
+        assert status == 200 and list(json.loads(body)) == ["1"]
+        status, body = get(f"/xlsx?category={CATEGORY}&dates={days[0]}&store=1")
+        assert status == 200 and body[:2] == b"PK"
+        assert get("/topn?category=x&dates=2024-12-20")[0] == 400
+        assert get(f"/topn?category={CATEGORY}&dates={days[0]}&store=99")[0] == 404
+        assert get("/nope")[0] == 404
+
+        metrics = json.loads(get("/metrics")[1])
+        assert metrics["latency"]["/topn"]["count"] == 3
+        assert metrics["latency"]["/topn"]["errors"] == 2
+        assert metrics["cache"]["months"] == ["2024-12"]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,88 @@
+# tests/test_write_pipeline.py
+"""書込スレッド（BackgroundWriter / --write-queue）: 順序・背圧・例外の伝播・中断"""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from scripts.write_pipeline import BackgroundWriter
+from scripts.xlsx_golden_diff import diff_books, read_book
+
+from conftest import CATEGORY, run_cli
+
+
+def test_runs_in_submit_order_on_writer_thread():
+    w = BackgroundWriter(2)
+    done = []
+    for i in range(10):
+        w.submit(lambda i=i: done.append((i, threading.current_thread().name)))
+    w.close()
+    assert [i for i, _ in done] == list(range(10))
+    assert {name for _, name in done} == {"topn-writer"}
+    assert w.count == 10
+
+
+def test_zero_queue_runs_inline():
+    w = BackgroundWriter(0)
+    done = []
+    w.submit(done.append, threading.current_thread().name)
+    assert done == [threading.current_thread().name]
+    w.close()
+    assert w.count == 1 and "[pipeline] queue=0 files=1" in w.line()
+
+
+def test_full_queue_blocks_submit():
+    w = BackgroundWriter(1)
+    for _ in range(3):
+        w.submit(time.sleep, 0.1)
+    w.close()
+    assert w.blocked_sec > 0.05
+
+
+def test_error_raised_on_close_and_later_work_discarded():
+    w = BackgroundWriter(4)
+    gate = threading.Event()
+    done = []
+    w.submit(gate.wait)
+    w.submit(lambda: 1 / 0)
+    w.submit(done.append, "after")
+    gate.set()
+    with pytest.raises(ZeroDivisionError):
+        w.close()
+    assert done == []
+
+
+def test_error_raised_on_next_submit():
+    w = BackgroundWriter(4)
+    w.submit(lambda: 1 / 0)
+    w._queue.join()
+    with pytest.raises(ZeroDivisionError):
+        w.submit(print, "never")
+    with pytest.raises(ZeroDivisionError):
+        w.close()
+
+
+def test_abort_drops_pending_work_without_raising():
+    w = BackgroundWriter(4)
+    gate = threading.Event()
+    done = []
+    w.submit(gate.wait)
+    for i in range(3):
+        w.submit(done.append, i)
+    threading.Timer(0.1, gate.set).start()
+    w.abort()
+    assert done == []
+    w.abort()                                   # 2回目は何もしない
+
+
+def test_cli_write_queue_matches_sequential(project, tmp_path, dates):
+    args = ("--category", CATEGORY, "--dates", ",".join(map(str, dates)), "--out", tmp_path / "t.xlsx",
+            "--split-by-store")
+    assert run_cli(project, *args, "--split-dir", tmp_path / "seq").returncode == 0
+    r = run_cli(project, *args, "--split-dir", tmp_path / "q", "--write-queue", 2)
+    assert r.returncode == 0 and "[pipeline] queue=2 files=3" in r.stdout, r.stdout
+    for p in sorted((tmp_path / "seq").glob("*/*.xlsx")):
+        q = tmp_path / "q" / p.relative_to(tmp_path / "seq")
+        assert diff_books(read_book(p.read_bytes()), read_book(q.read_bytes())) == []
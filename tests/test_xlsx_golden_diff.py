@@ -0,0 +1,134 @@
+# tests/test_xlsx_golden_diff.py
+"""出力どうしの構造比較（xlsx_golden_diff）: 差分の検出と、ファイル / ディレクトリ / zip の対応付け"""
+from __future__ import annotations
+
+import subprocess
+import sys
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.formatting.rule import CellIsRule
+
+from scripts.bundle import ZipBundleWriter
+from scripts.topn_api import generate
+from scripts.xlsx_golden_diff import collect_books, compare_outputs, diff_books, read_book
+
+from conftest import CATEGORY, N_STORES, REPO_ROOT
+
+NAMES = {str(s): f"店{s}" for s in range(1, N_STORES + 1)}
+
+
+@pytest.fixture(scope="module")
+def books(sales, dates) -> dict[str, bytes]:
+    """{相対パス: 店別ブック}"""
+    res = generate(sales, NAMES, category=CATEGORY, dates=dates[:2])
+    return {f.relpath: f.data for f in res.files}
+
+
+def _edit(data: bytes, fn) -> bytes:
+    wb = load_workbook(BytesIO(data))
+    fn(wb.worksheets[0])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _diff(a: bytes, b: bytes, **kw) -> list[str]:
+    return diff_books(read_book(a), read_book(b), **kw)
+
+
+def test_resaved_book_has_no_diff(books):
+    data = next(iter(books.values()))
+    assert _diff(data, _edit(data, lambda ws: None)) == []
+
+
+def test_value_and_tolerance(books):
+    data = next(iter(books.values()))
+    ws = load_workbook(BytesIO(data)).worksheets[0]
+    amount = ws["C4"].value
+    edited = _edit(data, lambda ws: ws.__setitem__("C4", amount + 0.5))
+    assert [d.split(":")[0] for d in _diff(data, edited)] == [f"{ws.title}!C4"]
+    assert _diff(data, edited, tol=1.0) == []
+
+
+def test_number_format_cf_and_sheet_name(books):
+    data = next(iter(books.values()))
+
+    def fmt(ws):
+        ws["C4"].number_format = "0.000"
+
+    def cf(ws):
+        ws.conditional_formatting.add("C4:C10", CellIsRule(operator="greaterThan", formula=["0"]))
+
+    def rename(ws):
+        ws.title = "改名"
+
+    assert [d.split("!", 1)[1] for d in _diff(data, _edit(data, fmt))] == ["C4 format: '#,##0_);[Red](#,##0)' != '0.000'"]
+    assert any("conditional formatting" in d for d in _diff(data, _edit(data, cf)))
+    assert any("改名" in d for d in _diff(data, _edit(data, rename)))
+
+
+def _write_split(root, books):
+    for rel, data in books.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data)
+    return root
+
+
+def _write_bundle(root, books, group_size):
+    root.mkdir(parents=True)
+    w = ZipBundleWriter(root, "寿司単品データ", group_size=group_size)
+    for rel, data in books.items():
+        w.add(rel, data, store=rel.split("/")[0])
+    w.close()
+    return root
+
+
+def test_directory_expands_bundled_zips(books, tmp_path):
+    bundled = _write_bundle(tmp_path / "b2", books, group_size=2)
+    assert list(collect_books(bundled)) == sorted(books)
+    assert collect_books(bundled)["3/3_寿司単品データ.xlsx"]() == books["3/3_寿司単品データ.xlsx"]
+
+
+@pytest.mark.parametrize("a,b", [("split", "b0"), ("split", "b2"), ("b1", "b2")])
+def test_split_and_bundles_compare_like_for_like(books, tmp_path, a, b):
+    dirs = {"split": _write_split(tmp_path / "split", books)}
+    for size in (0, 1, 2):
+        dirs[f"b{size}"] = _write_bundle(tmp_path / f"b{size}", books, group_size=size)
+    lines = []
+    res = compare_outputs(dirs[a], dirs[b], out=lines.append)
+    assert res.ok and res.files == len(books), lines
+
+
+def test_changed_and_missing_books_are_reported(books, tmp_path):
+    split = _write_split(tmp_path / "split", books)
+    changed = dict(books)
+    changed["1/1_寿司単品データ.xlsx"] = _edit(books["1/1_寿司単品データ.xlsx"], lambda ws: ws.__setitem__("B4", "x"))
+    del changed["3/3_寿司単品データ.xlsx"]
+    lines = []
+    res = compare_outputs(split, _write_bundle(tmp_path / "zip", changed, 2), out=lines.append)
+    assert (res.files, res.diff_files, res.only_a) == (2, 1, ["3/3_寿司単品データ.xlsx"])
+    assert any(line.startswith("[diff] 1/1_寿司単品データ.xlsx") for line in lines)
+
+
+def test_single_files_with_different_names(books, tmp_path):
+    data = next(iter(books.values()))
+    (tmp_path / "a.xlsx").write_bytes(data)
+    (tmp_path / "b.xlsx").write_bytes(_edit(data, lambda ws: None))
+    assert compare_outputs(tmp_path / "a.xlsx", tmp_path / "b.xlsx", out=lambda s: None).ok
+
+
+def test_cli_exit_code(books, tmp_path):
+    split = _write_split(tmp_path / "split", books)
+    bundled = _write_bundle(tmp_path / "zip", books, 2)
+
+    def run(*args):
+        return subprocess.run([sys.executable, "-m", "scripts.xlsx_golden_diff", *map(str, args)],
+                              cwd=REPO_ROOT, capture_output=True, text=True, encoding="utf-8")
+    r = run(split, bundled)
+    assert r.returncode == 0 and "[ok] 差分なし: files=3" in r.stdout, r.stdout
+    (split / "2" / "2_寿司単品データ.xlsx").unlink()
+    r = run(split, bundled)
+    assert r.returncode == 1 and "extra=1" in r.stdout
@@ -0,0 +1,67 @@
+# tests/test_xlsx_optimize.py
+"""--optimize（xlsx_optimize）の往復: 最適化後も xlsx_golden_diff で差分なし"""
+from __future__ import annotations
+
+import json
+import zipfile
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from scripts.xlsx_golden_diff import diff_books, read_book
+from scripts.xlsx_optimize import optimize_xlsx
+
+from conftest import CATEGORY, run_cli
+
+
+def test_optimize_keeps_values_formats_and_cf(combined_xlsx):
+    out, _ = optimize_xlsx(combined_xlsx)
+    assert diff_books(read_book(combined_xlsx), read_book(out)) == []
+
+
+def test_optimize_shrinks_and_shares_strings(combined_xlsx):
+    out, stats = optimize_xlsx(combined_xlsx)
+    assert stats.after == len(out) < stats.before == len(combined_xlsx)
+    assert stats.cell_xfs[1] < stats.cell_xfs[0]
+    assert stats.named_styles[1] < stats.named_styles[0]
+    with zipfile.ZipFile(BytesIO(out)) as zf:
+        assert "xl/sharedStrings.xml" in zf.namelist()
+        assert 'codeName="' not in zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+
+def test_optimized_file_opens_in_openpyxl(combined_xlsx):
+    out, _ = optimize_xlsx(combined_xlsx)
+    src = load_workbook(BytesIO(combined_xlsx))
+    dst = load_workbook(BytesIO(out))
+    assert dst.sheetnames == src.sheetnames
+    ws_src, ws_dst = src.worksheets[0], dst.worksheets[0]
+    assert ws_dst["A1"].value == ws_src["A1"].value
+    assert len(ws_dst.conditional_formatting) == len(ws_src.conditional_formatting)
+
+
+def test_optimize_is_idempotent(combined_xlsx):
+    once, _ = optimize_xlsx(combined_xlsx)
+    twice, _ = optimize_xlsx(once)
+    assert diff_books(read_book(once), read_book(twice)) == []
+
+
+def test_golden_diff_reports_changed_cell(combined_xlsx):
+    # 比較側が本当に差分を拾うこと（最適化後の共有文字列側を1セル書き換える）
+    out, _ = optimize_xlsx(combined_xlsx)
+    wb = load_workbook(BytesIO(out))
+    wb.worksheets[0]["A1"].value = "changed"
+    buf = BytesIO()
+    wb.save(buf)
+    lines = diff_books(read_book(combined_xlsx), read_book(buf.getvalue()))
+    assert any("!A1:" in line for line in lines)
+
+
+def test_cli_split_prints_saving_per_file(project, tmp_path, dates):
+    r = run_cli(project, "--category", CATEGORY, "--dates", str(dates[0]), "--out", tmp_path / "t.xlsx",
+                "--split-by-store", "--split-dir", tmp_path / "split", "--optimize")
+    assert r.returncode == 0, r.stdout
+    for s in ("1", "2", "3"):
+        assert f"[optimize] {s}/{s}_寿司単品データ.xlsx " in r.stdout
+    assert "[optimize] 3 files" in r.stdout
+    manifest = json.loads((tmp_path / "split" / "manifest_1.json").read_text(encoding="utf-8"))
+    assert all(f["raw_size"] > f["size"] for f in manifest["files"])
@@ -0,0 +1,79 @@
+# tests/test_year_compare.py
+"""--compare-previous-year: 対応日の割当と、前年金額・前年比の付与"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from scripts.make_topn_simple_refactor import aggregate_topn, build_totals
+from scripts.year_compare import (
+    attach_previous_year, previous_year_amounts, previous_year_date, previous_year_dates, previous_year_totals,
+)
+
+from conftest import CATEGORY
+
+
+def test_previous_year_date_weekday_keeps_weekday():
+    d = date(2025, 12, 24)
+    prev = previous_year_date(d, "weekday")
+    assert prev == date(2024, 12, 25)
+    assert prev.weekday() == d.weekday()
+
+
+def test_previous_year_date_date_mode_and_leap_day():
+    assert previous_year_date(date(2025, 1, 3), "date") == date(2024, 1, 3)
+    assert previous_year_date(date(2024, 2, 29), "date") == date(2023, 2, 28)
+    with pytest.raises(ValueError):
+        previous_year_date(date(2025, 1, 3), "month")
+
+
+@pytest.fixture(scope="module")
+def prev_sales(sales):
+    """今年の売上を 364 日前へずらし、金額を半分にした前年分（前年比はちょうど 2.0 になる）"""
+    return sales.assign(date=sales["date"] - timedelta(days=364), amount=sales["amount"] / 2)
+
+
+def test_attach_previous_year_merges_every_row(sales, dates, prev_sales):
+    date_map = previous_year_dates(dates)
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=35, dates=dates)
+    prev = previous_year_amounts(prev_sales, CATEGORY, date_map)
+    out, rows, matched = attach_previous_year(topn, prev)
+
+    assert rows == matched == sum(len(df) for m in topn.values() for df in m.values())
+    assert set(out) == set(topn)
+    for store, day_map in out.items():
+        for d, df_day in day_map.items():
+            assert list(df_day["jan"]) == list(topn[store][d]["jan"])  # 順位の並びは崩さない
+            pos = df_day["amount"] > 0
+            assert df_day.loc[pos, "yoy"].to_numpy() == pytest.approx(2.0)
+
+
+def test_attach_previous_year_leaves_missing_rows_blank(sales, dates, prev_sales):
+    date_map = previous_year_dates(dates)
+    topn = aggregate_topn(sales, category=CATEGORY, top_n=35, dates=dates)
+    first = dates[0]
+    prev = previous_year_amounts(prev_sales[prev_sales["date"] != date_map[first]], CATEGORY, date_map)
+    out, rows, matched = attach_previous_year(topn, prev)
+
+    missing = sum(len(m[first]) for m in topn.values() if first in m)
+    assert matched == rows - missing
+    for day_map in out.values():
+        assert day_map[first]["prev_amount"].isna().all()
+        assert day_map[first]["yoy"].isna().all()
+
+
+def test_previous_year_totals_match_shifted_totals(sales, dates, prev_sales):
+    date_map = previous_year_dates(dates)
+    total_all, total_cat = build_totals(sales, {}, CATEGORY, dates)
+    prev_all, prev_cat = previous_year_totals(prev_sales, CATEGORY, date_map)
+    for cur, prev in ((total_all, prev_all), (total_cat, prev_cat)):
+        assert set(prev) == set(cur)
+        for key, amt in cur.items():
+            assert prev[key] == pytest.approx(amt / 2)
+
+
+def test_attach_previous_year_empty_topn():
+    topn = {"1": {date(2025, 1, 3): pd.DataFrame()}}
+    assert attach_previous_year(topn, pd.DataFrame()) == (topn, 0, 0)